@@ -0,0 +1,159 @@
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from extensions import db
+from models import Course, Order, CourseStats, DailyStats, DailyTotals, EnrollmentTotals
+from database import read_engine
+from collections import defaultdict
+from datetime import date, timedelta
+
+
+TOTALS_ID = 1
+
+
+# ---------- Incremental upkeep ---------- #
+def _add(table, rows):
+    statement = sqlite_insert(table.__table__)
+    statement = statement.on_conflict_do_update(
+        index_elements=[column.name for column in table.__table__.primary_key],
+        set_=dict(orders=table.orders + statement.excluded.orders, revenue=table.revenue + statement.excluded.revenue),
+    )
+    db.session.execute(statement, rows)
+
+
+def record_enrollments(changes):
+    """Add (course_id, day, orders, revenue) deltas to the aggregates, in the caller's transaction.
+
+    Checkout passes +1 and the price paid per registration, unregister -1
+    and the refund, both against the day the order was placed.
+    """
+    if changes:
+        _add(CourseStats, [dict(course_id=course_id, orders=orders, revenue=revenue) for course_id, day, orders, revenue in changes])
+        _add(DailyStats, [dict(course_id=course_id, day=day, orders=orders, revenue=revenue) for course_id, day, orders, revenue in changes])
+        days = defaultdict(lambda: [0, 0])
+        for course_id, day, orders, revenue in changes:
+            days[day][0] += orders
+            days[day][1] += revenue
+        _add(DailyTotals, [dict(day=day, orders=orders, revenue=revenue) for day, (orders, revenue) in days.items()])
+        _add(EnrollmentTotals, [dict(
+            totals_id=TOTALS_ID, orders=sum(change[2] for change in changes), revenue=sum(change[3] for change in changes),
+        )])
+
+
+# ---------- Seat totals (flask --app app init-db / migrate-db) ---------- #
+SEAT_TRIGGERS = {
+    'insert': ('AFTER INSERT ON course', '+ ifnull(new.course_order, 0) + new.course_held', '+ new.course_slot'),
+    'update': (
+        'AFTER UPDATE OF course_order, course_held, course_slot ON course',
+        '+ ifnull(new.course_order, 0) + new.course_held - ifnull(old.course_order, 0) - old.course_held',
+        '+ new.course_slot - old.course_slot',
+    ),
+    'delete': ('AFTER DELETE ON course', '- ifnull(old.course_order, 0) - old.course_held', '- old.course_slot'),
+}
+
+
+def setup_totals(conn):
+    """Create the totals row and the triggers that keep its seat figures in step with course.
+
+    Seats move with every hold, checkout and admin edit; triggers follow all
+    of them in the writer's own transaction without touching those paths.
+    """
+    for name, (when, taken, total) in SEAT_TRIGGERS.items():
+        conn.exec_driver_sql(
+            f'CREATE TRIGGER IF NOT EXISTS enrollment_totals_course_{name} {when} BEGIN '
+            f'UPDATE enrollment_totals SET seats_taken = seats_taken {taken}, seats_total = seats_total {total} '
+            f'WHERE totals_id = {TOTALS_ID}; END'
+        )
+    if conn.execute(db.select(EnrollmentTotals.totals_id)).first() is None:
+        totals = _expected()[EnrollmentTotals]
+        conn.execute(db.insert(EnrollmentTotals).from_select(list(totals.selected_columns.keys()), totals))
+
+
+# ---------- Full rebuild (flask --app app rebuild-stats) ---------- #
+def _expected():
+    course = (
+        db.select(Order.course_id, func.count().label('orders'), func.coalesce(func.sum(Order.order_price), 0).label('revenue'))
+        .group_by(Order.course_id)
+    )
+    day = func.date(Order.order_date_created)
+    daily = (
+        db.select(day.label('day'), Order.course_id, func.count().label('orders'), func.coalesce(func.sum(Order.order_price), 0).label('revenue'))
+        .group_by(day, Order.course_id)
+    )
+    daily_totals = (
+        db.select(day.label('day'), func.count().label('orders'), func.coalesce(func.sum(Order.order_price), 0).label('revenue'))
+        .group_by(day)
+    )
+    seats = db.select(
+        func.coalesce(func.sum(func.ifnull(Course.course_order, 0) + Course.course_held), 0).label('seats_taken'),
+        func.coalesce(func.sum(Course.course_slot), 0).label('seats_total'),
+    ).subquery()
+    totals = db.select(
+        db.literal(TOTALS_ID).label('totals_id'),
+        db.select(func.count()).select_from(Order).scalar_subquery().label('orders'),
+        db.select(func.coalesce(func.sum(Order.order_price), 0)).scalar_subquery().label('revenue'),
+        seats.c.seats_taken, seats.c.seats_total,
+    )
+    return {CourseStats: course, DailyStats: daily, DailyTotals: daily_totals, EnrollmentTotals: totals}
+
+
+def rebuild_stats(check_only=False):
+    """Recompute the aggregates from the order table and report how many rows were off.
+
+    The first statement is a write, so the whole comparison runs under
+    SQLite's write lock and no checkout can slip in between. With
+    check_only nothing is changed. Returns {table name: rows that differed}.
+    """
+    report = {}
+    for table, expected in _expected().items():
+        columns = [table.__table__.c[name] for name in expected.selected_columns.keys()]
+        # Rows that went back to zero are the same as missing ones; the totals row always stays
+        if table is not EnrollmentTotals:
+            db.session.execute(db.delete(table).where(table.orders == 0, table.revenue == 0))
+        current = db.select(*columns)
+        keys = [column.name for column in table.__table__.primary_key]
+        # Keys missing or wrong on either side; SQLite can't nest compound SELECTs, so each EXCEPT is a subquery
+        wrong, stale = expected.except_(current).subquery(), current.except_(expected).subquery()
+        differing = db.union(db.select(*(wrong.c[key] for key in keys)), db.select(*(stale.c[key] for key in keys))).subquery()
+        report[table.__tablename__] = db.session.execute(db.select(func.count()).select_from(differing)).scalar()
+        if not check_only and report[table.__tablename__]:
+            db.session.execute(db.delete(table))
+            db.session.execute(db.insert(table).from_select(list(expected.selected_columns.keys()), expected))
+    if check_only:
+        db.session.rollback()
+    else:
+        db.session.commit()
+    return report
+
+
+# ---------- Dashboard & API reads ---------- #
+def enrollment_summary(top=20, days=30):
+    """Totals, the `top` courses by revenue and the last `days` days.
+
+    Reads the totals row, `top` rows off the revenue index and one row per
+    day, however many courses there are. Fill ratios count held seats as
+    taken, like the course page.
+    """
+    since = date.today() - timedelta(days=days - 1)
+    with read_engine().connect() as conn:
+        totals = conn.execute(db.select(EnrollmentTotals).where(EnrollmentTotals.totals_id == TOTALS_ID)).first()
+        courses = conn.execute(
+            db.select(
+                Course.course_id, Course.course_name, Course.course_slot, (func.ifnull(Course.course_order, 0) + Course.course_held).label('taken'),
+                CourseStats.orders, CourseStats.revenue,
+            )
+            .join(Course, Course.course_id == CourseStats.course_id)
+            .order_by(CourseStats.revenue.desc()).limit(top)
+        ).all()
+        daily = conn.execute(db.select(DailyTotals).where(DailyTotals.day >= since).order_by(DailyTotals.day)).all()
+    # Missing only until migrate-db / init-db ran setup_totals()
+    totals = totals._mapping if totals is not None else dict(orders=0, revenue=0, seats_taken=0, seats_total=0)
+    return dict(
+        orders=totals['orders'],
+        revenue=totals['revenue'],
+        fill_ratio=totals['seats_taken'] / totals['seats_total'] if totals['seats_total'] else 0,
+        courses=[dict(
+            course_id=course.course_id, course_name=course.course_name, orders=course.orders, revenue=course.revenue,
+            fill_ratio=course.taken / course.course_slot if course.course_slot else 0,
+        ) for course in courses],
+        daily=[dict(day=str(row.day), orders=row.orders, revenue=row.revenue) for row in daily],
+    )
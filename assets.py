@@ -0,0 +1,198 @@
+from flask import url_for, request, send_file, abort
+from markupsafe import Markup, escape
+from werkzeug.security import safe_join
+import mimetypes
+import posixpath
+import hashlib
+import gzip
+import json
+import os
+import re
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+IMAGE_TYPES = ('.jpg', '.jpeg', '.png', '.webp')
+TEXT_TYPES = ('.css', '.js', '.svg')
+CSS_URL = re.compile(r'''url\(\s*(['"]?)([^'")]+)\1\s*\)''')
+
+
+def _digest(*parts):
+    sha = hashlib.sha256()
+    for part in parts:
+        sha.update(part if isinstance(part, bytes) else str(part).encode())
+    return sha.hexdigest()[:10]
+
+
+def _fingerprinted(name, digest, suffix=None):
+    stem, ext = os.path.splitext(name)
+    return f'{stem}.{digest}{suffix or ext}'
+
+
+# ---------- Build step (flask --app app build-assets) ---------- #
+def build_assets(static_dir, build_dir, widths, webp_quality=80, avif_quality=55, log=print):
+    """Write fingerprinted, resized and precompressed copies of static/ into build_dir.
+
+    Images get WebP (and AVIF, when Pillow supports it) variants at every
+    width in `widths` below their own; CSS/JS get their url() references
+    pointed at the fingerprinted files and .gz/.br siblings. File names are
+    derived from the source bytes and settings, so unchanged files are
+    skipped on rebuild. Returns the manifest, also saved as manifest.json.
+    """
+    from PIL import Image, ImageOps, features
+
+    formats = [('webp', 'WEBP', dict(quality=webp_quality, method=6))]
+    if features.check('avif'):
+        formats.append(('avif', 'AVIF', dict(quality=avif_quality)))
+    else:
+        log('Pillow has no AVIF support, writing WebP variants only')
+
+    os.makedirs(build_dir, exist_ok=True)
+    manifest = dict(files={}, images={})
+
+    def write(name, data):
+        path = os.path.join(build_dir, name)
+        if not os.path.exists(path):
+            with open(path, 'wb') as f:
+                f.write(data)
+        return name
+
+    names = sorted(name for name in os.listdir(static_dir) if os.path.isfile(os.path.join(static_dir, name)))
+
+    # Images first, so stylesheets can point at their fingerprinted names
+    for name in names:
+        if not name.lower().endswith(IMAGE_TYPES):
+            continue
+        with open(os.path.join(static_dir, name), 'rb') as f:
+            data = f.read()
+        manifest['files'][name] = write(_fingerprinted(name, _digest(data)), data)
+
+        with Image.open(os.path.join(static_dir, name)) as source:
+            image = ImageOps.exif_transpose(source)
+            image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+        entry = manifest['images'][name] = dict(width=image.width, height=image.height)
+        for fmt, pil_format, options in formats:
+            variants = entry[fmt] = []
+            for width in sorted({w for w in widths if w < image.width} | {min(image.width, max(widths))}):
+                variant = _fingerprinted(f'{os.path.splitext(name)[0]}-{width}', _digest(data, fmt, width, options), f'.{fmt}')
+                if not os.path.exists(os.path.join(build_dir, variant)):
+                    height = round(image.height * width / image.width)
+                    image.resize((width, height), Image.LANCZOS).save(os.path.join(build_dir, variant), pil_format, **options)
+                variants.append((width, variant))
+        log(f'{name}: {len(formats)} formats x {len(entry[formats[0][0]])} widths')
+
+    for name in names:
+        if not name.lower().endswith(TEXT_TYPES):
+            continue
+        with open(os.path.join(static_dir, name), 'rb') as f:
+            data = f.read()
+        if name.lower().endswith('.css'):
+            data = _rewrite_css(data.decode('utf-8'), manifest['files']).encode('utf-8')
+        built = manifest['files'][name] = write(_fingerprinted(name, _digest(data)), data)
+        write(built + '.gz', gzip.compress(data, compresslevel=9, mtime=0))
+        if brotli is not None:
+            write(built + '.br', brotli.compress(data, quality=11))
+        log(f'{name}: {built}')
+
+    with open(os.path.join(build_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    return manifest
+
+
+def _rewrite_css(css, files):
+    # url(flagss.jpg) / url(../static/kl.jpg) -> the fingerprinted file next to the built stylesheet
+    def replace(match):
+        quote, target = match.groups()
+        if re.match(r'[a-z]+:|/|#', target):
+            return match.group(0)
+        name = posixpath.normpath(posixpath.join('static', target))
+        name = name[len('static/'):] if name.startswith('static/') else None
+        if name not in files:
+            return match.group(0)
+        return f'url({quote}{files[name]}{quote})'
+    return CSS_URL.sub(replace, css)
+
+
+# ---------- Serving & template helpers ---------- #
+class Assets:
+    """Fingerprinted static files with immutable caching, plus srcset helpers.
+
+    Templates call asset_url() like url_for('static', filename=...), and
+    picture() for responsive images. Until build-assets has run they fall
+    back to the plain static files.
+    """
+
+    def __init__(self, app=None):
+        self.files = {}
+        self.images = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('ASSET_BUILD_DIR', os.path.join(app.static_folder, 'dist'))
+        app.config.setdefault('ASSET_WIDTHS', (320, 640, 960, 1280, 1920))
+        app.config.setdefault('ASSET_MAX_AGE', 365 * 24 * 3600)
+        self.build_dir = app.config['ASSET_BUILD_DIR']
+        self.max_age = app.config['ASSET_MAX_AGE']
+        self.load()
+        app.add_url_rule('/assets/<path:filename>', 'assets', self.serve)
+        app.add_template_global(self.asset_url, 'asset_url')
+        app.add_template_global(self.srcset, 'srcset')
+        app.add_template_global(self.picture, 'picture')
+
+    def load(self):
+        try:
+            with open(os.path.join(self.build_dir, 'manifest.json')) as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            manifest = dict(files={}, images={})
+        self.files = manifest['files']
+        self.images = manifest['images']
+
+    def serve(self, filename):
+        path = safe_join(self.build_dir, filename)
+        if path is None or not os.path.isfile(path):
+            abort(404)
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+        encoding = None
+        if filename.lower().endswith(TEXT_TYPES):
+            # Precompressed siblings written by build-assets
+            for candidate, suffix in (('br', '.br'), ('gzip', '.gz')):
+                if request.accept_encodings[candidate] and os.path.isfile(path + suffix):
+                    encoding, path = candidate, path + suffix
+                    break
+
+        response = send_file(path, mimetype=mimetype, conditional=True, max_age=self.max_age)
+        # Names change with the content, so a cached copy never goes stale
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        if filename.lower().endswith(TEXT_TYPES):
+            response.vary.add('Accept-Encoding')
+        if encoding:
+            response.content_encoding = encoding
+        return response
+
+    def asset_url(self, endpoint, **values):
+        if endpoint in ('static', '.static') and values.get('filename') in self.files:
+            return url_for('assets', filename=self.files[values.pop('filename')], **values)
+        return url_for(endpoint, **values)
+
+    def srcset(self, filename, fmt='webp'):
+        variants = self.images.get(filename, {}).get(fmt, [])
+        return ', '.join(f"{url_for('assets', filename=variant)} {width}w" for width, variant in variants)
+
+    def picture(self, filename, alt='', sizes='100vw', **attrs):
+        """<picture> with AVIF/WebP sources and the original as the <img> fallback."""
+        attributes = ''.join(f' {name}="{escape(value)}"' for name, value in attrs.items())
+        img = f'<img src="{escape(self.asset_url("static", filename=filename))}" alt="{escape(alt)}"{attributes}>'
+        if filename not in self.images:
+            return Markup(img)
+        sources = ''.join(
+            f'<source type="image/{fmt}" srcset="{escape(self.srcset(filename, fmt))}" sizes="{escape(sizes)}">'
+            for fmt in ('avif', 'webp') if fmt in self.images[filename]
+        )
+        return Markup(f'<picture>{sources}{img}</picture>')
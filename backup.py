@@ -0,0 +1,188 @@
+from extensions import db
+from catalog import catalog
+from services import feedback_version
+from datetime import datetime
+import threading
+import sqlite3
+import shutil
+import gzip
+import time
+import os
+
+
+class BackupRestarted(Exception):
+    """Another connection wrote to the database while it was being copied step by step."""
+
+
+# ---------- Online backup, restore & template resets ---------- #
+class Backups:
+    """Snapshots of the live database through SQLite's online backup API, gzip-compressed.
+
+    A backup copies BACKUP_PAGES pages per step and sleeps BACKUP_STEP_SLEEP
+    between steps, so it never holds the disk for long. SQLite restarts a
+    stepped copy whenever another connection writes; after
+    BACKUP_MAX_RESTARTS of those the rest is copied in one pass, inside a
+    single read transaction that WAL keeps from blocking writers. Snapshots
+    are written to a temporary name and renamed, so a listed backup is never
+    torn. restore() and reset() copy a snapshot or template.db over the live
+    database with the same API; the template is kept in memory, so a reset
+    costs a few milliseconds.
+    """
+
+    def __init__(self, app=None, socketio=None):
+        self.app = None
+        self._running = threading.Lock()
+        self._reset_lock = threading.Lock()
+        self._template = None
+        self._template_stamp = None
+        if app is not None:
+            self.init_app(app, socketio)
+
+    def init_app(self, app, socketio):
+        app.config.setdefault('BACKUP_DIR', os.path.join(app.root_path, 'backups'))
+        app.config.setdefault('BACKUP_PAGES', 256)
+        app.config.setdefault('BACKUP_STEP_SLEEP', 0.005)
+        app.config.setdefault('BACKUP_MAX_RESTARTS', 3)
+        app.config.setdefault('BACKUP_KEEP', 10)
+        app.config.setdefault('TEMPLATE_DATABASE', os.path.join(app.root_path, 'template.db'))
+        self.app = app
+        self.socketio = socketio
+
+    def _connect(self, path):
+        return sqlite3.connect(path, timeout=self.app.config['SQLITE_BUSY_TIMEOUT_MS'] / 1000, check_same_thread=False)
+
+    def _live_path(self):
+        with self.app.app_context():
+            return db.engine.url.database
+
+    def _copy(self, source, target):
+        """Stepped online backup of `source` into `target`, returns how many times it restarted."""
+        remaining = []
+
+        def progress(status, left, total):
+            if remaining and left > remaining[-1]:
+                raise BackupRestarted()
+            remaining.append(left)
+            # backup()'s own sleep only applies when the source is busy
+            if left:
+                time.sleep(self.app.config['BACKUP_STEP_SLEEP'])
+
+        restarts = 0
+        while restarts < self.app.config['BACKUP_MAX_RESTARTS']:
+            remaining.clear()
+            try:
+                source.backup(target, pages=self.app.config['BACKUP_PAGES'], progress=progress)
+                return restarts
+            except BackupRestarted:
+                restarts += 1
+        source.backup(target)
+        return restarts
+
+    def backup(self):
+        """Write a compressed snapshot into BACKUP_DIR and return what was written."""
+        config = self.app.config
+        os.makedirs(config['BACKUP_DIR'], exist_ok=True)
+        name = f"database-{datetime.utcnow():%Y%m%d-%H%M%S-%f}.db.gz"
+        path = os.path.join(config['BACKUP_DIR'], name)
+        raw = path[:-len('.gz')] + '.tmp'
+        start = time.perf_counter()
+        try:
+            source, target = self._connect(self._live_path()), sqlite3.connect(raw)
+            try:
+                restarts = self._copy(source, target)
+                if target.execute('PRAGMA quick_check').fetchone()[0] != 'ok':
+                    raise sqlite3.DatabaseError(f'Snapshot {name} failed its integrity check')
+            finally:
+                source.close()
+                target.close()
+            copied = time.perf_counter() - start
+            with open(raw, 'rb') as snapshot, gzip.open(path + '.tmp', 'wb', compresslevel=6) as compressed:
+                shutil.copyfileobj(snapshot, compressed, 1024 * 1024)
+            os.replace(path + '.tmp', path)
+            size = os.path.getsize(raw)
+        finally:
+            for leftover in (raw, path + '.tmp'):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+        self.prune()
+        return dict(
+            name=name, path=path, size=size, compressed=os.path.getsize(path), restarts=restarts,
+            copy_seconds=copied, seconds=time.perf_counter() - start,
+        )
+
+    def start(self):
+        """Run a backup in the background, returns False when one is already running."""
+        if not self._running.acquire(blocking=False):
+            return False
+
+        def run():
+            try:
+                result = self.backup()
+                self.app.logger.info('Backup %s written in %.2fs', result['name'], result['seconds'])
+            except Exception:
+                self.app.logger.exception('Backup failed')
+            finally:
+                self._running.release()
+        self.socketio.start_background_task(run)
+        return True
+
+    def list(self):
+        """Snapshots in BACKUP_DIR, newest first."""
+        folder = self.app.config['BACKUP_DIR']
+        if not os.path.isdir(folder):
+            return []
+        backups = []
+        for name in os.listdir(folder):
+            if name.startswith('database-') and name.endswith('.db.gz'):
+                stat = os.stat(os.path.join(folder, name))
+                backups.append(dict(name=name, size=stat.st_size, created=datetime.utcfromtimestamp(stat.st_mtime)))
+        return sorted(backups, key=lambda backup: backup['name'], reverse=True)
+
+    def prune(self):
+        for backup in self.list()[self.app.config['BACKUP_KEEP']:]:
+            os.remove(os.path.join(self.app.config['BACKUP_DIR'], backup['name']))
+
+    def _replace_live(self, source):
+        target = self._connect(self._live_path())
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+        # Cached copies of the old contents, in every worker
+        with self.app.app_context():
+            catalog.invalidate()
+            feedback_version.bump()
+
+    def restore(self, path):
+        """Copy a snapshot (.db.gz or plain .db) over the live database."""
+        raw = os.path.join(self.app.config['BACKUP_DIR'], f'restore-{os.getpid()}.tmp')
+        os.makedirs(self.app.config['BACKUP_DIR'], exist_ok=True)
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rb') as snapshot, open(raw, 'wb') as output:
+            shutil.copyfileobj(snapshot, output, 1024 * 1024)
+        source = sqlite3.connect(raw)
+        try:
+            if source.execute('PRAGMA quick_check').fetchone()[0] != 'ok':
+                raise sqlite3.DatabaseError(f'{path} failed its integrity check')
+            self._replace_live(source)
+        finally:
+            source.close()
+            os.remove(raw)
+
+    def reset(self):
+        """Replace the live database with TEMPLATE_DATABASE, for tests and demos."""
+        template = self.app.config['TEMPLATE_DATABASE']
+        stamp = os.stat(template).st_mtime_ns
+        with self._reset_lock:
+            if self._template is None or stamp != self._template_stamp:
+                self._template = sqlite3.connect(':memory:', check_same_thread=False)
+                source = sqlite3.connect(template)
+                try:
+                    source.backup(self._template)
+                finally:
+                    source.close()
+                self._template_stamp = stamp
+            self._replace_live(self._template)
+
+
+backups = Backups()
@@ -0,0 +1,181 @@
+from flask import request, session, current_app
+from collections import OrderedDict
+import functools
+import threading
+import hashlib
+import struct
+import mmap
+import time
+import os
+
+
+# ---------- Cross-worker version stamps ---------- #
+class VersionStamps:
+    """Version counters in a small memory-mapped file shared by every gunicorn worker.
+
+    get() is a plain memory read, so comparing versions costs no I/O. With
+    more than one slot, keys are spread over them by modulo; two keys sharing
+    a slot only cause extra invalidations, never stale reads.
+    """
+
+    def __init__(self, slots=1):
+        self.slots = slots
+        self.path = None
+        self._map = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app, filename):
+        self.path = os.path.join(app.root_path, filename)
+        self._map = None
+
+    def _mapped(self):
+        if self._map is None:
+            with self._lock:
+                if self._map is None:
+                    size = 8 * self.slots
+                    with open(self.path, 'ab') as f:
+                        if f.tell() < size:
+                            f.write(bytes(size - f.tell()))
+                    with open(self.path, 'r+b') as f:
+                        self._map = mmap.mmap(f.fileno(), size)
+        return self._map
+
+    def get(self, key=0):
+        return struct.unpack_from('<Q', self._mapped(), 8 * (key % self.slots))[0]
+
+    def bump(self, key=0):
+        # A unique, increasing stamp so concurrent bumps from two workers are never lost
+        struct.pack_into('<Q', self._mapped(), 8 * (key % self.slots), max(self.get(key) + 1, time.time_ns()))
+
+
+# ---------- Versioned LRU cache ---------- #
+class FragmentCache:
+    """Rendered fragments that only change with a version, e.g. the catalog's.
+
+    Entries are dropped as soon as a different version is asked for, and the
+    least recently used ones go once maxsize is reached.
+    """
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.version = None
+        self._fragments = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_render(self, version, key, render):
+        with self._lock:
+            if version != self.version:
+                self._fragments.clear()
+                self.version = version
+            fragment = self._fragments.get(key)
+            if fragment is not None:
+                self._fragments.move_to_end(key)
+                return fragment
+
+        fragment = render()
+        with self._lock:
+            if version == self.version:
+                self._fragments[key] = fragment
+                if len(self._fragments) > self.maxsize:
+                    self._fragments.popitem(last=False)
+        return fragment
+
+
+# ---------- Conditional GETs for pages ---------- #
+class PageCache:
+    """ETags and 304s for page routes, decided from the session cookie alone.
+
+    public() keeps one shared copy of a page that every anonymous visitor
+    sees the same way. private() gives logged in pages a weak ETag built from
+    the user's cart/order version, the caller's version stamps and the
+    session's CSRF token; a matching If-None-Match is answered before the user
+    is loaded, so a 304 touches neither the database nor the templates. Pages
+    with pending flashed messages are always rendered.
+    """
+
+    def __init__(self, app=None):
+        self.release = None
+        self.users = None
+        self._pages = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('PAGE_CACHE_USER_SLOTS', 4096)
+        app.config.setdefault('PAGE_CACHE_SIZE', 64)
+        self.users = VersionStamps(app.config['PAGE_CACHE_USER_SLOTS'])
+        self.users.init_app(app, 'user.version')
+        self._pages = FragmentCache(app.config['PAGE_CACHE_SIZE'])
+        self.release = self._release(app)
+
+    @staticmethod
+    def _release(app):
+        # Templates change on deploy without bumping any stamp, so they are part of every ETag
+        sha = hashlib.sha256()
+        for root, dirs, files in sorted(os.walk(os.path.join(app.root_path, app.template_folder))):
+            for name in sorted(files):
+                stat = os.stat(os.path.join(root, name))
+                sha.update(f'{root}/{name}:{stat.st_size}:{stat.st_mtime_ns}'.encode())
+        return sha.hexdigest()[:12]
+
+    def touch_user(self, user_id):
+        """Call after changing a user's cart or orders."""
+        self.users.bump(int(user_id))
+
+    def _cacheable(self):
+        return request.method in ('GET', 'HEAD') and '_flashes' not in session
+
+    def _finish(self, response, etag, weak, directive):
+        response.set_etag(etag, weak=weak)
+        setattr(response.cache_control, directive, True)
+        response.cache_control.no_cache = True
+        response.vary.add('Cookie')
+        return response.make_conditional(request)
+
+    def public(self, view):
+        """One rendered copy per URL for anonymous visitors, for pages that don't vary by user."""
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            anonymous = '_user_id' not in session and current_app.config.get('REMEMBER_COOKIE_NAME', 'remember_token') not in request.cookies
+            if not (anonymous and self._cacheable()):
+                return view(*args, **kwargs)
+
+            def render():
+                response = current_app.make_response(view(*args, **kwargs))
+                body = response.get_data()
+                return body, response.mimetype, f'{self.release}-{hashlib.sha256(body).hexdigest()[:16]}'
+
+            body, mimetype, etag = self._pages.get_or_render(self.release, request.full_path, render)
+            return self._finish(current_app.response_class(body, mimetype=mimetype), etag, weak=False, directive='public')
+        return wrapper
+
+    def _user_etag(self, user_id, versions):
+        # Signed CSRF tokens in the page expire, so a cached page is at most half a token lifetime old
+        lifetime = current_app.config.get('WTF_CSRF_TIME_LIMIT', 3600) or 0
+        parts = (
+            self.release, user_id, self.users.get(int(user_id)),
+            session.get('csrf_token'), int(time.time() // (lifetime / 2)) if lifetime else 0,
+            *(version() for version in versions),
+        )
+        return hashlib.sha256(repr(parts).encode()).hexdigest()[:20]
+
+    def private(self, *versions):
+        """Weak ETag per user; each of `versions` returns a shared stamp the page depends on."""
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                user_id = session.get('_user_id')
+                if user_id is None or not self._cacheable():
+                    return view(*args, **kwargs)
+
+                etag = self._user_etag(user_id, versions)
+                if request.if_none_match.contains_weak(etag):
+                    return self._finish(current_app.response_class(), etag, weak=True, directive='private')
+
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200 or '_flashes' in session:
+                    return response
+                # Again, as rendering may have just created the session's CSRF token
+                return self._finish(response, self._user_etag(user_id, versions), weak=True, directive='private')
+            return wrapper
+        return decorator
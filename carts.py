@@ -0,0 +1,266 @@
+from sqlalchemy import func
+from extensions import db
+from models import User, Course, CourseSlot, Cart
+from catalog import catalog
+from timetable import parse_slot
+from collections import namedtuple, Counter
+import threading
+import heapq
+
+
+# ---------- Cart entries ---------- #
+class CartItem(namedtuple('CartItem', 'user_id course_id position course_price hold_expires')):
+    """One course in a cart: which of its two slots, the price it was added at and its seat hold.
+
+    Names, days and times are looked up in the catalog, so an entry is a
+    handful of ints whichever store keeps it.
+    """
+
+    __slots__ = ()
+
+    @property
+    def course(self):
+        return catalog.by_id(self.course_id)
+
+    @property
+    def course_name(self):
+        return self.course.course_name
+
+    @property
+    def slot_day(self):
+        return getattr(self.course, f'course_slot_{self.position}_day') if self.position else ''
+
+    @property
+    def slot_time(self):
+        return getattr(self.course, f'course_slot_{self.position}_time') if self.position else ''
+
+    @property
+    def slot(self):
+        return parse_slot(self.slot_day, self.slot_time)
+
+
+# ---------- SQLite backend ---------- #
+class SqliteCarts:
+    """Cart rows in the database, shared by every worker and kept across restarts.
+
+    Every change is a statement in the caller's transaction, so a click on
+    Add To Cart or Remove costs an INSERT/DELETE and a commit.
+    """
+
+    volatile = False
+
+    def cart(self, user_id):
+        """The user's items in the order they were added, and their total."""
+        items = [CartItem(*row) for row in db.session.execute(
+            db.select(Cart.user_id, Cart.course_id, CourseSlot.position, Cart.course_price, Cart.hold_expires)
+            .outerjoin(CourseSlot, CourseSlot.slot_id == Cart.slot_id)
+            .where(Cart.user_id == user_id).order_by(Cart.cart_id)
+        )]
+        return items, sum(item.course_price for item in items)
+
+    def loader_options(self):
+        # The cart rows and their slots ride along in the user's own SELECT; names come from the catalog
+        return [db.joinedload(User.cart).options(db.lazyload(Cart.course), db.joinedload(Cart.slot))]
+
+    def loaded_cart(self, user):
+        """cart() of a user fetched with loader_options(), without another query."""
+        items = [
+            CartItem(row.user_id, row.course_id, row.slot.position if row.slot else None, row.course_price, row.hold_expires)
+            for row in user.cart
+        ]
+        return items, sum(item.course_price for item in items)
+
+    def has(self, user_id, course_id):
+        return db.session.execute(db.select(
+            db.select(Cart.cart_id).where(Cart.user_id == user_id, Cart.course_id == course_id).exists()
+        )).scalar()
+
+    def add(self, user_id, course_id, slot, price, hold_expires=None):
+        db.session.execute(db.insert(Cart).values(
+            user_id=user_id, course_id=course_id, course_price=price, hold_expires=hold_expires,
+            slot_day=slot.day if slot else '', slot_time=slot.time if slot else '', slot_id=slot.slot_id if slot else None,
+        ))
+
+    def remove(self, user_id, course_ids):
+        db.session.execute(
+            db.delete(Cart).where(Cart.user_id == user_id, Cart.course_id.in_(course_ids)).execution_options(synchronize_session=False)
+        )
+
+    def remove_course(self, course_id):
+        db.session.execute(db.delete(Cart).where(Cart.course_id == course_id).execution_options(synchronize_session=False))
+
+    def claim_hold(self, user_id, course_id, now):
+        return db.session.execute(
+            db.update(Cart).where(Cart.user_id == user_id, Cart.course_id == course_id, Cart.hold_expires > now)
+            .values(hold_expires=None).execution_options(synchronize_session=False)
+        ).rowcount == 1
+
+    def release_hold(self, user_id, course_id):
+        return db.session.execute(
+            db.update(Cart).where(Cart.user_id == user_id, Cart.course_id == course_id, Cart.hold_expires.isnot(None))
+            .values(hold_expires=None).execution_options(synchronize_session=False)
+        ).rowcount == 1
+
+    def release_expired(self, now, limit):
+        expired = (
+            db.select(Cart.cart_id).where(Cart.hold_expires <= now)
+            .order_by(Cart.hold_expires, Cart.cart_id).limit(limit).correlate(None)
+        )
+        # The course UPDATE comes first so it takes the write lock; the same
+        # batch can't change before the cart rows are cleared below
+        db.session.execute(
+            db.update(Course)
+            .where(Course.course_id.in_(db.select(Cart.course_id).where(Cart.cart_id.in_(expired))))
+            .values(course_held=Course.course_held - db.select(func.count()).where(
+                Cart.course_id == Course.course_id, Cart.cart_id.in_(expired)).scalar_subquery())
+            .execution_options(synchronize_session=False)
+        )
+        rows = db.session.execute(db.select(Cart.cart_id, Cart.user_id, Cart.course_id).where(Cart.cart_id.in_(expired))).all()
+        if rows:
+            db.session.execute(
+                db.update(Cart).where(Cart.cart_id.in_([row.cart_id for row in rows])).values(hold_expires=None)
+                .execution_options(synchronize_session=False)
+            )
+        return [(row.user_id, row.course_id) for row in rows]
+
+    def forget_holds(self):
+        pass
+
+
+# ---------- In-memory backend ---------- #
+class MemoryCarts:
+    """Carts as per-user dicts of CartItem in this process, with running totals.
+
+    Adding, removing and listing never touch SQLite; only checkout writes
+    orders, and seat holds still move course_held with a guarded UPDATE.
+    Each process sees only its own carts and loses them on restart, so this
+    is for a single worker, like the Procfile's eventlet one. Changes apply
+    at once rather than at commit: they follow the guarded write that
+    already took SQLite's write lock, so that commit is not expected to fail.
+    """
+
+    volatile = True
+
+    def __init__(self):
+        self._carts = {}
+        self._totals = {}
+        # (hold_expires, user_id, course_id); entries whose hold went since are skipped
+        self._holds = []
+        self._lock = threading.Lock()
+
+    def cart(self, user_id):
+        with self._lock:
+            return list(self._carts.get(user_id, {}).values()), self._totals.get(user_id, 0)
+
+    def has(self, user_id, course_id):
+        return course_id in self._carts.get(user_id, ())
+
+    def loader_options(self):
+        return []
+
+    def loaded_cart(self, user):
+        return self.cart(user.id)
+
+    def add(self, user_id, course_id, slot, price, hold_expires=None):
+        with self._lock:
+            cart = self._carts.setdefault(user_id, {})
+            if course_id in cart:
+                return
+            cart[course_id] = CartItem(user_id, course_id, slot.position if slot else None, price, hold_expires)
+            self._totals[user_id] = self._totals.get(user_id, 0) + price
+            if hold_expires is not None:
+                heapq.heappush(self._holds, (hold_expires, user_id, course_id))
+
+    def remove(self, user_id, course_ids):
+        with self._lock:
+            cart = self._carts.get(user_id, {})
+            for course_id in course_ids:
+                item = cart.pop(course_id, None)
+                if item is not None:
+                    self._totals[user_id] -= item.course_price
+            if not cart:
+                self._carts.pop(user_id, None)
+                self._totals.pop(user_id, None)
+
+    def remove_course(self, course_id):
+        with self._lock:
+            users = [user_id for user_id, cart in self._carts.items() if course_id in cart]
+        for user_id in users:
+            self.remove(user_id, [course_id])
+
+    def _clear_hold(self, user_id, course_id, live_at=None):
+        item = self._carts.get(user_id, {}).get(course_id)
+        if item is None or item.hold_expires is None or (live_at is not None and item.hold_expires <= live_at):
+            return False
+        self._carts[user_id][course_id] = item._replace(hold_expires=None)
+        return True
+
+    def claim_hold(self, user_id, course_id, now):
+        with self._lock:
+            return self._clear_hold(user_id, course_id, live_at=now)
+
+    def release_hold(self, user_id, course_id):
+        with self._lock:
+            return self._clear_hold(user_id, course_id)
+
+    def release_expired(self, now, limit):
+        released = []
+        with self._lock:
+            while self._holds and self._holds[0][0] <= now and len(released) < limit:
+                hold_expires, user_id, course_id = heapq.heappop(self._holds)
+                item = self._carts.get(user_id, {}).get(course_id)
+                if item is not None and item.hold_expires == hold_expires and self._clear_hold(user_id, course_id):
+                    released.append((user_id, course_id))
+        if released:
+            db.session.execute(
+                db.update(Course.__table__).where(Course.course_id == db.bindparam('id'))
+                .values(course_held=Course.course_held - db.bindparam('count')),
+                [dict(id=course_id, count=count) for course_id, count in Counter(course_id for user_id, course_id in released).items()],
+            )
+        return released
+
+    def forget_holds(self):
+        # Holds counted by a previous process died with its carts
+        db.session.execute(db.update(Course).where(Course.course_held != 0).values(course_held=0))
+        db.session.commit()
+
+
+# ---------- Pluggable cart store ---------- #
+class CartStore:
+    """The configured cart backend: CART_STORE is 'sqlite' (default) or 'memory'.
+
+    Both give the same CartItem entries, so views, reservations and checkout
+    don't know which one is in use. Writes run in the caller's transaction;
+    the caller commits.
+    """
+
+    backends = {'sqlite': SqliteCarts, 'memory': MemoryCarts}
+
+    def __init__(self, app=None):
+        self.backend = None
+        self._started = False
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('CART_STORE', 'sqlite')
+        if app.config['CART_STORE'] not in self.backends:
+            raise ValueError(f"Unknown CART_STORE {app.config['CART_STORE']!r}, expected one of {', '.join(self.backends)}")
+        self.backend = self.backends[app.config['CART_STORE']]()
+        self._started = False
+        app.before_request(self._start)
+
+    def _start(self):
+        if not self._started and self.backend.volatile:
+            with self._lock:
+                if not self._started:
+                    self.backend.forget_holds()
+                    catalog.seats_changed()
+        self._started = True
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+
+cart_store = CartStore()
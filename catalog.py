@@ -0,0 +1,433 @@
+from flask import render_template
+from flask_wtf.csrf import generate_csrf
+from markupsafe import Markup
+from sqlalchemy import exc
+from extensions import db
+from models import Course
+from forms import PurchaseCourseForm
+from caching import VersionStamps, FragmentCache
+from operator import attrgetter
+from collections import deque
+import itertools
+import threading
+import bisect
+import json
+import math
+import re
+import time
+import os
+
+
+# ---------- Course catalog cache ---------- #
+class CourseCatalog:
+    """Read-mostly, per-process copy of the Course table.
+
+    Admin write paths call invalidate(), which bumps a version stamp kept in a
+    small memory-mapped file shared by every gunicorn worker. Readers only
+    compare that stamp and reload when it moved, so catalog renders skip the
+    database. Seat counts move with every registration, so they are left out
+    of that copy: seats() keeps them apart, reloaded with one small query
+    after seats_changed() bumped their own stamp.
+    """
+
+    # Filter By option -> sort column, ties broken by course_id
+    sort_columns = {'id': 'course_id', 'price': 'course_price', 'slot': 'course_slot'}
+    # Only read through seats()
+    seat_columns = ('course_order', 'course_held')
+    # Slots of the shared stamp file
+    CATALOG, SEATS = 0, 1
+
+    def __init__(self, app=None, read_engine=None):
+        self.stamps = VersionStamps(slots=2)
+        self.engine = None
+        self.version = None
+        self.seats_version = None
+        self._lock = threading.Lock()
+        self._seats_lock = threading.Lock()
+        self._views = {}
+        self._keys = {}
+        self._by_name = {}
+        self._by_id = {}
+        self._seats = {}
+        if app is not None:
+            self.init_app(app, read_engine)
+
+    def init_app(self, app, read_engine):
+        # Lives next to the database so every worker of the app maps the same file
+        self.stamps.init_app(app, 'catalog.version')
+        self.engine = read_engine
+        self.version = None
+        self.seats_version = None
+
+    def stamp(self):
+        """The shared catalog version, which moves on every admin write from any worker."""
+        return self.stamps.get(self.CATALOG)
+
+    def seat_stamp(self):
+        """The shared seat count version, which moves on every registration, unregister and seat hold change."""
+        return self.stamps.get(self.SEATS)
+
+    def _load(self):
+        stamp = self.stamps.get(self.CATALOG)
+        if stamp != self.version:
+            with self._lock:
+                if stamp != self.version:
+                    columns = [column for column in Course.__table__.columns if column.name not in self.seat_columns]
+                    with self.engine.connect() as conn:
+                        rows = conn.execute(db.select(*columns).order_by(Course.course_id)).all()
+                    # Same orderings as the Filter By select in course(), with (value, course_id) seek keys
+                    self._views = {}
+                    self._keys = {}
+                    for view, column in self.sort_columns.items():
+                        key = attrgetter(column, 'course_id')
+                        self._views[view] = tuple(sorted(rows, key=key))
+                        self._keys[view] = [key(row) for row in self._views[view]]
+                    self._by_name = {row.course_name: row for row in rows}
+                    self._by_id = {row.course_id: row for row in rows}
+                    self.version = stamp
+        return self._views
+
+    def courses(self, order_by='id'):
+        return self._load()[order_by]
+
+    def page(self, order_by='id', after=None, limit=20):
+        """Keyset page of a view starting after the seek key, plus the next key (or None)."""
+        rows = self._load()[order_by]
+        keys = self._keys[order_by]
+        start = bisect.bisect_right(keys, after) if after else 0
+        end = start + limit
+        return rows[start:end], (keys[end - 1] if end < len(rows) else None)
+
+    def get(self, course_name):
+        self._load()
+        return self._by_name.get(course_name)
+
+    def by_id(self, course_id):
+        self._load()
+        return self._by_id.get(course_id)
+
+    def find(self, course_ids):
+        # Rows for the given ids, in the given order
+        self._load()
+        return [self._by_id[course_id] for course_id in course_ids if course_id in self._by_id]
+
+    def seats(self):
+        """{course_id: (seats taken, course_slot)} as of the last seats_changed() in any worker.
+
+        Taken counts registrations and seats held by carts, like the guarded
+        UPDATEs in reservations.py, so slot - taken is what add-to-cart can get.
+        """
+        stamp = self.stamps.get(self.SEATS)
+        if stamp != self.seats_version:
+            with self._seats_lock:
+                if stamp != self.seats_version:
+                    with self.engine.connect() as conn:
+                        self._seats = {row.course_id: (row.taken, row.course_slot) for row in conn.execute(
+                            db.select(Course.course_id, (Course.course_order + Course.course_held).label('taken'), Course.course_slot)
+                        )}
+                    self.seats_version = stamp
+        return self._seats
+
+    def seats_changed(self):
+        """Call after committing a registration, unregister or seat hold change; the catalog itself stays cached."""
+        self.stamps.bump(self.SEATS)
+        self.seats_version = None
+
+    def invalidate(self):
+        """Call after an admin created, changed or deleted courses."""
+        self.stamps.bump(self.CATALOG)
+        self.stamps.bump(self.SEATS)
+        self.version = None
+        self.seats_version = None
+
+
+catalog = CourseCatalog()
+
+
+# ---------- Course search ---------- #
+class CourseSearch:
+    """Ranked prefix search over course name, description and trainer.
+
+    Uses an SQLite FTS5 table kept in step with course by triggers. When the
+    sqlite build has no FTS5 it falls back to an in-memory inverted index that
+    follows the catalog version. Both rank with BM25, name matches first.
+    """
+
+    # BM25 weights for course_name, course_info, course_trainer
+    weights = (10.0, 1.0, 5.0)
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self):
+        self.backend = None
+        self.version = None
+        self._lock = threading.Lock()
+        self._docs = {}        # course_id -> indexed (name, info, trainer)
+        self._lengths = {}     # course_id -> weighted document length
+        self._postings = {}    # term -> {course_id: weighted term frequency}
+        self._terms = []       # sorted terms, for prefix lookups
+
+    @staticmethod
+    def tokenize(text):
+        return re.findall(r'[^\W_]+', text.lower())
+
+    def setup(self, conn):
+        """Create the FTS5 table & triggers, returns False when FTS5 is unavailable."""
+        try:
+            exists = conn.exec_driver_sql("SELECT 1 FROM sqlite_master WHERE name = 'course_fts'").first()
+            conn.exec_driver_sql(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS course_fts USING fts5("
+                "course_name, course_info, course_trainer, content='course', content_rowid='course_id')"
+            )
+        except exc.OperationalError:
+            return False
+
+        conn.exec_driver_sql(
+            "CREATE TRIGGER IF NOT EXISTS course_fts_insert AFTER INSERT ON course BEGIN "
+            "INSERT INTO course_fts(rowid, course_name, course_info, course_trainer) "
+            "VALUES (new.course_id, new.course_name, new.course_info, new.course_trainer); END"
+        )
+        conn.exec_driver_sql(
+            "CREATE TRIGGER IF NOT EXISTS course_fts_delete AFTER DELETE ON course BEGIN "
+            "INSERT INTO course_fts(course_fts, rowid, course_name, course_info, course_trainer) "
+            "VALUES ('delete', old.course_id, old.course_name, old.course_info, old.course_trainer); END"
+        )
+        conn.exec_driver_sql(
+            "CREATE TRIGGER IF NOT EXISTS course_fts_update AFTER UPDATE OF course_name, course_info, course_trainer ON course BEGIN "
+            "INSERT INTO course_fts(course_fts, rowid, course_name, course_info, course_trainer) "
+            "VALUES ('delete', old.course_id, old.course_name, old.course_info, old.course_trainer); "
+            "INSERT INTO course_fts(rowid, course_name, course_info, course_trainer) "
+            "VALUES (new.course_id, new.course_name, new.course_info, new.course_trainer); END"
+        )
+        if exists is None:
+            conn.exec_driver_sql("INSERT INTO course_fts(course_fts) VALUES ('rebuild')")
+        return True
+
+    def search(self, text):
+        """Courses matching every word of text (as a prefix), best match first."""
+        terms = self.tokenize(text)
+        if not terms:
+            return []
+
+        if self.backend is None:
+            with self._lock:
+                if self.backend is None:
+                    with db.engine.begin() as conn:
+                        self.backend = 'fts5' if self.setup(conn) else 'python'
+
+        if self.backend == 'fts5':
+            with catalog.engine.connect() as conn:
+                course_ids = self.match(conn, terms)
+        else:
+            course_ids = self._search_index(terms)
+        return catalog.find(course_ids)
+
+    def match(self, conn, terms):
+        """Ids of the courses in course_fts matching every term, best BM25 score first."""
+        query = ' '.join(f'"{term}"*' for term in terms)
+        return [row[0] for row in conn.execute(
+            db.text('SELECT rowid FROM course_fts WHERE course_fts MATCH :query ORDER BY bm25(course_fts, :w_name, :w_info, :w_trainer)'),
+            dict(query=query, w_name=self.weights[0], w_info=self.weights[1], w_trainer=self.weights[2])
+        )]
+
+    # ---------- Pure-Python fallback ---------- #
+    def _sync(self):
+        rows = catalog.courses()
+        if catalog.version != self.version:
+            self.index(rows, catalog.version)
+
+    def index(self, rows, version):
+        """Bring the index in line with rows, re-indexing only the courses that changed."""
+        with self._lock:
+            current = {row.course_id: (row.course_name, row.course_info, row.course_trainer) for row in rows}
+            for course_id, fields in list(self._docs.items()):
+                if current.get(course_id) != fields:
+                    self._remove(course_id)
+            for course_id, fields in current.items():
+                if course_id not in self._docs:
+                    self._add(course_id, fields)
+            self.version = version
+
+    def _add(self, course_id, fields):
+        counts = {}
+        for weight, field in zip(self.weights, fields):
+            for term in self.tokenize(field):
+                counts[term] = counts.get(term, 0) + weight
+        for term, count in counts.items():
+            if term not in self._postings:
+                self._postings[term] = {}
+                bisect.insort(self._terms, term)
+            self._postings[term][course_id] = count
+        self._docs[course_id] = fields
+        self._lengths[course_id] = sum(counts.values())
+
+    def _remove(self, course_id):
+        for weight, field in zip(self.weights, self._docs.pop(course_id)):
+            for term in set(self.tokenize(field)):
+                postings = self._postings.get(term)
+                if postings is None:
+                    continue
+                postings.pop(course_id, None)
+                if not postings:
+                    del self._postings[term]
+                    del self._terms[bisect.bisect_left(self._terms, term)]
+        del self._lengths[course_id]
+
+    def _search_index(self, terms):
+        self._sync()
+        return self.rank(terms)
+
+    def rank(self, terms):
+        """Ids of the indexed courses matching every term, best BM25 score first."""
+        total = len(self._docs)
+        if not total:
+            return []
+        average = sum(self._lengths.values()) / total
+
+        scores = None
+        for term in terms:
+            # Every indexed term starting with this query term counts as one term, as in FTS5's prefix queries
+            start = bisect.bisect_left(self._terms, term)
+            frequencies = {}
+            for indexed in itertools.takewhile(lambda t: t.startswith(term), self._terms[start:]):
+                for course_id, tf in self._postings[indexed].items():
+                    frequencies[course_id] = frequencies.get(course_id, 0) + tf
+            idf = math.log(1 + (total - len(frequencies) + 0.5) / (len(frequencies) + 0.5))
+            matched = {}
+            for course_id, tf in frequencies.items():
+                norm = tf + self.k1 * (1 - self.b + self.b * self._lengths[course_id] / average)
+                matched[course_id] = idf * tf * (self.k1 + 1) / norm
+
+            # Every query term has to match, like FTS5's implicit AND
+            if scores is None:
+                scores = matched
+            else:
+                scores = {course_id: score + matched[course_id] for course_id, score in scores.items() if course_id in matched}
+
+        return sorted(scores, key=lambda course_id: (-scores[course_id], course_id))
+
+
+course_search = CourseSearch()
+
+
+# ---------- Course table fragment cache ---------- #
+course_rows_cache = FragmentCache()
+# Stand in for the per-session CSRF token and the seat counts inside cached fragments
+CSRF_PLACEHOLDER = '__csrf_token__'
+SEATS_PLACEHOLDER = '__seats_{}__'
+SEATS_FIELD = re.compile(r'__seats_(\d+)__')
+
+
+def render_course_rows(courses, cache_key=None):
+    """The catalog table rows and their modals, the same for every user.
+
+    With a cache_key the HTML is rendered once per catalog version; only the
+    CSRF token and the seat counts are filled in per request.
+    """
+    def render():
+        return render_template(
+            'Includes/course_rows.html', courses=courses, purchase_form=PurchaseCourseForm(),
+            csrf_token_value=CSRF_PLACEHOLDER, seats_placeholder=SEATS_PLACEHOLDER,
+        )
+
+    if cache_key is None:
+        rows = render()
+    else:
+        rows = course_rows_cache.get_or_render(catalog.version, cache_key, render)
+    seats = catalog.seats()
+    rows = SEATS_FIELD.sub(lambda field: '{}/{}'.format(*seats.get(int(field.group(1)), ('?', '?'))), rows)
+    return Markup(rows.replace(CSRF_PLACEHOLDER, generate_csrf()))
+
+
+# ---------- Live seat counts ---------- #
+class SeatFeed:
+    """Seat count changes pushed to course page listeners as Server-Sent Events.
+
+    One watcher thread per process follows the catalog's seat stamp, so it
+    sees checkouts, unregisters and seat holds from every worker, and
+    publishes only the courses whose taken seats or course_slot moved. Listeners just wait on a
+    condition and hold no database connection; under an eventlet worker each
+    is an idle greenlet rather than a thread. Recent deltas are kept so a
+    client reconnecting with Last-Event-ID only receives what it missed.
+    """
+
+    def __init__(self, app=None, backlog=128):
+        self.app = app
+        self.seq = 0
+        self.epoch = None
+        self._seats = None
+        self._deltas = deque(maxlen=backlog)   # (seq, {course_id: [taken, slot] or None})
+        self._changed = threading.Condition()
+        self._wake = threading.Event()
+        self._watcher = None
+
+    def init_app(self, app):
+        self.app = app
+
+    def _start(self):
+        # Started by the first listener, so every forked worker runs its own watcher
+        if self._watcher is None:
+            with self._changed:
+                if self._watcher is None:
+                    self._seats = dict(catalog.seats())
+                    # Event ids are only meaningful to the worker that issued them
+                    self.epoch = f'{os.getpid()}.{time.time_ns()}'
+                    self._watcher = threading.Thread(target=self._watch, name='seat-feed', daemon=True)
+                    self._watcher.start()
+
+    def _watch(self):
+        while True:
+            self._wake.wait(self.app.config['SEAT_FEED_POLL_SECONDS'])
+            self._wake.clear()
+            try:
+                self.refresh()
+            except Exception:
+                self.app.logger.exception('Seat feed refresh failed')
+
+    def notify(self):
+        """Check for changes now instead of at the next poll (after a local write)."""
+        self._wake.set()
+
+    def refresh(self):
+        seats = catalog.seats()
+        with self._changed:
+            delta = {course_id: list(value) for course_id, value in seats.items() if self._seats.get(course_id) != value}
+            delta.update({course_id: None for course_id in self._seats if course_id not in seats})
+            self._seats = seats
+            if delta:
+                self.seq += 1
+                self._deltas.append((self.seq, delta))
+                self._changed.notify_all()
+
+    def _since(self, seq):
+        # Changes after seq merged into one delta, the full state when seq is unknown or too old
+        if seq is None or seq > self.seq or (self._deltas and seq < self._deltas[0][0] - 1):
+            return {course_id: list(value) for course_id, value in self._seats.items()}
+        merged = {}
+        for delta_seq, delta in self._deltas:
+            if delta_seq > seq:
+                merged.update(delta)
+        return merged
+
+    def stream(self, last_event_id=None):
+        """SSE frames: pending changes first, then every delta, with heartbeats in between."""
+        self._start()
+        epoch, _, last_seq = (last_event_id or '').partition(':')
+        with self._changed:
+            seq = self.seq
+            seats = self._since(int(last_seq) if epoch == self.epoch and last_seq.isdigit() else None)
+        yield f'id: {self.epoch}:{seq}\nevent: seats\ndata: {json.dumps(seats)}\n\n'
+
+        while True:
+            with self._changed:
+                self._changed.wait_for(lambda: self.seq != seq, self.app.config['SEAT_FEED_HEARTBEAT_SECONDS'])
+                if self.seq == seq:
+                    frame = ': keep-alive\n\n'
+                else:
+                    seats = self._since(seq)
+                    seq = self.seq
+                    frame = f'id: {self.epoch}:{seq}\nevent: seats\ndata: {json.dumps(seats)}\n\n'
+            yield frame
+
+
+seat_feed = SeatFeed()
@@ -0,0 +1,80 @@
+from collections import deque
+import threading
+import atexit
+
+
+# ---------- Chat rooms ---------- #
+class ChatHub:
+    """Recent history and batched persistence for the chat rooms.
+
+    Each room keeps its last CHAT_HISTORY_SIZE messages in a ring buffer, so
+    joining a room is served from memory; a room's first join in this process
+    warms it from the database. New messages are queued and written in
+    batches, by a background task every CHAT_FLUSH_SECONDS or by the sender
+    once CHAT_FLUSH_BATCH are pending; what is left is written at exit and
+    from gunicorn's worker_exit hook (app.shutdown). Fan-out itself is left
+    to Socket.IO.
+    """
+
+    def __init__(self, app=None, socketio=None, load=None, save=None):
+        self._rooms = {}
+        self._pending = []
+        self._lock = threading.Lock()
+        self._flusher = None
+        if app is not None:
+            self.init_app(app, socketio, load, save)
+
+    def init_app(self, app, socketio, load, save):
+        """load(room, limit) returns the newest messages oldest first, save(messages) stores a batch in an app context."""
+        app.config.setdefault('CHAT_HISTORY_SIZE', 50)
+        app.config.setdefault('CHAT_FLUSH_SECONDS', 2.0)
+        app.config.setdefault('CHAT_FLUSH_BATCH', 200)
+        self.app = app
+        self.socketio = socketio
+        self._load = load
+        self._save = save
+        atexit.register(self.flush)
+
+    def _room(self, room):
+        messages = self._rooms.get(room)
+        if messages is None:
+            with self._lock:
+                messages = self._rooms.get(room)
+                if messages is None:
+                    messages = deque(self._load(room, self.app.config['CHAT_HISTORY_SIZE']), maxlen=self.app.config['CHAT_HISTORY_SIZE'])
+                    self._rooms[room] = messages
+        return messages
+
+    def history(self, room):
+        return list(self._room(room))
+
+    def post(self, room, message):
+        """Remember a message for joins and queue it for the database."""
+        self._room(room).append(message)
+        with self._lock:
+            self._pending.append(message)
+            pending = len(self._pending)
+            # Started by the first message, so every forked worker runs its own flusher
+            if self._flusher is None:
+                self._flusher = self.socketio.start_background_task(self._run)
+        if pending >= self.app.config['CHAT_FLUSH_BATCH']:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if not batch:
+            return
+        try:
+            # Runs from the background task and at exit, outside any request
+            with self.app.app_context():
+                self._save(batch)
+        except Exception:
+            self.app.logger.exception('Saving %d chat messages failed, retrying with the next batch', len(batch))
+            with self._lock:
+                self._pending[:0] = batch
+
+    def _run(self):
+        while True:
+            self.socketio.sleep(self.app.config['CHAT_FLUSH_SECONDS'])
+            self.flush()
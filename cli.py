@@ -0,0 +1,856 @@
+from flask import Flask, current_app
+from flask.cli import with_appcontext
+from extensions import db, socketio, assets
+from models import User, ChatMessage, Course, CourseSlot, Cart, Order, Waitlist
+from catalog import CourseSearch, course_search, catalog, render_course_rows
+from services import import_courses
+from analytics import rebuild_stats, setup_totals
+from timetable import sync_course_slots, parse_slot
+from carts import CartStore
+from database import read_engine, _pragmas
+from transfer import FORMATS, read_records, export_table
+from assets import build_assets
+from metrics import Histogram
+from passwords import CredentialService
+from views.admin import EXPORT_TABLES
+from views.chat import chat_hub
+from seeding import Seeder, CRAFTS, LEVELS
+from backup import backups
+from loadtest import LoadTest
+from sqlalchemy import create_engine
+from jinja2 import FileSystemBytecodeCache
+from datetime import datetime
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import statistics
+import tempfile
+import random
+import sqlite3
+import subprocess
+import click
+import json
+import time
+import sys
+import os
+
+
+# ========================== #
+# DATABASE SETUP & MIGRATION #
+# ========================== #
+
+# ---------- Create a fresh database (flask --app app init-db) ---------- #
+@click.command('init-db')
+@with_appcontext
+def init_db():
+    """Create missing tables, indexes and the search table."""
+    db.create_all()
+    with db.engine.begin() as conn:
+        setup_totals(conn)
+        if not course_search.setup(conn):
+            print('SQLite has no FTS5, course search will use the in-memory index')
+    print('Database is ready')
+
+
+# ---------- Upgrade database.db in place (flask --app app migrate-db) ---------- #
+@click.command('migrate-db')
+@with_appcontext
+def migrate_db():
+    """Rebuild cart/order on course_id foreign keys, add missing columns, indexes and the search table."""
+    # pysqlite only opens its implicit transaction before DML, so BEGIN by hand: a failed copy then rolls back the renames too
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn, conn.begin():
+        conn.exec_driver_sql('BEGIN IMMEDIATE')
+        new_stats = not conn.exec_driver_sql('PRAGMA table_info("enrollment_totals")').first()
+        # Tables added since (course_slot, waitlist, the aggregates), before the copy below references course_slot
+        db.metadata.create_all(conn)
+
+        for table in (Cart.__table__, Order.__table__):
+            # Left behind by a failed run of the old, non-transactional migration
+            if conn.exec_driver_sql(f'PRAGMA table_info("{table.name}_old")').first():
+                if conn.exec_driver_sql(f'SELECT COUNT(*) FROM "{table.name}"').scalar():
+                    raise click.ClickException(f'Both {table.name} and {table.name}_old hold rows, merge them by hand first')
+                conn.exec_driver_sql(f'DROP TABLE "{table.name}"')
+                conn.exec_driver_sql(f'ALTER TABLE "{table.name}_old" RENAME TO "{table.name}"')
+
+            columns = [row[1] for row in conn.exec_driver_sql(f'PRAGMA table_info("{table.name}")')]
+            if not columns or 'course_id' in columns:
+                continue
+
+            # SQLite can't add a foreign key to an existing table, so copy into a fresh one
+            conn.exec_driver_sql(f'ALTER TABLE "{table.name}" RENAME TO "{table.name}_old"')
+            table.create(conn)
+            # Columns added since (order_date_created, hold_expires) start out empty
+            kept = ', '.join(f'"{column.name}"' for column in table.columns if column.name != 'course_id' and column.name in columns)
+            copied = conn.exec_driver_sql(
+                f'INSERT INTO "{table.name}" ({kept}, course_id) '
+                f'SELECT {", ".join("old." + name for name in kept.split(", "))}, course.course_id '
+                f'FROM "{table.name}_old" AS old JOIN course ON course.course_name = old.course_name JOIN user ON user.id = old.user_id'
+            ).rowcount
+            total = conn.exec_driver_sql(f'SELECT COUNT(*) FROM "{table.name}_old"').scalar()
+            conn.exec_driver_sql(f'DROP TABLE "{table.name}_old"')
+            print(f'{table.name}: migrated {copied} rows, dropped {total - copied} rows of deleted courses or users')
+
+        # Orders placed before order_date_created existed recur from today; the rebuild above copies them in without one
+        columns = [row[1] for row in conn.exec_driver_sql('PRAGMA table_info("order")')]
+        if columns and 'order_date_created' not in columns:
+            conn.exec_driver_sql('ALTER TABLE "order" ADD COLUMN order_date_created DATETIME')
+        backfilled = conn.exec_driver_sql('UPDATE "order" SET order_date_created = datetime(\'now\') WHERE order_date_created IS NULL').rowcount
+
+        # Seat holds: carts from before them hold nothing
+        columns = [row[1] for row in conn.exec_driver_sql('PRAGMA table_info("course")')]
+        if columns and 'course_held' not in columns:
+            conn.exec_driver_sql('ALTER TABLE course ADD COLUMN course_held INTEGER NOT NULL DEFAULT 0')
+        columns = [row[1] for row in conn.exec_driver_sql('PRAGMA table_info("cart")')]
+        if columns and 'hold_expires' not in columns:
+            conn.exec_driver_sql('ALTER TABLE cart ADD COLUMN hold_expires DATETIME')
+
+        # Orders from before order_price are valued at today's course price
+        columns = [row[1] for row in conn.exec_driver_sql('PRAGMA table_info("order")')]
+        if columns and 'order_price' not in columns:
+            conn.exec_driver_sql('ALTER TABLE "order" ADD COLUMN order_price INTEGER')
+        backfilled += conn.exec_driver_sql(
+            'UPDATE "order" SET order_price = (SELECT course_price FROM course WHERE course.course_id = "order".course_id) '
+            'WHERE order_price IS NULL'
+        ).rowcount
+
+        # Structured slots: rows from before them are matched up below
+        for table in (Cart.__table__, Order.__table__, Waitlist.__table__):
+            columns = [row[1] for row in conn.exec_driver_sql(f'PRAGMA table_info("{table.name}")')]
+            if columns and 'slot_id' not in columns:
+                conn.exec_driver_sql(f'ALTER TABLE "{table.name}" ADD COLUMN slot_id INTEGER REFERENCES course_slot(slot_id) ON DELETE SET NULL')
+
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+        setup_totals(conn)
+        if not course_search.setup(conn):
+            print('SQLite has no FTS5, course search will use the in-memory index')
+    # Backfilled dates and prices move orders between days and revenue figures
+    if new_stats or backfilled:
+        rebuild_stats()
+        print('Enrollment aggregates built from existing orders')
+
+    # Course slots follow the schedule columns, carts/orders/waitlists point at the slot they picked
+    broken = sync_course_slots(db.session.execute(db.select(Course.course_id)).scalars().all())
+    if broken:
+        print(f"Courses with a day or time that doesn't parse: {', '.join(broken)}")
+    slots = {(slot.course_id, slot.weekday, slot.start_minute, slot.end_minute): slot.slot_id for slot in db.session.execute(
+        db.select(CourseSlot.course_id, CourseSlot.weekday, CourseSlot.start_minute, CourseSlot.end_minute, CourseSlot.slot_id)
+    )}
+    for table in (Cart.__table__, Order.__table__, Waitlist.__table__):
+        db.session.execute(db.text(
+            f'UPDATE "{table.name}" SET slot_id = (SELECT slot_id FROM course_slot JOIN course USING (course_id) '
+            f'WHERE course_slot.course_id = "{table.name}".course_id AND CASE course_slot.position '
+            f'WHEN 1 THEN course.course_slot_1_day = "{table.name}".slot_day AND course.course_slot_1_time = "{table.name}".slot_time '
+            f'ELSE course.course_slot_2_day = "{table.name}".slot_day AND course.course_slot_2_time = "{table.name}".slot_time END) '
+            f'WHERE slot_id IS NULL'
+        ))
+        # Then by what the day and time mean, for rows spelled 'Mon' or '9:00 - 12:00' or from before a schedule edit
+        key = next(iter(table.primary_key))
+        matched = []
+        for row in db.session.execute(db.select(key, table.c.course_id, table.c.slot_day, table.c.slot_time).where(table.c.slot_id.is_(None))):
+            parsed = parse_slot(row.slot_day, row.slot_time)
+            slot_id = slots.get((row.course_id, *parsed)) if parsed else None
+            if slot_id is not None:
+                matched.append(dict(row_id=row[0], matched_slot=slot_id))
+        if matched:
+            db.session.execute(
+                db.update(table).where(key == db.bindparam('row_id')).values(slot_id=db.bindparam('matched_slot')),
+                matched,
+            )
+        unmatched = db.session.execute(db.select(db.func.count()).select_from(table).where(table.c.slot_id.is_(None))).scalar()
+        if unmatched and table is Cart.__table__:
+            print(f'cart: {unmatched} items match none of their course\'s slots, checkout keeps them in the cart until the day and time are picked again')
+        elif unmatched:
+            print(f'{table.name}: {unmatched} rows match none of their course\'s slots and are not checked for clashes')
+    db.session.commit()
+    print('Database is up to date')
+
+
+# ---------- Enrollment aggregates (flask --app app rebuild-stats) ---------- #
+@click.command('rebuild-stats')
+@with_appcontext
+@click.option('--check', is_flag=True, help='Only report differences, exit with status 1 if there are any')
+def rebuild_stats_command(check):
+    """Recompute course_stats and daily_stats from the order table and report drift."""
+    report = rebuild_stats(check_only=check)
+    for table, differing in report.items():
+        print(f'{table}: {differing} rows {"differ" if check else "were out of date"}')
+    if check and any(report.values()):
+        sys.exit(1)
+
+
+# ---------- Backups (flask --app app backup-db / restore-db / reset-db) ---------- #
+@click.command('backup-db')
+@with_appcontext
+def backup_db():
+    """Take a compressed online snapshot of the live database into BACKUP_DIR."""
+    result = backups.backup()
+    print(f"{result['path']}: {result['size'] / 1024:.0f} KiB -> {result['compressed'] / 1024:.0f} KiB gzipped, "
+          f"copied in {result['copy_seconds'] * 1000:.0f} ms ({result['restarts']} restarts), {result['seconds'] * 1000:.0f} ms in all")
+
+
+@click.command('restore-db')
+@with_appcontext
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.confirmation_option(prompt='Replace the live database with this snapshot?')
+def restore_db(path):
+    """Copy a snapshot (.db.gz from backup-db, or a plain .db) over the live database."""
+    start = time.perf_counter()
+    backups.restore(path)
+    print(f'Restored {path} in {(time.perf_counter() - start) * 1000:.0f} ms')
+
+
+@click.command('reset-db')
+@with_appcontext
+@click.confirmation_option(prompt='Replace the live database with template.db?')
+def reset_db():
+    """Reset the live database to TEMPLATE_DATABASE (template.db), e.g. between test runs."""
+    start = time.perf_counter()
+    backups.reset()
+    print(f"Reset from {current_app.config['TEMPLATE_DATABASE']} in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+# ---------- Bulk import / export (flask --app app import-courses / export-table) ---------- #
+@click.command('import-courses')
+@with_appcontext
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+def import_courses_command(path):
+    """Upsert courses from a .csv or .jsonl file."""
+    fmt = path.rsplit('.', 1)[-1].lower()
+    if fmt not in FORMATS:
+        raise click.BadParameter('expected a .csv or .jsonl file', param_hint='PATH')
+    with open(path, 'rb') as stream:
+        report = import_courses(read_records(stream, fmt))
+    for line, messages in report['errors']:
+        print(f"line {line}: {'; '.join(messages)}")
+    print(f"Imported {report['inserted']} new and {report['updated']} updated courses, {report['error_count']} rows rejected")
+
+
+@click.command('export-table')
+@with_appcontext
+@click.argument('table', type=click.Choice(sorted(EXPORT_TABLES)))
+@click.argument('path', type=click.Path(dir_okay=False, writable=True))
+def export_table_command(table, path):
+    """Write a table to a .csv or .jsonl file."""
+    fmt = path.rsplit('.', 1)[-1].lower()
+    if fmt not in FORMATS:
+        raise click.BadParameter('expected a .csv or .jsonl file', param_hint='PATH')
+    with open(path, 'w', newline='', encoding='utf-8') as output:
+        for chunk in export_table(read_engine(), EXPORT_TABLES[table].__table__, fmt, current_app.config['EXPORT_BATCH_SIZE']):
+            output.write(chunk)
+
+
+# ---------- Static assets (flask --app app build-assets) ---------- #
+@click.command('build-assets')
+@with_appcontext
+def build_assets_command():
+    """Write resized, fingerprinted and precompressed static files for /assets."""
+    build_assets(current_app.static_folder, current_app.config['ASSET_BUILD_DIR'], current_app.config['ASSET_WIDTHS'])
+    assets.load()
+
+
+# ---------- Chat load test (flask --app app chat-loadtest) ---------- #
+@click.command('chat-loadtest')
+@with_appcontext
+@click.option('--clients', default=50, help='Simulated clients in the room')
+@click.option('--messages', default=10, help='Messages sent by each client')
+def chat_loadtest(clients, messages):
+    """Fan messages out to in-process Socket.IO clients and report latency percentiles.
+
+    Clients are Socket.IO test clients logged in as the first admin, so this
+    measures event handling, history and fan-out, not the network. Messages go
+    to a throwaway room that is deleted afterwards.
+    """
+    app = current_app._get_current_object()
+    room = f'loadtest-{os.getpid()}'
+    admin = User.query.filter_by(type='Admin').first()
+    if admin is None:
+        raise click.ClickException('The load test logs in as an admin, create one first')
+
+    sockets = []
+    for _ in range(clients):
+        http_client = app.test_client()
+        with http_client.session_transaction() as http_session:
+            http_session['_user_id'] = str(admin.id)
+            http_session['_fresh'] = True
+        socket = socketio.test_client(app, namespace='/chat', flask_test_client=http_client)
+        socket.emit('join', {'room': room}, namespace='/chat')
+        socket.get_received('/chat')
+        sockets.append(socket)
+
+    latency = Histogram()
+    start = time.perf_counter()
+    for _ in range(messages):
+        for sender in sockets:
+            sender.emit('send_message', {'room': room, 'message': 'ping'}, namespace='/chat')
+            for socket in sockets:
+                for packet in socket.get_received('/chat'):
+                    if packet['name'] == 'new_message':
+                        latency.record((time.time() - packet['args'][0]['sent_at']) * 1e6)
+    elapsed = time.perf_counter() - start
+
+    flush_start = time.perf_counter()
+    chat_hub.flush()
+    flush_elapsed = time.perf_counter() - flush_start
+    for socket in sockets:
+        socket.disconnect(namespace='/chat')
+    db.session.execute(db.delete(ChatMessage).where(ChatMessage.room == room))
+    db.session.commit()
+
+    sent = clients * messages
+    p50, p90, p99 = latency.percentiles((0.5, 0.9, 0.99))
+    print(f'{sent} messages to {clients} clients, {latency.count} deliveries in {elapsed:.2f}s ({sent / elapsed:.0f} messages/s)')
+    print(f'latency p50 {p50 / 1000:.2f} ms, p90 {p90 / 1000:.2f} ms, p99 {p99 / 1000:.2f} ms, max {latency.max / 1000:.2f} ms')
+    print(f'last batch persisted in {flush_elapsed * 1000:.1f} ms')
+
+
+# ---------- Cart store benchmark (flask --app app cart-benchmark) ---------- #
+@click.command('cart-benchmark')
+@with_appcontext
+@click.option('--users', default=50, help='Users whose carts are filled and emptied')
+@click.option('--rounds', default=10, help='Add, list and remove cycles per user')
+@click.option('--items', default=3, help='Courses per cart')
+def cart_benchmark(users, rounds, items):
+    """Time adding, listing and removing cart items with each cart store backend.
+
+    Every change commits, like a click on Add To Cart or Remove does. Items
+    hold no seats, so only cart storage is measured and seat counts are left
+    alone. Runs as users with an empty cart; their SQLite rows are removed
+    again as part of the cycle.
+    """
+    user_ids = db.session.execute(
+        db.select(User.id).where(~db.select(Cart.cart_id).where(Cart.user_id == User.id).exists()).order_by(User.id).limit(users)
+    ).scalars().all()
+    slots = db.session.execute(
+        db.select(CourseSlot, Course.course_price).join(Course).where(CourseSlot.position == 1).order_by(CourseSlot.course_id).limit(items)
+    ).all()
+    if not user_ids or not slots:
+        raise click.ClickException('Needs users with an empty cart and courses, run flask --app app seed-db first')
+    # Detached, so the commits below don't expire and reload them
+    db.session.expunge_all()
+
+    print(f"{len(user_ids)} users x {rounds} rounds of {len(slots)} adds, 1 listing and {len(slots)} removes")
+    print(f"{'backend':<8} {'ops/s':>9} {'add p50':>9} {'add p99':>9} {'list p50':>9} {'list p99':>9} {'rm p50':>9} {'rm p99':>9}  (ms)")
+    for name, backend_class in CartStore.backends.items():
+        backend = backend_class()
+        timings = dict(add=Histogram(), list=Histogram(), remove=Histogram())
+
+        def timed(operation, action):
+            start = time.perf_counter()
+            action()
+            db.session.commit()
+            timings[operation].record((time.perf_counter() - start) * 1e6)
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for user_id in user_ids:
+                for slot, price in slots:
+                    timed('add', lambda: backend.add(user_id, slot.course_id, slot, price))
+                timed('list', lambda: backend.cart(user_id))
+                for slot, price in slots:
+                    timed('remove', lambda: backend.remove(user_id, [slot.course_id]))
+        elapsed = time.perf_counter() - start
+
+        operations = sum(histogram.count for histogram in timings.values())
+        columns = []
+        for histogram in timings.values():
+            columns += [value / 1000 for value in histogram.percentiles((0.5, 0.99))]
+        print(f"{name:<8} {operations / elapsed:>9.0f} " + ' '.join(f'{value:>9.3f}' for value in columns))
+
+
+# ---------- Cart/order indexes (flask --app app index-benchmark) ---------- #
+@click.command('index-benchmark')
+@with_appcontext
+@click.option('--orders', default=1000000, help='Orders to seed')
+@click.option('--users', default=100000, help='Users the orders are spread over')
+@click.option('--courses', default=1000, help='Courses the orders are spread over')
+@click.option('--queries', default=50, help='Timed lookups per query and run')
+def index_benchmark(orders, users, courses, queries):
+    """Time the per-request cart/order lookups without and with the model's indexes.
+
+    Seeds a scratch database (never database.db) with `orders` orders and a
+    cart item for every tenth, runs each lookup for random users and courses
+    with the cart/order indexes dropped, then again once they are built.
+    """
+    rng = random.Random(1)
+    lookups = (
+        ('orders of a user', db.select(Order.__table__).where(Order.user_id == db.bindparam('user_id'))),
+        ('cart of a user', db.select(Cart.__table__).where(Cart.user_id == db.bindparam('user_id'))),
+        ('user has course', db.select(Order.order_id).where(Order.user_id == db.bindparam('user_id'), Order.course_id == db.bindparam('course_id')).limit(1)),
+        ('orders of a course', db.select(db.func.count()).where(Order.course_id == db.bindparam('course_id'))),
+    )
+    tables = (Order.__table__, Cart.__table__)
+
+    with tempfile.TemporaryDirectory() as folder:
+        engine = create_engine(f"sqlite:///{os.path.join(folder, 'index-benchmark.db')}")
+        db.metadata.create_all(engine)
+        with engine.begin() as conn:
+            for table in tables:
+                for index in table.indexes:
+                    index.drop(conn)
+
+        start = time.perf_counter()
+        raw = engine.raw_connection()
+        try:
+            raw.executemany('INSERT INTO "order" (user_id, course_id, slot_day, slot_time, order_price) VALUES (?, ?, ?, ?, ?)', (
+                (rng.randint(1, users), rng.randint(1, courses), 'Monday', '9:00-11:00', 100) for _ in range(orders)
+            ))
+            raw.executemany('INSERT INTO cart (user_id, course_id, slot_day, slot_time, course_price) VALUES (?, ?, ?, ?, ?)', (
+                (rng.randint(1, users), rng.randint(1, courses), 'Monday', '9:00-11:00', 100) for _ in range(orders // 10)
+            ))
+            raw.commit()
+        finally:
+            raw.close()
+        print(f'{orders} orders and {orders // 10} cart items for {users} users seeded in {time.perf_counter() - start:.1f}s')
+
+        def timed():
+            results = {}
+            with engine.connect() as conn:
+                for name, statement in lookups:
+                    latency = Histogram()
+                    for _ in range(queries):
+                        params = dict(user_id=rng.randint(1, users), course_id=rng.randint(1, courses))
+                        start = time.perf_counter()
+                        conn.execute(statement, params).all()
+                        latency.record((time.perf_counter() - start) * 1e6)
+                    results[name] = [value / 1000 for value in latency.percentiles((0.5, 0.99))]
+            return results
+
+        before = timed()
+        start = time.perf_counter()
+        with engine.begin() as conn:
+            for table in tables:
+                for index in table.indexes:
+                    index.create(conn)
+        print(f'indexes built in {time.perf_counter() - start:.1f}s')
+        after = timed()
+        engine.dispose()
+
+    print(f"{'lookup':<20} {'before p50':>11} {'before p99':>11} {'after p50':>10} {'after p99':>10} {'speedup':>8}  (ms)")
+    for name, statement in lookups:
+        (before_p50, before_p99), (after_p50, after_p99) = before[name], after[name]
+        print(f'{name:<20} {before_p50:>11.3f} {before_p99:>11.3f} {after_p50:>10.3f} {after_p99:>10.3f} {before_p50 / max(after_p50, 0.001):>7.0f}x')
+
+
+# ---------- Course search (flask --app app search-benchmark) ---------- #
+@click.command('search-benchmark')
+@with_appcontext
+@click.option('--courses', default=100000, help='Courses to seed')
+@click.option('--queries', default=20, help='Timed runs of every search and backend')
+@click.option('--seed', type=int, default=1, help='Random seed for the course text')
+def search_benchmark(courses, queries, seed):
+    """Time course searches with the old name LIKE, the FTS5 table and the in-memory index.
+
+    Seeds a scratch database (never database.db) with `courses` courses whose
+    name, description and trainer come from seed-db's pools, then runs the
+    same searches against each backend. LIKE is the search as it was before
+    ranking: a substring of course_name only, so it finds fewer matches.
+    """
+    seeder = Seeder(seed)
+    rng = seeder.random
+    rows = [
+        (course_id, f'{rng.choice(CRAFTS)} {rng.choice(LEVELS)} {course_id}', rng.choice(seeder.sentences), rng.choice(seeder.names))
+        for course_id in range(1, courses + 1)
+    ]
+    # Common and rare words, prefixes, two-word searches and one that matches nothing
+    searches = ['batik', 'song', 'wayang kulit', 'masterclass', rows[0][3].split()[-1], rows[0][2].split()[0], 'zzyzx']
+    like = db.select(Course.course_id).where(Course.course_name.like(db.bindparam('pattern')))
+
+    with tempfile.TemporaryDirectory() as folder:
+        engine = create_engine(f"sqlite:///{os.path.join(folder, 'search-benchmark.db')}")
+        db.metadata.create_all(engine)
+        raw = engine.raw_connection()
+        try:
+            raw.executemany(
+                'INSERT INTO course (course_id, course_name, course_info, course_trainer, course_duration, course_price, course_slot, '
+                'course_order, course_held, course_date_created, course_slot_1_day, course_slot_1_time, course_slot_2_day, course_slot_2_time) '
+                "VALUES (?, ?, ?, ?, 1, 100, 10, 0, 0, CURRENT_TIMESTAMP, 'Monday', '9:00-11:00', 'Friday', '14:00-16:00')", rows,
+            )
+            raw.commit()
+        finally:
+            raw.close()
+
+        fts = CourseSearch()
+        start = time.perf_counter()
+        with engine.begin() as conn:
+            if not fts.setup(conn):
+                raise click.ClickException('This sqlite build has no FTS5')
+        fts_built = time.perf_counter() - start
+
+        # Indexed from rows read back like the catalog's, the same as the fallback does
+        with engine.connect() as conn:
+            documents = conn.execute(db.select(Course.course_id, Course.course_name, Course.course_info, Course.course_trainer)).all()
+        index = CourseSearch()
+        start = time.perf_counter()
+        index.index(documents, 1)
+        index_built = time.perf_counter() - start
+        print(f'{courses} courses; FTS5 table built in {fts_built:.1f}s, in-memory index in {index_built:.1f}s')
+
+        backends = dict(
+            like=lambda conn, text: conn.execute(like, dict(pattern=f'%{text}%')).scalars().all(),
+            fts5=lambda conn, text: fts.match(conn, CourseSearch.tokenize(text)),
+            python=lambda conn, text: index.rank(CourseSearch.tokenize(text)),
+        )
+        print(f"{'search':<16}" + ''.join(f" {name + ' hits':>12} {name + ' p50':>11} {name + ' p99':>11}" for name in backends) + '  (ms)')
+        totals = {name: Histogram() for name in backends}
+        with engine.connect() as conn:
+            for text in searches:
+                line = f'{text:<16}'
+                for name, search in backends.items():
+                    latency = Histogram()
+                    for _ in range(queries):
+                        start = time.perf_counter()
+                        hits = len(search(conn, text))
+                        elapsed = (time.perf_counter() - start) * 1e6
+                        latency.record(elapsed)
+                        totals[name].record(elapsed)
+                    p50, p99 = latency.percentiles((0.5, 0.99))
+                    line += f' {hits:>12} {p50 / 1000:>11.2f} {p99 / 1000:>11.2f}'
+                print(line)
+        engine.dispose()
+
+    line = f"{'all searches':<16}"
+    for histogram in totals.values():
+        p50, p99 = histogram.percentiles((0.5, 0.99))
+        line += f" {'':>12} {p50 / 1000:>11.2f} {p99 / 1000:>11.2f}"
+    print(line)
+
+
+# ---------- Concurrent writes (flask --app app write-benchmark) ---------- #
+# Connection settings before database.py: rollback journal, fsync on every commit, pysqlite's 5 s wait
+ROLLBACK_JOURNAL_PRAGMAS = (('journal_mode', 'DELETE'), ('synchronous', 'FULL'), ('busy_timeout', 5000))
+
+
+def _write_worker(path, pragmas, transactions, courses, users, seed):
+    """One process's checkouts: read the user's orders, then take a seat and insert the order.
+
+    Returns the latency of each committed transaction (us) and how many
+    failed with "database is locked".
+    """
+    rng = random.Random(seed)
+    # Waits for the lock from the first statement on, as database.py's connect_args do
+    conn = sqlite3.connect(path, timeout=dict(pragmas)['busy_timeout'] / 1000, isolation_level=None)
+    # The journal mode was set once on the file; switching it needs the database to itself
+    for name, value in pragmas:
+        if name != 'journal_mode':
+            conn.execute(f'PRAGMA {name}={value}')
+    latencies, locked = [], 0
+    try:
+        for _ in range(transactions):
+            user_id, course_id = rng.randint(1, users), rng.randint(1, courses)
+            start = time.perf_counter()
+            try:
+                conn.execute('SELECT order_id, course_id FROM "order" WHERE user_id = ?', (user_id,)).fetchall()
+                conn.execute('BEGIN')
+                conn.execute(
+                    'UPDATE course SET course_order = course_order + 1 WHERE course_id = ? AND course_order + course_held < course_slot',
+                    (course_id,),
+                )
+                conn.execute(
+                    'INSERT INTO "order" (user_id, course_id, slot_day, slot_time, order_price, order_date_created) '
+                    "VALUES (?, ?, 'Monday', '9:00-11:00', 100, CURRENT_TIMESTAMP)",
+                    (user_id, course_id),
+                )
+                conn.execute('COMMIT')
+            except sqlite3.OperationalError as error:
+                if 'locked' not in str(error):
+                    raise
+                if conn.in_transaction:
+                    conn.execute('ROLLBACK')
+                locked += 1
+                continue
+            latencies.append((time.perf_counter() - start) * 1e6)
+    finally:
+        # Closing rolls back whatever failed midway, so the other processes aren't left waiting on its lock
+        conn.close()
+    return latencies, locked
+
+
+@click.command('write-benchmark')
+@with_appcontext
+@click.option('--processes', default=4, help='Worker processes writing at once')
+@click.option('--transactions', default=500, help='Checkouts per process')
+@click.option('--courses', default=100, help='Courses the checkouts are spread over')
+@click.option('--users', default=1000, help='Users the checkouts are spread over')
+def write_benchmark(processes, transactions, courses, users):
+    """Race checkout-like write transactions from several processes, with and without database.py's tuning.
+
+    Each run gets a fresh scratch database (never database.db). Every
+    transaction reads the user's orders, takes a seat with the guarded UPDATE
+    and inserts the order, like checkout does. Reports committed transactions
+    per second, latency percentiles and "database is locked" failures.
+    """
+    modes = dict(rollback=ROLLBACK_JOURNAL_PRAGMAS, wal=_pragmas(current_app.config))
+    print(f'{processes} processes x {transactions} checkouts over {courses} courses')
+    print(f"{'mode':<10} {'tx/s':>8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8} {'locked':>7}")
+    for mode, pragmas in modes.items():
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'write-benchmark.db')
+            engine = create_engine(f'sqlite:///{path}')
+            db.metadata.create_all(engine)
+            engine.dispose()
+            conn = sqlite3.connect(path)
+            conn.execute(f"PRAGMA journal_mode={dict(pragmas)['journal_mode']}")
+            conn.executemany('INSERT INTO user (id, username, email, password) VALUES (?, ?, ?, ?)', (
+                (user_id, f'writer{user_id}', f'writer{user_id}@example.com', '') for user_id in range(1, users + 1)
+            ))
+            conn.executemany(
+                'INSERT INTO course (course_id, course_name, course_info, course_trainer, course_duration, course_price, course_slot, '
+                'course_order, course_held, course_date_created, course_slot_1_day, course_slot_1_time, course_slot_2_day, course_slot_2_time) '
+                "VALUES (?, ?, '', '', 1, 100, ?, 0, 0, CURRENT_TIMESTAMP, 'Monday', '9:00-11:00', 'Friday', '14:00-16:00')",
+                # Never full, so every checkout writes
+                ((course_id, f'Course {course_id}', processes * transactions) for course_id in range(1, courses + 1)),
+            )
+            conn.commit()
+            conn.close()
+
+            start = time.perf_counter()
+            with ProcessPoolExecutor(processes) as pool:
+                results = list(pool.map(
+                    _write_worker, [path] * processes, [pragmas] * processes, [transactions] * processes,
+                    [courses] * processes, [users] * processes, range(processes),
+                ))
+            elapsed = time.perf_counter() - start
+
+        latency = Histogram()
+        for latencies, locked in results:
+            for value in latencies:
+                latency.record(value)
+        locked = sum(locked for latencies, locked in results)
+        p50, p90, p99 = (value / 1000 for value in latency.percentiles((0.5, 0.9, 0.99)))
+        print(f'{mode:<10} {latency.count / elapsed:>8.0f} {p50:>8.2f} {p90:>8.2f} {p99:>8.2f} {latency.max / 1000:>8.2f} {locked:>7}')
+
+
+# ---------- Password hashing (flask --app app password-benchmark) ---------- #
+@click.command('password-benchmark')
+@with_appcontext
+@click.option('--logins', default=32, help='Password checks per cost and executor')
+@click.option('--workers', default=os.cpu_count() or 1, help='Pool size, as PASSWORD_POOL_SIZE')
+def password_benchmark(logins, workers):
+    """Report logins/s per core and with the process and thread pools, at a few KDF costs.
+
+    Every login is one verify() of a hash made at that cost through
+    CredentialService, with up to PASSWORD_MAX_PENDING of them waiting at
+    once like a burst of login requests. The inline run is one core's worth.
+    """
+    costs = (
+        ('scrypt', dict(PASSWORD_METHOD='scrypt', PASSWORD_SCRYPT_COST=(2 ** 14, 8, 1))),
+        ('scrypt', dict(PASSWORD_METHOD='scrypt', PASSWORD_SCRYPT_COST=(2 ** 15, 8, 1))),
+        ('scrypt', dict(PASSWORD_METHOD='scrypt', PASSWORD_SCRYPT_COST=(2 ** 16, 8, 1))),
+        ('pbkdf2', dict(PASSWORD_METHOD='pbkdf2', PASSWORD_PBKDF2_ITERATIONS=300000)),
+        ('pbkdf2', dict(PASSWORD_METHOD='pbkdf2', PASSWORD_PBKDF2_ITERATIONS=600000)),
+    )
+    executors = (('inline', dict(PASSWORD_POOL_SIZE=0)), ('process', dict(PASSWORD_EXECUTOR='process')), ('thread', dict(PASSWORD_EXECUTOR='thread')))
+
+    print(f'{logins} logins per run, pools of {workers}')
+    print(f"{'method':<26} " + ' '.join(f"{executor + ' /s':>11} {'p99 ms':>8}" for executor, options in executors))
+    for name, cost in costs:
+        results = []
+        for executor, options in executors:
+            probe = Flask(__name__)
+            probe.config.update(current_app.config)
+            probe.config.update(PASSWORD_POOL_SIZE=workers, PASSWORD_MAX_PENDING=4 * workers, **cost)
+            probe.config.update(options)
+            service = CredentialService(probe)
+            stored = service.hash('correct horse')
+            latency = Histogram()
+
+            def login(_):
+                start = time.perf_counter()
+                service.verify(stored, 'correct horse')
+                latency.record((time.perf_counter() - start) * 1e6)
+
+            start = time.perf_counter()
+            if probe.config['PASSWORD_POOL_SIZE']:
+                with ThreadPoolExecutor(probe.config['PASSWORD_MAX_PENDING']) as requests:
+                    list(requests.map(login, range(logins)))
+            else:
+                for index in range(logins):
+                    login(index)
+            elapsed = time.perf_counter() - start
+            service.shutdown()
+            results.append(f'{logins / elapsed:>11.1f} {latency.percentiles((0.99,))[0] / 1000:>8.0f}')
+        print(f'{service.method:<26} ' + ' '.join(results))
+
+
+# ---------- Template rendering (flask --app app render-benchmark) ---------- #
+@click.command('render-benchmark')
+@with_appcontext
+@click.option('--courses', default=1000, help='Courses in the rendered table')
+@click.option('--renders', default=20, help='Timed renders per case')
+def render_benchmark(courses, renders):
+    """Time the course table for `courses` courses rendered in full and served from the fragment cache.
+
+    Rows are synthetic, shaped like the catalog's, so database.db is not
+    read. Also times compiling the templates in a fresh environment, as a new
+    worker does, without and with the on-disk bytecode cache.
+    """
+    Row = namedtuple('Row', [column.name for column in Course.__table__.columns if column.name not in catalog.seat_columns])
+    rows = [Row(
+        course_id=course_id, course_name=f'Course {course_id}', course_duration=3, course_price=100 + course_id % 400,
+        course_slot=30, course_trainer=f'Trainer {course_id % 50}', course_date_created=datetime(2024, 1, 1),
+        course_info='A hands-on introduction to a traditional Malaysian craft. ' * 3, course_slot_1_day='Monday',
+        course_slot_1_time='9:00-12:00', course_slot_2_day='Thursday', course_slot_2_time='14:00-17:00',
+    ) for course_id in range(1, courses + 1)]
+    templates = ('course.html', 'dashboard.html', 'myplan.html', 'Includes/course_rows.html', 'Includes/items_modals.html')
+
+    def timed(action):
+        latency = Histogram()
+        for _ in range(renders):
+            start = time.perf_counter()
+            action()
+            latency.record((time.perf_counter() - start) * 1e6)
+        return [value / 1000 for value in latency.percentiles((0.5, 0.99))]
+
+    results = {}
+    with current_app.test_request_context('/course'):
+        results['course rows, rendered'] = timed(lambda: render_course_rows(rows))
+        key = ('render-benchmark', courses)
+        render_course_rows(rows, key)
+        results['course rows, cached'] = timed(lambda: render_course_rows(rows, key))
+
+    def compile_all(bytecode_cache):
+        # No template cache, so every renders pass loads each template anew, like a fresh worker
+        env = current_app.jinja_env.overlay(cache_size=0, bytecode_cache=bytecode_cache)
+        for name in templates:
+            env.get_template(name)
+
+    with tempfile.TemporaryDirectory() as folder:
+        bytecode_cache = FileSystemBytecodeCache(folder)
+        results['compile, no bytecode'] = timed(lambda: compile_all(None))
+        compile_all(bytecode_cache)
+        results['compile, bytecode'] = timed(lambda: compile_all(bytecode_cache))
+
+    print(f'{courses} courses, {renders} renders per case; compiling {len(templates)} templates')
+    print(f"{'case':<24} {'p50 ms':>9} {'p99 ms':>9}")
+    for name, (p50, p99) in results.items():
+        print(f'{name:<24} {p50:>9.2f} {p99:>9.2f}')
+
+
+# ---------- Boot time (flask --app app startup-benchmark) ---------- #
+STARTUP_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+application = app.create_app()
+created = time.perf_counter()
+status = application.test_client().get(sys.argv[1]).status_code
+served = time.perf_counter()
+print(json.dumps(dict(status=status, imported=imported - start, created=created - imported, first_request=served - created)))
+"""
+
+
+@click.command('startup-benchmark')
+@click.option('--runs', default=5, help='Fresh interpreters to boot')
+@click.option('--path', default='/', help='URL of the first request')
+@click.option('--imports', default=10, help='Slowest imports to list (0 to skip)')
+@with_appcontext
+def startup_benchmark(runs, path, imports):
+    """Boot the app in fresh interpreters and report import, create_app() and first request times.
+
+    Each run is a new process, like a freshly forked gunicorn worker that
+    has not preloaded the app, so nothing is warm except the OS file cache.
+    """
+    results = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        output = subprocess.run(
+            [sys.executable, '-c', STARTUP_PROBE, path],
+            cwd=current_app.root_path, capture_output=True, text=True, check=True,
+        ).stdout
+        result = json.loads(output.splitlines()[-1])
+        result['total'] = time.perf_counter() - start
+        results.append(result)
+
+    print(f"{runs} boots, first request {path} -> {results[0]['status']}")
+    for name in ('imported', 'created', 'first_request', 'total'):
+        values = [result[name] * 1000 for result in results]
+        print(f'{name:>14}: median {statistics.median(values):7.1f} ms, min {min(values):7.1f} ms, max {max(values):7.1f} ms')
+
+    if imports:
+        # -X importtime lines: "import time: self [us] | cumulative | imported package", summed per top-level package
+        stderr = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', 'import app; app.create_app()'],
+            cwd=current_app.root_path, capture_output=True, text=True, check=True,
+        ).stderr
+        packages = {}
+        for line in stderr.splitlines():
+            fields = line.split('|')
+            if len(fields) == 3 and fields[1].strip().isdigit():
+                package = fields[2].strip().split('.')[0]
+                packages[package] = packages.get(package, 0) + int(fields[0].split(':')[1])
+        print('slowest packages to import (self time):')
+        for package, elapsed in sorted(packages.items(), key=lambda item: -item[1])[:imports]:
+            print(f'  {elapsed / 1000:7.1f} ms  {package}')
+
+
+# ---------- Synthetic data (flask --app app seed-db) ---------- #
+@click.command('seed-db')
+@with_appcontext
+@click.option('--users', default=1000, help='Users to add')
+@click.option('--courses', default=100, help='Courses to add')
+@click.option('--orders', default=5000, help='Registrations to add (capped by the seats of the new courses)')
+@click.option('--carts', default=500, help='Cart items to add')
+@click.option('--feedbacks', default=1000, help='Feedback entries to add')
+@click.option('--seed', type=int, help='Random seed, for the same data on every run')
+@click.option('--batch-size', default=10000, help='Rows per INSERT transaction')
+def seed_db(users, courses, orders, carts, feedbacks, seed, batch_size):
+    """Add fake users, courses, orders, carts and feedback to the database.
+
+    Seeded users log in with the password in seeding.SEED_PASSWORD, which
+    is what load-test expects.
+    """
+    start = time.perf_counter()
+    report = Seeder(seed, batch_size).seed(users, courses, orders, carts, feedbacks)
+    elapsed = time.perf_counter() - start
+    print(', '.join(f'{count} {name}' for name, count in report.items()))
+    print(f'{sum(report.values())} rows in {elapsed:.1f}s ({sum(report.values()) / elapsed:.0f} rows/s)')
+
+
+# ---------- End-to-end load test (flask --app app load-test) ---------- #
+@click.command('load-test')
+@with_appcontext
+@click.option('--users', default=20, help='Seeded users to run journeys as')
+@click.option('--iterations', default=3, help='Journeys per user')
+@click.option('--concurrency', default=4, help='Threads running journeys at once')
+@click.option('--seed', type=int, help='Random seed for the courses picked')
+@click.option('--output', type=click.Path(dir_okay=False, writable=True), help='Save the results as JSON')
+@click.option('--baseline', type=click.Path(exists=True, dir_okay=False), help='Results JSON of an earlier run to compare with')
+def load_test(users, iterations, concurrency, seed, output, baseline):
+    """Drive login, course, add to cart, checkout and unregister and report per-route latency.
+
+    Needs users added by seed-db. Results record the git commit, so runs
+    saved with --output can be compared across commits with --baseline.
+    """
+    test = LoadTest(current_app._get_current_object(), users, iterations, concurrency, seed)
+    if not test.users:
+        raise click.ClickException('No seeded users with an empty cart, run flask --app app seed-db first')
+    results = test.run()
+    commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=current_app.root_path, capture_output=True, text=True)
+    results = dict(commit=commit.stdout.strip() or None, started=datetime.utcnow().isoformat(timespec='seconds'), **results)
+
+    print(f"{results['requests']} requests from {results['users']} users x {iterations} journeys on {concurrency} threads "
+          f"in {results['elapsed']:.2f}s ({results['throughput']:.1f} requests/s, {results['errors']} errors)")
+    print(f"{'route':<26} {'count':>6} {'errors':>6} {'req/s':>7} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for label, route in results['routes'].items():
+        print(f"{label:<26} {route['count']:>6} {route['errors']:>6} {route['throughput']:>7.1f} "
+              f"{route['p50_ms']:>8.2f} {route['p90_ms']:>8.2f} {route['p99_ms']:>8.2f} {route['max_ms']:>8.2f}")
+
+    if baseline:
+        with open(baseline, encoding='utf-8') as f:
+            before = json.load(f)
+        print(f"against {baseline} ({before.get('commit')}): throughput {results['throughput'] / before['throughput'] - 1:+.1%}")
+        for label, route in results['routes'].items():
+            if label in before['routes']:
+                old = before['routes'][label]
+                print(f"{label:<26} p50 {route['p50_ms'] / old['p50_ms'] - 1:+7.1%}   p99 {route['p99_ms'] / old['p99_ms'] - 1:+7.1%}")
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+def init_app(app):
+    for command in (init_db, migrate_db, backup_db, restore_db, reset_db, rebuild_stats_command, import_courses_command, export_table_command, build_assets_command, chat_loadtest, cart_benchmark, index_benchmark, search_benchmark, write_benchmark, password_benchmark, render_benchmark, startup_benchmark, seed_db, load_test):
+        app.cli.add_command(command)
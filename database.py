@@ -0,0 +1,69 @@
+from flask import current_app
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import QueuePool
+
+
+# ---------- Connection PRAGMAs ---------- #
+def _pragmas(config):
+    return (
+        ('journal_mode', 'WAL'),                          # readers never block the writer
+        ('synchronous', 'NORMAL'),                        # fsync at checkpoints only, safe under WAL
+        ('busy_timeout', config['SQLITE_BUSY_TIMEOUT_MS']),  # wait for the write lock instead of "database is locked"
+        ('mmap_size', config['SQLITE_MMAP_SIZE']),        # read pages through mmap instead of read()
+        ('foreign_keys', 'ON'),
+        ('temp_store', 'MEMORY'),
+    )
+
+
+def _engine_options(config, pool_size, max_overflow):
+    return dict(
+        poolclass=QueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=config['SQLITE_POOL_TIMEOUT'],
+        # Connections are handed between request threads
+        connect_args={'check_same_thread': False, 'timeout': config['SQLITE_BUSY_TIMEOUT_MS'] / 1000},
+    )
+
+
+def _on_connect(config, read_only):
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in _pragmas(config):
+            cursor.execute(f'PRAGMA {name}={value}')
+        if read_only:
+            cursor.execute('PRAGMA query_only=ON')
+        cursor.close()
+    return set_pragmas
+
+
+# ---------- Bootstrap ---------- #
+def init_sqlite(app, db):
+    """Tune every SQLite connection and build the read-only pool.
+
+    Must run before anything touches db.engine. Returns the read-only engine,
+    meant for the catalog and feedback reads so they never queue behind
+    checkout writes for a pooled connection.
+    """
+    config = app.config
+    config.setdefault('SQLITE_BUSY_TIMEOUT_MS', 5000)
+    config.setdefault('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)
+    config.setdefault('SQLITE_POOL_SIZE', 5)
+    config.setdefault('SQLITE_MAX_OVERFLOW', 10)
+    config.setdefault('SQLITE_READ_POOL_SIZE', 5)
+    config.setdefault('SQLITE_POOL_TIMEOUT', 30)
+    config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', _engine_options(config, config['SQLITE_POOL_SIZE'], config['SQLITE_MAX_OVERFLOW']))
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'connect', _on_connect(config, read_only=False))
+
+    read_engine = create_engine(engine.url, **_engine_options(config, config['SQLITE_READ_POOL_SIZE'], config['SQLITE_MAX_OVERFLOW']))
+    event.listen(read_engine, 'connect', _on_connect(config, read_only=True))
+    app.extensions['sqlite_read_engine'] = read_engine
+    return read_engine
+
+
+def read_engine():
+    """The current app's read-only engine."""
+    return current_app.extensions['sqlite_read_engine']
@@ -0,0 +1,26 @@
+from flask_bootstrap import Bootstrap
+from flask_sqlalchemy import SQLAlchemy
+from flask_login import LoginManager
+from flask_socketio import SocketIO
+from metrics import RequestMetrics
+from passwords import CredentialService
+from assets import Assets
+from caching import PageCache
+from ratelimit import RateLimiter
+
+
+# ---------- Unbound extensions, bound to the app in create_app() ---------- #
+bootstrap = Bootstrap()
+db = SQLAlchemy()
+login_manager = LoginManager()
+request_metrics = RequestMetrics()
+# scrypt hashing & verification in a bounded process pool
+credentials = CredentialService()
+# Chat fan-out; runs on the eventlet worker from the Procfile
+socketio = SocketIO()
+# Fingerprinted, precompressed static files under /assets (flask build-assets)
+assets = Assets()
+# ETags & 304s for pages, checked before the user is loaded
+page_cache = PageCache()
+# Token-bucket limits on routes (login, signup), checked before the view runs
+limiter = RateLimiter()
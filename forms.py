@@ -0,0 +1,77 @@
+from flask_wtf import FlaskForm
+from flask_wtf.file import FileField, FileRequired, FileAllowed
+from wtforms import StringField, IntegerField, PasswordField, BooleanField, SubmitField
+from wtforms.validators import InputRequired, Email, Length, NumberRange, ValidationError
+from timetable import parse_weekday, parse_time_range
+
+
+# ---------- Login ---------- #
+class LoginForm(FlaskForm):
+    email = StringField('Email', validators=[InputRequired(), Email(message='Invalid Email'), Length(max= 50)])
+    password = PasswordField('Password', validators=[InputRequired(), Length(min=8, max=80)])
+    remember = BooleanField('Remember me')
+
+
+# ---------- Register ---------- #
+class RegisterForm(FlaskForm):
+    username = StringField('Username', validators=[InputRequired(), Length(min=4, max=15)])
+    password = PasswordField('Password', validators=[InputRequired(), Length(min=8, max=80)])
+    email = StringField('Email', validators=[InputRequired(), Email(message='Invalid Email'), Length(max= 50)])
+    
+
+# ---------- Course schedule ---------- #
+def weekday(form, field):
+    if parse_weekday(field.data) is None:
+        raise ValidationError('Enter a day of the week, e.g. Monday')
+
+
+def time_range(form, field):
+    if parse_time_range(field.data) is None:
+        raise ValidationError('Enter a time range, e.g. 9:00-12:00')
+
+
+# ---------- Create Course ---------- #
+class CourseForm(FlaskForm):
+    course_name = StringField('Course Name', validators=[InputRequired(), Length(min=2, max=30)])
+    course_duration = IntegerField('Course Duration (month)', validators=[InputRequired(), NumberRange(min=1, max=24, message='Invalid number')])
+    course_price = IntegerField('Price', validators=[InputRequired(), NumberRange(min=1, max=100000, message='Invalid number')])
+    course_slot = IntegerField('Slots', validators=[InputRequired(), NumberRange(min=1, max=1000, message='Invalid number')])
+    course_trainer = StringField('Trainer Name', validators=[InputRequired(), Length(min=2, max=50)])
+    course_info = StringField('Course Description', validators=[InputRequired(), Length(max=700)])
+    course_slot_1_day = StringField('Slot 1 Day', validators=[InputRequired(), Length(min=2, max=20), weekday])
+    course_slot_1_time = StringField('Slot 1 Time', validators=[InputRequired(), Length(min=2, max=20), time_range])
+    course_slot_2_day = StringField('Slot 2 Day', validators=[InputRequired(), Length(min=2, max=20), weekday])
+    course_slot_2_time = StringField('Slot 2 Time', validators=[InputRequired(), Length(min=2, max=20), time_range])
+
+
+# ---------- Bulk Course Import ---------- #
+class ImportForm(FlaskForm):
+    file = FileField('Courses file', validators=[FileRequired('Choose a file to import'), FileAllowed(['csv', 'jsonl'], 'Choose a .csv or .jsonl file to import')])
+    submit = SubmitField('Import')
+
+
+# ---------- Delete Course (admin, one per course row) ---------- #
+class DeleteCourseForm(FlaskForm):
+    submit = SubmitField('Delete')
+
+
+# ---------- Search Bar ---------- #
+class SearchForm(FlaskForm):
+    search = StringField("Search")
+    submit = SubmitField("Submit")
+
+
+# ---------- Purchase Course ---------- #
+class PurchaseCourseForm(FlaskForm):
+    submit = SubmitField('Register')
+
+
+# ---------- Database backup (admin dashboard) ---------- #
+class BackupForm(FlaskForm):
+    submit = SubmitField('Back up now')
+
+
+# ---------- Feedback Form ---------- #
+class FeedbackForm(FlaskForm):
+    feedback = StringField("Kindly leave your feedbacks here <3")
+    submit = SubmitField("Submit")
@@ -0,0 +1,14 @@
+# Read by gunicorn from the working directory, so the Procfile's web process picks it up
+import os
+
+
+def on_starting(server):
+    # Memory carts live in one worker's process: a second worker would show each user whichever cart it happens to hold
+    if os.environ.get('CART_STORE') == 'memory' and server.cfg.workers > 1:
+        raise RuntimeError(f'CART_STORE=memory keeps carts in one process, run a single worker (got {server.cfg.workers})')
+
+
+def worker_exit(server, worker):
+    # atexit handlers don't run once an eventlet worker hangs on exit, so flush queued writes and stop pools here
+    from app import shutdown
+    shutdown()
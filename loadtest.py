@@ -0,0 +1,124 @@
+from extensions import db
+from models import User, Course, Order
+from carts import cart_store
+from metrics import Histogram
+from seeding import SEED_PASSWORD, SEED_EMAIL_DOMAIN
+from urllib.parse import urlsplit
+import threading
+import random
+import time
+import re
+
+
+CSRF_FIELD = re.compile(r'name="csrf_token" type="hidden" value="([^"]+)"')
+
+
+# ---------- End-to-end load test (flask --app app load-test) ---------- #
+class LoadTest:
+    """Scripted user journeys through the WSGI app, timed per route.
+
+    Each journey logs a seeded user in, browses the course page, adds a
+    course to the cart, checks out, unregisters and logs out. Redirects are
+    followed and pages revalidated with their ETags, like a browser would.
+    Virtual users are split over `concurrency` threads with a test client
+    each, so this measures the app and SQLite, not a server or the network.
+    """
+
+    quantiles = (0.5, 0.9, 0.99)
+
+    def __init__(self, app, users=20, iterations=3, concurrency=4, seed=None):
+        self.app = app
+        self.iterations = iterations
+        self.concurrency = concurrency
+        self.random = random.Random(seed)
+        self.routes = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+        with app.app_context():
+            # Seeded users with an empty cart, so checkout only registers what the journey added
+            seeded = db.session.execute(
+                db.select(User.id, User.email).where(User.email.like(f'%@{SEED_EMAIL_DOMAIN}')).order_by(User.id)
+            )
+            self.users = []
+            for user in seeded:
+                if len(self.users) == users:
+                    break
+                if not cart_store.cart(user.id)[0]:
+                    self.users.append(user)
+            self.owned = {user.id: set() for user in self.users}
+            for user_id, course_name in db.session.execute(
+                db.select(Order.user_id, Course.course_name).join(Course).where(Order.user_id.in_(list(self.owned)))
+            ):
+                self.owned[user_id].add(course_name)
+            self.courses = db.session.execute(
+                db.select(Course.course_name, Course.course_slot_1_day, Course.course_slot_1_time)
+                .where(Course.course_order + Course.course_held < Course.course_slot)
+            ).all()
+
+    def _record(self, label, elapsed, ok):
+        with self._lock:
+            if label not in self.routes:
+                self.routes[label] = Histogram()
+                self.errors[label] = 0
+            self.routes[label].record(elapsed * 1e6)
+            if not ok:
+                self.errors[label] += 1
+
+    def _request(self, client, etags, method, path, label=None, data=None):
+        label = label or f'{method} {path}'
+        headers = {'If-None-Match': etags[path]} if method == 'GET' and path in etags else {}
+        start = time.perf_counter()
+        response = client.open(path, method=method, data=data, headers=headers)
+        self._record(label, time.perf_counter() - start, response.status_code in ((302,) if method == 'POST' else (200, 302, 304)))
+        if response.headers.get('ETag'):
+            etags[path] = response.headers['ETag']
+        if response.status_code == 302:
+            return self._request(client, etags, 'GET', urlsplit(response.location).path)
+        return response
+
+    def _journey(self, client, etags, user):
+        # Each virtual user comes from its own address, as login is rate limited per IP
+        client.environ_base['REMOTE_ADDR'] = f'10.{user.id >> 16 & 255}.{user.id >> 8 & 255}.{user.id & 255}'
+        page = self._request(client, etags, 'GET', '/login')
+        token = CSRF_FIELD.search(page.get_data(as_text=True))
+        self._request(client, etags, 'POST', '/login', data=dict(
+            email=user.email, password=SEED_PASSWORD, csrf_token=token.group(1) if token else '',
+        ))
+        self._request(client, etags, 'GET', '/course')
+        choices = [course for course in self.courses if course.course_name not in self.owned[user.id]]
+        if choices:
+            name, day, slot_time = self.random.choice(choices)
+            self._request(client, etags, 'POST', '/course', 'POST /course add_cart', data=dict(add_cart=name, day=day, time=slot_time))
+            self._request(client, etags, 'POST', '/course', 'POST /course checkout', data=dict(checkout='Checkout'))
+            self._request(client, etags, 'POST', '/course', 'POST /course unregister', data=dict(unregister=name))
+        self._request(client, etags, 'GET', '/logout')
+
+    def _worker(self, users):
+        client = self.app.test_client()
+        etags = {}
+        for _ in range(self.iterations):
+            for user in users:
+                self._journey(client, etags, user)
+
+    def run(self):
+        """Run every journey and return overall and per-route throughput and latency (ms)."""
+        threads = [threading.Thread(target=self._worker, args=(self.users[i::self.concurrency],)) for i in range(self.concurrency)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        routes = {}
+        for label, histogram in sorted(self.routes.items()):
+            p50, p90, p99 = (value / 1000 for value in histogram.percentiles(self.quantiles))
+            routes[label] = dict(
+                count=histogram.count, errors=self.errors[label], throughput=histogram.count / elapsed,
+                mean_ms=histogram.total / histogram.count / 1000, p50_ms=p50, p90_ms=p90, p99_ms=p99, max_ms=histogram.max / 1000,
+            )
+        requests = sum(route['count'] for route in routes.values())
+        return dict(
+            users=len(self.users), iterations=self.iterations, concurrency=self.concurrency, elapsed=elapsed,
+            requests=requests, errors=sum(self.errors.values()), throughput=requests / elapsed, routes=routes,
+        )
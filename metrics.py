@@ -0,0 +1,184 @@
+from flask import g, request, abort, has_request_context
+from flask_login import current_user, login_required
+from sqlalchemy import event
+import threading
+import time
+
+
+# ---------- HDR-style histogram ---------- #
+class Histogram:
+    """Log-linear histogram of microsecond values.
+
+    Every power of two is split into 16 linear sub-buckets, so any recorded
+    value is reported within ~6% while memory stays a few hundred counters.
+    """
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.max = 0
+        self._lock = threading.Lock()
+
+    def _bucket(self, value):
+        magnitude = max(value.bit_length() - 5, 0)
+        return (magnitude, value >> magnitude)
+
+    def _value(self, bucket):
+        magnitude, sub_bucket = bucket
+        # Upper edge of the bucket, so percentiles never under-report
+        return ((sub_bucket + 1) << magnitude) - 1
+
+    def record(self, value):
+        value = max(int(value), 0)
+        bucket = self._bucket(value)
+        with self._lock:
+            self.counts[bucket] = self.counts.get(bucket, 0) + 1
+            self.count += 1
+            self.total += value
+            self.max = max(self.max, value)
+
+    def percentiles(self, quantiles):
+        with self._lock:
+            buckets = sorted(self.counts.items())
+            count = self.count
+        results = []
+        for quantile in quantiles:
+            target = quantile * count
+            seen = 0
+            value = 0
+            for bucket, bucket_count in buckets:
+                seen += bucket_count
+                value = self._value(bucket)
+                if seen >= target:
+                    break
+            results.append(min(value, self.max))
+        return results
+
+
+# ---------- Per-route request metrics ---------- #
+class RequestMetrics:
+    """Opt-in per-route query count, DB time, render time and latency.
+
+    Hooks SQLAlchemy engine events, Flask before/after_request and the Jinja
+    template class. Numbers are per worker process; /admin/metrics serves
+    them in Prometheus text format to admins only.
+    """
+
+    quantiles = (0.5, 0.9, 0.99)
+    series = (
+        ('latency', 'app_request_latency_seconds', 'Total request latency', 1e-6),
+        ('db', 'app_request_db_seconds', 'Time spent in SQL per request', 1e-6),
+        ('render', 'app_request_render_seconds', 'Time spent rendering templates per request', 1e-6),
+        ('queries', 'app_request_queries', 'SQL statements per request', 1),
+    )
+
+    def __init__(self, app=None, db=None):
+        self.app = None
+        self.routes = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        app.config.setdefault('METRICS_ENABLED', False)
+        app.config.setdefault('SLOW_REQUEST_MS', 500)
+        app.config.setdefault('SLOW_REQUEST_MAX_STATEMENTS', 50)
+        # Left unset when off, so watch() adds no engine listeners either
+        self.app = None
+        if not app.config['METRICS_ENABLED']:
+            return
+
+        self.app = app
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.add_url_rule('/admin/metrics', 'metrics', login_required(self.view))
+
+        with app.app_context():
+            self.watch(db.engine)
+
+        metrics = self
+
+        class TimedTemplate(app.jinja_env.template_class):
+            def render(self, *args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return super().render(*args, **kwargs)
+                finally:
+                    current = metrics._current()
+                    if current is not None:
+                        current['render'] += time.perf_counter() - start
+
+        app.jinja_env.template_class = TimedTemplate
+
+    def watch(self, engine):
+        """Also count statements run on another engine, e.g. the read-only pool."""
+        if self.app is None:
+            return
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def _current(self):
+        return g.get('_request_metrics') if has_request_context() else None
+
+    # ---------- Hooks ---------- #
+    def _start(self):
+        g._request_metrics = dict(start=time.perf_counter(), queries=0, db=0.0, render=0.0, statements=[])
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_start'].pop()
+        current = self._current()
+        if current is not None:
+            current['queries'] += 1
+            current['db'] += elapsed
+            if len(current['statements']) < self.app.config['SLOW_REQUEST_MAX_STATEMENTS']:
+                current['statements'].append((elapsed, statement))
+
+    def _finish(self, response):
+        current = self._current()
+        if current is None:
+            return response
+        latency = time.perf_counter() - current['start']
+        route = request.endpoint or 'unmatched'
+
+        with self._lock:
+            histograms = self.routes.get(route)
+            if histograms is None:
+                histograms = self.routes[route] = {name: Histogram() for name, *_ in self.series}
+        histograms['latency'].record(latency * 1e6)
+        histograms['db'].record(current['db'] * 1e6)
+        histograms['render'].record(current['render'] * 1e6)
+        histograms['queries'].record(current['queries'])
+
+        if latency * 1000 >= self.app.config['SLOW_REQUEST_MS']:
+            statements = '\n'.join(f'  {elapsed * 1000:8.2f} ms  {statement}' for elapsed, statement in current['statements'])
+            self.app.logger.warning(
+                'Slow request %s %s (%s): %.1f ms total, %d queries in %.1f ms, render %.1f ms\n%s',
+                request.method, request.path, route, latency * 1000,
+                current['queries'], current['db'] * 1000, current['render'] * 1000, statements,
+            )
+        return response
+
+    # ---------- Prometheus text format ---------- #
+    def render(self):
+        lines = []
+        with self._lock:
+            routes = sorted(self.routes.items())
+        for name, metric, help_text, scale in self.series:
+            lines.append(f'# HELP {metric} {help_text}')
+            lines.append(f'# TYPE {metric} summary')
+            for route, histograms in routes:
+                histogram = histograms[name]
+                for quantile, value in zip(self.quantiles, histogram.percentiles(self.quantiles)):
+                    lines.append(f'{metric}{{route="{route}",quantile="{quantile}"}} {value * scale:g}')
+                lines.append(f'{metric}_sum{{route="{route}"}} {histogram.total * scale:g}')
+                lines.append(f'{metric}_count{{route="{route}"}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+    def view(self):
+        if current_user.type != 'Admin':
+            abort(403)
+        return self.render(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
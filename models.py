@@ -0,0 +1,216 @@
+from flask_login import UserMixin
+from extensions import db
+from datetime import datetime
+import calendar
+
+
+# ---------- User ---------- #
+class User(UserMixin, db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    type = db.Column(db.String(10), default='User')
+    username = db.Column(db.String(50), nullable=False)
+    email = db.Column(db.String(50), nullable=False, unique=True)
+    password = db.Column(db.String(200), nullable=False)
+    cart = db.relationship('Cart', order_by='Cart.cart_id')
+    orders = db.relationship('Order', order_by='Order.order_id')
+    waitlist = db.relationship('Waitlist', order_by='Waitlist.waitlist_id')
+    
+    def __repr__(self):
+        return f'{self.username}'
+
+
+# ---------- Course ---------- #
+class Course(db.Model):
+    course_id = db.Column(db.Integer, primary_key=True)
+    course_name = db.Column(db.String(50), nullable=False, unique=True)
+    course_duration = db.Column(db.Integer, nullable=False)
+    course_price = db.Column(db.Integer, nullable=False)
+    course_slot = db.Column(db.Integer, nullable=False)
+    course_trainer = db.Column(db.String(50), nullable=False)
+    course_order = db.Column(db.Integer, default=0)
+    # Seats reserved by carts (SeatHolds), counted against course_slot with course_order
+    course_held = db.Column(db.Integer, nullable=False, default=0)
+    course_date_created = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    course_info = db.Column(db.String(200), nullable=False)
+    course_slot_1_day = db.Column(db.String, nullable=False)
+    course_slot_1_time = db.Column(db.String, nullable=False)
+    course_slot_2_day = db.Column(db.String, nullable=False)
+    course_slot_2_time = db.Column(db.String, nullable=False)
+
+    # Filter By (price / slot) sorts on these
+    __table_args__ = (
+        db.Index('ix_course_course_price', 'course_price'),
+        db.Index('ix_course_course_slot', 'course_slot'),
+    )
+
+    def __repr__(self):
+        return f'{ self.course_name }'
+
+
+# ---------- Course Slot ---------- #
+class CourseSlot(db.Model):
+    # Typed copy of course_slot_N_day / course_slot_N_time, kept in step by timetable.sync_course_slots()
+    slot_id = db.Column(db.Integer, primary_key=True)
+    course_id = db.Column(db.Integer, db.ForeignKey('course.course_id', ondelete='CASCADE'), nullable=False)
+    position = db.Column(db.Integer, nullable=False)        # 1 or 2
+    weekday = db.Column(db.Integer, nullable=False)         # 0 is Monday
+    start_minute = db.Column(db.Integer, nullable=False)    # minutes after midnight
+    end_minute = db.Column(db.Integer, nullable=False)      # earlier than start_minute past midnight
+
+    __table_args__ = (
+        db.Index('ix_course_slot_course_id_position', 'course_id', 'position', unique=True),
+    )
+
+    @property
+    def day(self):
+        return calendar.day_name[self.weekday]
+
+    @property
+    def time(self):
+        return f'{self.start_minute // 60}:{self.start_minute % 60:02d}-{self.end_minute // 60}:{self.end_minute % 60:02d}'
+
+
+# ---------- Order ---------- #
+class Order(db.Model):
+    order_id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    course_id = db.Column(db.Integer, db.ForeignKey('course.course_id', ondelete='CASCADE'), nullable=False)
+    slot_day = db.Column(db.String, nullable=False)
+    slot_time = db.Column(db.String, nullable=False)
+    slot_id = db.Column(db.Integer, db.ForeignKey('course_slot.slot_id', ondelete='SET NULL'))
+    order_date_created = db.Column(db.DateTime, default=datetime.utcnow)
+    # What the cart charged, so revenue figures survive later price changes
+    order_price = db.Column(db.Integer)
+    # Joined so listing a user's orders stays a single query
+    course = db.relationship('Course', lazy='joined')
+    slot = db.relationship('CourseSlot', lazy='joined')
+
+    __table_args__ = (
+        db.Index('ix_order_user_id_course_id', 'user_id', 'course_id'),
+        db.Index('ix_order_course_id', 'course_id'),
+    )
+
+    @property
+    def course_name(self):
+        return self.course.course_name
+
+
+# ---------- Cart ---------- #
+class Cart(db.Model):
+    cart_id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    course_id = db.Column(db.Integer, db.ForeignKey('course.course_id', ondelete='CASCADE'), nullable=False)
+    course_price = db.Column(db.Integer, nullable=False)
+    slot_day = db.Column(db.String, nullable=False)
+    slot_time = db.Column(db.String, nullable=False)
+    slot_id = db.Column(db.Integer, db.ForeignKey('course_slot.slot_id', ondelete='SET NULL'))
+    # Until then the seat is held for this cart; None once released or expired
+    hold_expires = db.Column(db.DateTime)
+    # Joined so listing a user's cart stays a single query
+    course = db.relationship('Course', lazy='joined')
+    slot = db.relationship('CourseSlot', lazy='joined')
+
+    __table_args__ = (
+        db.Index('ix_cart_user_id_course_id', 'user_id', 'course_id'),
+        db.Index('ix_cart_course_id', 'course_id'),
+        db.Index('ix_cart_hold_expires', 'hold_expires'),
+    )
+
+    @property
+    def course_name(self):
+        return self.course.course_name
+
+
+# ---------- Waitlist ---------- #
+class Waitlist(db.Model):
+    # Increasing ids give the first-come, first-served order
+    waitlist_id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    course_id = db.Column(db.Integer, db.ForeignKey('course.course_id', ondelete='CASCADE'), nullable=False)
+    slot_day = db.Column(db.String, nullable=False)
+    slot_time = db.Column(db.String, nullable=False)
+    slot_id = db.Column(db.Integer, db.ForeignKey('course_slot.slot_id', ondelete='SET NULL'))
+    created = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    course = db.relationship('Course', lazy='joined')
+    slot = db.relationship('CourseSlot')
+
+    __table_args__ = (
+        db.Index('ix_waitlist_course_id_waitlist_id', 'course_id', 'waitlist_id'),
+        db.Index('ix_waitlist_user_id_course_id', 'user_id', 'course_id', unique=True),
+    )
+
+    @property
+    def course_name(self):
+        return self.course.course_name
+
+
+# ---------- Enrollment aggregates (kept current by analytics.py) ---------- #
+class CourseStats(db.Model):
+    course_id = db.Column(db.Integer, db.ForeignKey('course.course_id', ondelete='CASCADE'), primary_key=True)
+    orders = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Integer, nullable=False, default=0)
+
+    # Top courses by revenue without a scan
+    __table_args__ = (
+        db.Index('ix_course_stats_revenue', 'revenue'),
+    )
+
+
+class DailyStats(db.Model):
+    # Registrations and revenue by the day the orders were placed
+    day = db.Column(db.Date, primary_key=True)
+    course_id = db.Column(db.Integer, db.ForeignKey('course.course_id', ondelete='CASCADE'), primary_key=True)
+    orders = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Integer, nullable=False, default=0)
+
+
+class DailyTotals(db.Model):
+    # DailyStats summed over every course, so the dashboard's daily figures read one row a day
+    day = db.Column(db.Date, primary_key=True)
+    orders = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Integer, nullable=False, default=0)
+
+
+class EnrollmentTotals(db.Model):
+    # A single row (totals_id 1) with the figures of every course together
+    totals_id = db.Column(db.Integer, primary_key=True)
+    orders = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Integer, nullable=False, default=0)
+    # Registered plus held seats, and all seats; kept by triggers on course (analytics.setup_totals)
+    seats_taken = db.Column(db.Integer, nullable=False, default=0)
+    seats_total = db.Column(db.Integer, nullable=False, default=0)
+
+
+# ---------- Feedback ---------- #
+class Feedback(db.Model):
+    feedback_id = db.Column(db.Integer, primary_key=True)
+    user_name = db.Column(db.String(50), nullable=False)
+    feedback = db.Column(db.String(3000), nullable=False)
+
+
+# ---------- Chat Message ---------- #
+class ChatMessage(db.Model):
+    message_id = db.Column(db.Integer, primary_key=True)
+    room = db.Column(db.String(50), nullable=False)
+    user_name = db.Column(db.String(50), nullable=False)
+    message = db.Column(db.String(500), nullable=False)
+    created = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_chat_message_room_message_id', 'room', 'message_id'),
+    )
+
+
+# ---------- Calendar Event ---------- #
+class CalendarEvent(db.Model):
+    event_id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    title = db.Column(db.String(100), nullable=False)
+    start = db.Column(db.DateTime, nullable=False)
+    end = db.Column(db.DateTime)
+    all_day = db.Column(db.Boolean, nullable=False, default=False)
+    url = db.Column(db.String(300))
+
+    __table_args__ = (
+        db.Index('ix_calendar_event_user_id_start', 'user_id', 'start'),
+    )
@@ -0,0 +1,126 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import threading
+import hashlib
+import secrets
+import hmac
+import os
+
+
+# ---------- KDFs (module level so the process pool can pickle them) ---------- #
+def _derive(method, password, salt):
+    name, *params = method.split(':')
+    if name == 'scrypt':
+        n, r, p = (int(value) for value in params)
+        key = hashlib.scrypt(password.encode(), salt=salt.encode(), n=n, r=r, p=p, maxmem=256 * n * r * p, dklen=64)
+    elif name == 'pbkdf2':
+        digest, iterations = params
+        key = hashlib.pbkdf2_hmac(digest, password.encode(), salt.encode(), int(iterations))
+    else:
+        raise ValueError(f'Unknown password hash method {method}')
+    return key.hex()
+
+
+def _hash(method, password):
+    salt = secrets.token_urlsafe(12)
+    return f'{method}${salt}${_derive(method, password, salt)}'
+
+
+def _verify(stored, password):
+    if stored.count('$') != 2 or not stored.startswith(('scrypt:', 'pbkdf2:')):
+        # Rows from before hashing stored the password as is
+        return hmac.compare_digest(stored.encode(), password.encode())
+    method, salt, expected = stored.split('$')
+    return hmac.compare_digest(_derive(method, password, salt), expected)
+
+
+class CredentialServiceBusy(Exception):
+    pass
+
+
+# ---------- Credential service ---------- #
+class CredentialService:
+    """Password hashing with a tunable cost, run off the request thread.
+
+    Hashes use werkzeug's "method$salt$hash" layout. Hashing and verification
+    go to a bounded pool so a burst of logins can't pin every worker thread
+    on the KDF; verify() also reports when a stored value (plaintext or an
+    older cost) should be rehashed with the current settings.
+
+    PASSWORD_EXECUTOR picks the pool: 'process' (the default), or 'thread',
+    which hashlib's KDFs can run in parallel as they release the GIL. Under
+    eventlet 'thread' is the default and uses eventlet's native thread pool,
+    as a process pool there keeps the worker from exiting.
+    """
+
+    def __init__(self, app=None):
+        self._pool = None
+        self._execute = None
+        self._slots = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('PASSWORD_METHOD', 'scrypt')
+        app.config.setdefault('PASSWORD_SCRYPT_COST', (2 ** 15, 8, 1))
+        app.config.setdefault('PASSWORD_PBKDF2_ITERATIONS', 600000)
+        # 0 hashes inline on the request thread
+        app.config.setdefault('PASSWORD_POOL_SIZE', os.cpu_count() or 1)
+        app.config.setdefault('PASSWORD_MAX_PENDING', 4 * app.config['PASSWORD_POOL_SIZE'])
+        app.config.setdefault('PASSWORD_QUEUE_TIMEOUT', 10)
+        app.config.setdefault('PASSWORD_EXECUTOR', 'thread' if app.config.get('SOCKETIO_ASYNC_MODE') == 'eventlet' else 'process')
+        if app.config['PASSWORD_EXECUTOR'] not in ('process', 'thread'):
+            raise ValueError(f"Unknown PASSWORD_EXECUTOR {app.config['PASSWORD_EXECUTOR']!r}, expected 'process' or 'thread'")
+        self.config = app.config
+
+    @property
+    def method(self):
+        if self.config['PASSWORD_METHOD'] == 'scrypt':
+            return 'scrypt:{}:{}:{}'.format(*self.config['PASSWORD_SCRYPT_COST'])
+        return f"pbkdf2:sha256:{self.config['PASSWORD_PBKDF2_ITERATIONS']}"
+
+    def _run(self, fn, *args):
+        if not self.config['PASSWORD_POOL_SIZE']:
+            return fn(*args)
+
+        # Created lazily so every gunicorn worker gets its own pool after fork
+        if self._execute is None:
+            with self._lock:
+                if self._execute is None:
+                    self._slots = threading.BoundedSemaphore(self.config['PASSWORD_MAX_PENDING'])
+                    self._execute = self._start_pool(self.config['PASSWORD_POOL_SIZE'])
+
+        if not self._slots.acquire(timeout=self.config['PASSWORD_QUEUE_TIMEOUT']):
+            raise CredentialServiceBusy()
+        try:
+            return self._execute(fn, *args)
+        finally:
+            self._slots.release()
+
+    def _start_pool(self, size):
+        if self.config['PASSWORD_EXECUTOR'] == 'thread' and self.config.get('SOCKETIO_ASYNC_MODE') == 'eventlet':
+            # Patched threads are greenlets, so the KDF goes to eventlet's pool of real ones
+            from eventlet import tpool
+            tpool.set_num_threads(size)
+            return tpool.execute
+        pool = (ProcessPoolExecutor if self.config['PASSWORD_EXECUTOR'] == 'process' else ThreadPoolExecutor)(size)
+        self._pool = pool
+        return lambda fn, *args: pool.submit(fn, *args).result()
+
+    def hash(self, password):
+        return self._run(_hash, self.method, password)
+
+    def verify(self, stored, password):
+        """Returns (valid, new_hash); new_hash is set when the stored value is outdated."""
+        valid = self._run(_verify, stored, password)
+        if valid and not stored.startswith(self.method + '$'):
+            return True, self.hash(password)
+        return valid, None
+
+    def shutdown(self):
+        """Stop the pool; the next hash starts a new one."""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+            self._pool = None
+            self._execute = None
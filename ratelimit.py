@@ -0,0 +1,170 @@
+from flask import request, current_app
+from werkzeug.exceptions import TooManyRequests
+from collections import OrderedDict
+import functools
+import threading
+import hashlib
+import struct
+import mmap
+import time
+import os
+
+try:
+    import fcntl
+except ImportError:
+    # No cross-process locks on Windows; the shared buckets may then let a few extra requests through
+    fcntl = None
+
+
+# ---------- Request keys ---------- #
+def client_ip():
+    """The client's address; behind RATELIMIT_PROXY_HOPS proxies, the one they forwarded."""
+    hops = current_app.config['RATELIMIT_PROXY_HOPS']
+    if hops:
+        forwarded = [part.strip() for part in ','.join(request.headers.getlist('X-Forwarded-For')).split(',') if part.strip()]
+        if len(forwarded) >= hops:
+            return forwarded[-hops]
+    return request.remote_addr
+
+
+def form_field(name):
+    """Key on a posted form field, e.g. the email being logged into; requests without it aren't limited by it."""
+    def key():
+        value = request.form.get(name, '').strip().lower()
+        return value or None
+    return key
+
+
+# ---------- Token buckets ---------- #
+def _take(tokens, stamp, capacity, per_second, now):
+    # Refill for the time since the last request, then spend one token if there is one
+    tokens = min(capacity, tokens + max(0, now - stamp) * per_second)
+    if tokens >= 1:
+        return tokens - 1, 0
+    return tokens, (1 - tokens) / per_second
+
+
+class MemoryBuckets:
+    """Buckets of this process, two floats per key, least recently used keys evicted past max_keys.
+
+    An evicted key starts again with a full bucket, so max_keys should
+    comfortably exceed the keys active within one limit period.
+    """
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, per_second, now):
+        with self._lock:
+            tokens, stamp = self._buckets.pop(key, (capacity, now))
+            tokens, retry_after = _take(tokens, stamp, capacity, per_second, now)
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return retry_after
+
+
+class SharedBuckets:
+    """Buckets in a memory-mapped file every gunicorn worker maps, like VersionStamps.
+
+    Keys are hashed into a fixed number of slots, so memory never grows; two
+    keys sharing a slot share a bucket, which only makes their limit
+    stricter. Each update locks its slot's bytes in the file.
+    """
+
+    slot_size = 16
+
+    def __init__(self, path, slots=65536):
+        self.path = path
+        self.slots = slots
+        self._file = None
+        self._map = None
+        self._lock = threading.Lock()
+
+    def _mapped(self):
+        if self._map is None:
+            with self._lock:
+                if self._map is None:
+                    size = self.slot_size * self.slots
+                    self._file = open(self.path, 'a+b')
+                    if os.path.getsize(self.path) < size:
+                        self._file.truncate(size)
+                    self._map = mmap.mmap(self._file.fileno(), size)
+        return self._map
+
+    def take(self, key, capacity, per_second, now):
+        buckets = self._mapped()
+        offset = self.slot_size * (int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little') % self.slots)
+        with self._lock:
+            if fcntl is not None:
+                fcntl.lockf(self._file, fcntl.LOCK_EX, self.slot_size, offset)
+            try:
+                tokens, stamp = struct.unpack_from('<dd', buckets, offset)
+                if stamp == 0:
+                    tokens = capacity
+                tokens, retry_after = _take(tokens, stamp, capacity, per_second, now)
+                struct.pack_into('<dd', buckets, offset, tokens, now)
+            finally:
+                if fcntl is not None:
+                    fcntl.lockf(self._file, fcntl.LOCK_UN, self.slot_size, offset)
+        return retry_after
+
+
+# ---------- Route decorator ---------- #
+class RateLimiter:
+    """Token-bucket limits on routes, checked before the view runs.
+
+    A limit of (count, seconds) allows bursts of `count` requests and one
+    more every seconds / count after that, per key. Rejected requests get a
+    429 with Retry-After and never reach the database or password hashing.
+    """
+
+    def __init__(self, app=None):
+        self.buckets = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('RATELIMIT_ENABLED', True)
+        # 'memory' per worker, or 'shared' across the workers of one host
+        app.config.setdefault('RATELIMIT_STORAGE', 'memory')
+        app.config.setdefault('RATELIMIT_MAX_KEYS', 10000)
+        app.config.setdefault('RATELIMIT_SHARED_SLOTS', 65536)
+        # Proxies in front of the app whose X-Forwarded-For is trusted
+        app.config.setdefault('RATELIMIT_PROXY_HOPS', 0)
+        app.config.setdefault('RATELIMIT_LOGIN_PER_IP', (20, 60))
+        app.config.setdefault('RATELIMIT_LOGIN_PER_EMAIL', (10, 15 * 60))
+        app.config.setdefault('RATELIMIT_SIGNUP_PER_IP', (5, 10 * 60))
+        if app.config['RATELIMIT_STORAGE'] == 'shared':
+            self.buckets = SharedBuckets(os.path.join(app.root_path, 'ratelimit.buckets'), app.config['RATELIMIT_SHARED_SLOTS'])
+        else:
+            self.buckets = MemoryBuckets(app.config['RATELIMIT_MAX_KEYS'])
+
+    def hit(self, scope, key, rate):
+        """Spend a token of `key`'s bucket, returns the seconds to wait when there was none (0 if allowed)."""
+        count, seconds = rate
+        return self.buckets.take(f'{scope}:{key}', count, count / seconds, time.time())
+
+    def limit(self, rate, key=client_ip, methods=None, scope=None):
+        """Limit a route to `rate`, (count, seconds) or the config key holding one, per key() value.
+
+        Only requests with one of `methods` count, e.g. ('POST',) to leave the
+        form itself alone. Stack the decorator for several limits.
+        """
+        def decorator(view):
+            name = scope or f'{view.__module__}.{view.__name__}:{rate}'
+
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                config = current_app.config
+                if config['RATELIMIT_ENABLED'] and (methods is None or request.method in methods):
+                    value = key()
+                    if value is not None:
+                        retry_after = self.hit(name, value, config[rate] if isinstance(rate, str) else rate)
+                        if retry_after:
+                            raise TooManyRequests(retry_after=max(1, round(retry_after)))
+                return view(*args, **kwargs)
+            return wrapper
+        return decorator
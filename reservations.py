@@ -0,0 +1,197 @@
+from flask import current_app
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from extensions import db, page_cache
+from models import Course, CourseSlot, Order, Waitlist
+from carts import cart_store
+from catalog import catalog, seat_feed
+from datetime import datetime, timedelta
+import threading
+
+
+# ---------- Seat holds ---------- #
+# Every write below is guarded in SQL and is the first statement of its
+# transaction, so it takes SQLite's write lock before reading anything:
+# course_order + course_held never passes course_slot, whichever worker runs it.
+# Which cart item holds a seat is up to the cart store (carts.py). Holds count as
+# taken seats on the course page, so committing one calls catalog.seats_changed().
+
+def take_hold(course_id):
+    """Reserve a free seat, returns False when every seat is ordered or held."""
+    return db.session.execute(
+        db.update(Course)
+        .where(Course.course_id == course_id, Course.course_order + Course.course_held < Course.course_slot)
+        .values(course_held=Course.course_held + 1)
+    ).rowcount == 1
+
+
+def release_hold(user_id, course_id):
+    """Give back the seat held by a cart item (live or expired), if it still has one."""
+    released = cart_store.release_hold(user_id, course_id)
+    if released:
+        db.session.execute(db.update(Course).where(Course.course_id == course_id).values(course_held=Course.course_held - 1))
+    return released
+
+
+def claim_hold(user_id, course_id, now):
+    """Turn a live hold into a registered seat, returns False when there is none."""
+    claimed = cart_store.claim_hold(user_id, course_id, now)
+    if claimed:
+        db.session.execute(
+            db.update(Course).where(Course.course_id == course_id)
+            .values(course_order=Course.course_order + 1, course_held=Course.course_held - 1)
+        )
+    return claimed
+
+
+def hold_expiry():
+    return datetime.utcnow() + timedelta(seconds=current_app.config['SEAT_HOLD_SECONDS'])
+
+
+# ---------- Cart ---------- #
+def add_to_cart(user_id, course, slot):
+    """Hold a seat and put the course's `slot` in the cart, returns False (and changes nothing) when it is full."""
+    if not take_hold(course.course_id):
+        db.session.rollback()
+        return False
+    cart_store.add(user_id, course.course_id, slot, course.course_price, hold_expiry())
+    db.session.execute(db.delete(Waitlist).where(Waitlist.user_id == user_id, Waitlist.course_id == course.course_id))
+    db.session.commit()
+    catalog.seats_changed()
+    seat_feed.notify()
+    return True
+
+
+def remove_from_cart(item):
+    """Drop a cart item and hand its seat to the waitlist."""
+    released = release_hold(item.user_id, item.course_id)
+    cart_store.remove(item.user_id, [item.course_id])
+    promoted = promote_waitlist([item.course_id]) if released else []
+    db.session.commit()
+    if released:
+        catalog.seats_changed()
+        seat_feed.notify()
+    for user_id in promoted:
+        page_cache.touch_user(user_id)
+
+
+# ---------- Waitlist ---------- #
+def join_waitlist(user_id, course, slot):
+    """Queue the user for a full course, returns their 1-based position."""
+    # No lookup first: of two requests racing to join, the unique (user_id, course_id) index keeps the first
+    db.session.execute(
+        sqlite_insert(Waitlist.__table__)
+        .values(user_id=user_id, course_id=course.course_id, slot_day=slot.day, slot_time=slot.time, slot_id=slot.slot_id)
+        .on_conflict_do_nothing(index_elements=['user_id', 'course_id'])
+    )
+    db.session.commit()
+    entry = db.select(Waitlist.waitlist_id).where(Waitlist.user_id == user_id, Waitlist.course_id == course.course_id).scalar_subquery()
+    return db.session.execute(
+        db.select(db.func.count()).where(Waitlist.course_id == course.course_id, Waitlist.waitlist_id <= entry)
+    ).scalar()
+
+
+def leave_waitlist(user_id, course_id):
+    db.session.execute(db.delete(Waitlist).where(Waitlist.user_id == user_id, Waitlist.course_id == course_id))
+    db.session.commit()
+
+
+def promote_waitlist(course_ids):
+    """Move waitlisted users, first come first served, into held cart items while seats are free.
+
+    Runs inside the caller's write transaction and returns the promoted
+    user ids; the caller commits.
+    """
+    promoted = []
+    for course_id in course_ids:
+        while True:
+            entry = db.session.execute(
+                db.select(Waitlist).where(Waitlist.course_id == course_id).order_by(Waitlist.waitlist_id).limit(1)
+            ).scalar()
+            if entry is None:
+                break
+            # Someone who got the course another way just leaves the queue
+            has_course = cart_store.has(entry.user_id, course_id) or db.session.execute(db.select(
+                db.select(Order.order_id).where(Order.user_id == entry.user_id, Order.course_id == course_id).exists()
+            )).scalar()
+            if not has_course and not take_hold(course_id):
+                break
+            db.session.delete(entry)
+            if has_course:
+                continue
+            price = db.session.execute(db.select(Course.course_price).where(Course.course_id == course_id)).scalar()
+            # Entries from before course slots that matched none of them get the course's first slot
+            slot = entry.slot or CourseSlot.query.filter_by(course_id=course_id).order_by(CourseSlot.position).first()
+            cart_store.add(entry.user_id, course_id, slot, price, hold_expiry())
+            promoted.append(entry.user_id)
+        db.session.flush()
+    return promoted
+
+
+# ---------- Expired hold reaper ---------- #
+class SeatHolds:
+    """Background sweep that hands expired seat holds back, in batches.
+
+    Every worker runs one reaper task, started by its first request; sweeps
+    from several workers are safe as each release is guarded in SQL. A sweep
+    also promotes waitlists of courses that have free seats, e.g. after an
+    admin raised course_slot.
+    """
+
+    def __init__(self, app=None, socketio=None):
+        self.app = None
+        self._reaper = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app, socketio)
+
+    def init_app(self, app, socketio):
+        app.config.setdefault('SEAT_HOLD_SECONDS', 15 * 60)
+        app.config.setdefault('SEAT_HOLD_REAP_SECONDS', 30)
+        app.config.setdefault('SEAT_HOLD_REAP_BATCH', 500)
+        self.app = app
+        self.socketio = socketio
+        app.before_request(self._start)
+
+    def _start(self):
+        if self._reaper is None:
+            with self._lock:
+                if self._reaper is None:
+                    self._reaper = self.socketio.start_background_task(self._run)
+
+    def _run(self):
+        while True:
+            self.socketio.sleep(self.app.config['SEAT_HOLD_REAP_SECONDS'])
+            try:
+                with self.app.app_context():
+                    self.reap()
+            except Exception:
+                self.app.logger.exception('Releasing expired seat holds failed')
+
+    def reap(self, now=None):
+        """Release every hold that expired by `now`, returns how many were released."""
+        now = now or datetime.utcnow()
+        batch_size = self.app.config['SEAT_HOLD_REAP_BATCH']
+        released = 0
+        while True:
+            rows = cart_store.release_expired(now, batch_size)
+            promoted = promote_waitlist(sorted({course_id for user_id, course_id in rows} | self._promotable()))
+            db.session.commit()
+            if rows or promoted:
+                catalog.seats_changed()
+                seat_feed.notify()
+            for user_id in {user_id for user_id, course_id in rows} | set(promoted):
+                page_cache.touch_user(user_id)
+            released += len(rows)
+            if len(rows) < batch_size:
+                return released
+
+    def _promotable(self):
+        # Courses with both a queue and a free seat
+        return set(db.session.execute(
+            db.select(Course.course_id)
+            .where(Course.course_order + Course.course_held < Course.course_slot)
+            .where(Course.course_id.in_(db.select(Waitlist.course_id)))
+        ).scalars())
+
+
+seat_holds = SeatHolds()
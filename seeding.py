@@ -0,0 +1,176 @@
+from faker import Faker
+from extensions import db, credentials
+from models import User, Course, CourseSlot, Order, Cart, Feedback
+from catalog import catalog
+from services import feedback_version
+from analytics import rebuild_stats
+from timetable import parse_slot
+from transfer import batched
+from datetime import datetime, timedelta
+import random
+
+
+# Seeded users log in with this password, load tests find them by their email domain
+SEED_PASSWORD = 'loadtest123'
+SEED_EMAIL_DOMAIN = 'seed.example.com'
+
+CRAFTS = (
+    'Batik', 'Songket', 'Wau', 'Kuih Muih', 'Silat', 'Gamelan', 'Dikir Barat', 'Congkak',
+    'Wayang Kulit', 'Tenun', 'Mak Yong', 'Zapin', 'Sepak Raga', 'Ukiran Kayu', 'Tekat', 'Anyaman',
+)
+LEVELS = ('Basics', 'Workshop', 'Masterclass', 'for Beginners', 'Intermediate', 'Advanced')
+DAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday')
+TIMES = ('9:00-11:00', '9:00-12:00', '11:00-13:00', '14:00-16:00', '15:00-17:00', '19:00-21:00')
+
+
+# ---------- Synthetic data (flask --app app seed-db) ---------- #
+class Seeder:
+    """Fake users, courses, orders, carts and feedback, written in bulk.
+
+    Faker is slow per call, so a few thousand values are generated up front
+    and rows draw from them at random; the same seed gives the same data.
+    Rows are plain tuples with explicit ids, handed straight to the driver's
+    executemany() batch_size rows per transaction, as SQLAlchemy's per-row
+    parameter processing costs more than SQLite's insert itself. Orders and carts only reference seeded users and
+    courses and never take more seats than a course has; the enrollment
+    aggregates are rebuilt at the end.
+    """
+
+    pool_size = 2000
+    cache_kib = 256 * 1024
+
+    def __init__(self, seed=None, batch_size=10000):
+        self.batch_size = batch_size
+        self.random = random.Random(seed)
+        fake = Faker()
+        fake.seed_instance(seed)
+        self.names = [fake.name()[:50] for _ in range(self.pool_size)]
+        self.user_names = [fake.user_name()[:40] for _ in range(self.pool_size)]
+        self.sentences = [fake.sentence(nb_words=12)[:200] for _ in range(self.pool_size)]
+        self.paragraphs = [fake.paragraph(nb_sentences=4) for _ in range(self.pool_size)]
+
+    def _insert(self, table, columns, rows):
+        statement = f'INSERT INTO "{table.name}" ({", ".join(columns)}) VALUES ({", ".join("?" * len(columns))})'
+        count = 0
+        with db.engine.connect() as conn:
+            # Every id written is known to exist, and a big page cache keeps the indexes being filled in memory
+            cache_size = conn.exec_driver_sql('PRAGMA cache_size').scalar()
+            conn.exec_driver_sql('PRAGMA foreign_keys=OFF')
+            conn.exec_driver_sql(f'PRAGMA cache_size={-self.cache_kib}')
+            try:
+                for batch in batched(rows, self.batch_size):
+                    with conn.begin():
+                        conn.exec_driver_sql(statement, batch)
+                    count += len(batch)
+            finally:
+                conn.exec_driver_sql('PRAGMA foreign_keys=ON')
+                conn.exec_driver_sql(f'PRAGMA cache_size={cache_size}')
+        return count
+
+    @staticmethod
+    def _next_id(column):
+        return (db.session.execute(db.select(db.func.max(column))).scalar() or 0) + 1
+
+    def seed(self, users=1000, courses=100, orders=5000, carts=500, feedbacks=1000):
+        """Write the rows and return how many of each went in."""
+        rng = self.random
+        report = {}
+
+        # Users share one hash, so seeding costs a single KDF call
+        password = credentials.hash(SEED_PASSWORD)
+        first_user = self._next_id(User.id)
+        user_ids = range(first_user, first_user + users)
+        report['users'] = self._insert(User.__table__, ('id', 'type', 'username', 'email', 'password'), (
+            (user_id, 'User', f'{rng.choice(self.user_names)}{user_id}', f'seed{user_id}@{SEED_EMAIL_DOMAIN}', password)
+            for user_id in user_ids
+        ))
+
+        first_course = self._next_id(Course.course_id)
+        course_ids = range(first_course, first_course + courses)
+        seats, prices, schedules = {}, {}, {}
+
+        # DateTime columns are stored as SQLAlchemy writes them, 'YYYY-MM-DD HH:MM:SS.ffffff'
+        now = datetime.utcnow()
+
+        def course_row(course_id):
+            seats[course_id] = rng.randint(10, 60)
+            prices[course_id] = rng.randrange(100, 2001, 50)
+            schedules[course_id] = tuple(zip(rng.sample(DAYS, 2), (rng.choice(TIMES), rng.choice(TIMES))))
+            (day_1, time_1), (day_2, time_2) = schedules[course_id]
+            return (
+                course_id, f'{rng.choice(CRAFTS)} {rng.choice(LEVELS)} {course_id}', rng.randint(1, 12), prices[course_id],
+                seats[course_id], rng.choice(self.names), 0, 0, str(now), rng.choice(self.sentences), day_1, time_1, day_2, time_2,
+            )
+        report['courses'] = self._insert(Course.__table__, (
+            'course_id', 'course_name', 'course_duration', 'course_price', 'course_slot', 'course_trainer', 'course_order',
+            'course_held', 'course_date_created', 'course_info', 'course_slot_1_day', 'course_slot_1_time',
+            'course_slot_2_day', 'course_slot_2_time',
+        ), (course_row(course_id) for course_id in course_ids))
+
+        # Two slots per course, numbered so a course's slot ids follow from its own id
+        first_slot = self._next_id(CourseSlot.slot_id)
+
+        def slot_id(course_id, position):
+            return first_slot + 2 * (course_id - first_course) + position - 1
+        self._insert(CourseSlot.__table__, ('slot_id', 'course_id', 'position', 'weekday', 'start_minute', 'end_minute'), (
+            (slot_id(course_id, position), course_id, position, *parse_slot(*schedules[course_id][position - 1]))
+            for course_id in course_ids for position in (1, 2)
+        ))
+
+        # Orders and carts both use up seats, so checking the carts out later mostly succeeds
+        ordered = {}
+        open_courses = list(course_ids)
+        owned = set()
+
+        def pick(user_id):
+            # A few tries to find a course the user doesn't have yet; full ones leave `open_courses`
+            for _ in range(10):
+                if not open_courses:
+                    return None
+                index = rng.randrange(len(open_courses))
+                course_id = open_courses[index]
+                if (user_id, course_id) in owned:
+                    continue
+                owned.add((user_id, course_id))
+                seats[course_id] -= 1
+                if not seats[course_id]:
+                    open_courses[index] = open_courses[-1]
+                    open_courses.pop()
+                position = rng.randint(1, 2)
+                return (user_id, course_id, *schedules[course_id][position - 1], slot_id(course_id, position))
+            return None
+
+        # Registered some time in the last 90 days
+        order_dates = [str(now - timedelta(days=days)) for days in range(91)]
+
+        # Users are walked in id order, so the (user_id, course_id) indexes fill from one end
+        def order_rows():
+            for index in range(orders if users else 0):
+                row = pick(user_ids[index * users // orders])
+                if row is not None:
+                    ordered[row[1]] = ordered.get(row[1], 0) + 1
+                    yield (*row, rng.choice(order_dates), prices[row[1]])
+        report['orders'] = self._insert(Order.__table__, ('user_id', 'course_id', 'slot_day', 'slot_time', 'slot_id', 'order_date_created', 'order_price'), order_rows())
+        if ordered:
+            with db.engine.begin() as conn:
+                conn.execute(
+                    db.update(Course.__table__).where(Course.course_id == db.bindparam('id')).values(course_order=db.bindparam('count')),
+                    [dict(id=course_id, count=count) for course_id, count in ordered.items()],
+                )
+
+        # Carts hold no seats (hold_expires is NULL), like carts filled before seat holds existed.
+        # They are cart rows, so only the sqlite cart store sees them
+        def cart_rows():
+            for index in range(carts if users else 0):
+                row = pick(user_ids[index * users // carts])
+                if row is not None:
+                    yield (*row, prices[row[1]])
+        report['carts'] = self._insert(Cart.__table__, ('user_id', 'course_id', 'slot_day', 'slot_time', 'slot_id', 'course_price'), cart_rows())
+
+        report['feedbacks'] = self._insert(Feedback.__table__, ('user_name', 'feedback'), (
+            (rng.choice(self.user_names), rng.choice(self.paragraphs)) for _ in range(feedbacks)
+        ))
+        rebuild_stats()
+        catalog.invalidate()
+        feedback_version.bump()
+        return report
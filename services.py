@@ -0,0 +1,392 @@
+from flask import current_app, g
+from flask_login import current_user
+from sqlalchemy import exc
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from extensions import db, credentials, page_cache
+from models import Course, CourseSlot, Order, Feedback, CalendarEvent
+from forms import CourseForm
+from catalog import catalog, seat_feed
+from reservations import claim_hold, release_hold
+from carts import cart_store
+from analytics import record_enrollments
+from timetable import Timetable, sync_course_slots, parse_weekday, parse_time_range, MINUTES_PER_DAY
+from caching import VersionStamps, FragmentCache
+from database import read_engine
+from transfer import validate_records, batched
+from datetime import datetime, timedelta
+from collections import namedtuple
+import threading
+import atexit
+import math
+
+
+# ---------- Current user's cart & orders (once per request) ---------- #
+class UserContext:
+    """The logged in user with their cart, orders and cart total.
+
+    Built once per request on flask.g and shared by the routes and base().
+    load_user already fetched the orders, the waitlist and, with the SQLite
+    cart store, the cart along with the user, so building this doesn't query.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.user_id = user.id
+        self.cart, self.cart_total = cart_store.loaded_cart(user)
+        self.orders = user.orders
+        self.waitlist = user.waitlist
+        self._timetable = None
+
+    @property
+    def timetable(self):
+        # Registered and carted classes, built on first use
+        if self._timetable is None:
+            self._timetable = Timetable((item.slot, item.course_name) for item in [*self.orders, *self.cart])
+        return self._timetable
+
+
+def user_context():
+    if 'user_context' not in g:
+        g.user_context = UserContext(current_user._get_current_object())
+    return g.user_context
+
+
+# ---------- Keyset pagination ---------- #
+def encode_cursor(key):
+    return ':'.join(str(value) for value in key) if key else None
+
+
+def decode_cursor(cursor):
+    try:
+        return tuple(int(value) for value in cursor.split(':')) if cursor else None
+    except ValueError:
+        return None
+
+
+# Bumped on every new feedback, for the dashboard's ETag and the cached pages
+feedback_version = VersionStamps()
+feedback_pages = FragmentCache(maxsize=64)
+
+
+def feedback_page(before=None, limit=20):
+    """Newest feedbacks older than feedback_id `before`, plus the next cursor (or None).
+
+    Pages are kept per feedback version, so the dashboard only queries after a
+    flush wrote new feedback.
+    """
+    def load():
+        query = db.select(Feedback.__table__).order_by(Feedback.feedback_id.desc()).limit(limit + 1)
+        if before:
+            query = query.where(Feedback.feedback_id < before)
+        with read_engine().connect() as conn:
+            feedbacks = conn.execute(query).all()
+        return feedbacks[:limit], (feedbacks[limit - 1].feedback_id if len(feedbacks) > limit else None)
+
+    return feedback_pages.get_or_render(feedback_version.get(), (before, limit), load)
+
+
+# ---------- Write-behind feedback ---------- #
+PendingFeedback = namedtuple('PendingFeedback', 'user_id user_name feedback')
+
+
+class FeedbackQueue:
+    """Feedback accepted at once and inserted in batches by a background task.
+
+    The task flushes every FEEDBACK_FLUSH_SECONDS, or as soon as
+    FEEDBACK_FLUSH_BATCH entries are waiting, in one transaction per batch.
+    Entries stay visible to their submitter (in this worker) until their
+    rows are committed, and shutdown() flushes whatever is left; it runs at
+    exit and from gunicorn's worker_exit hook (app.shutdown), since an
+    eventlet worker can stop before its atexit handlers do, so a worker
+    stopped gracefully loses nothing.
+    """
+
+    def __init__(self, app=None):
+        self._pending = []
+        self._lock = threading.Lock()
+        # Only one flush at a time, so a batch is never written twice
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._flusher = None
+        self._stopped = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('FEEDBACK_FLUSH_SECONDS', 1.0)
+        app.config.setdefault('FEEDBACK_FLUSH_BATCH', 100)
+        self.app = app
+        self._stopped = False
+        atexit.register(self.shutdown)
+
+    def submit(self, user_id, user_name, feedback):
+        with self._lock:
+            self._pending.append(PendingFeedback(user_id, user_name, feedback))
+            pending = len(self._pending)
+            # Started by the first entry, so every forked worker runs its own flusher
+            if self._flusher is None and not self._stopped:
+                self._flusher = threading.Thread(target=self._run, name='feedback-flusher', daemon=True)
+                self._flusher.start()
+        if pending >= self.app.config['FEEDBACK_FLUSH_BATCH']:
+            self._wake.set()
+
+    def pending(self, user_id):
+        """The user's entries that are not in the database yet, newest first."""
+        with self._lock:
+            return [entry for entry in reversed(self._pending) if entry.user_id == user_id]
+
+    def flush(self):
+        """Insert everything queued so far, returns how many rows were written."""
+        with self._flush_lock:
+            with self._lock:
+                batch = list(self._pending)
+            if not batch:
+                return 0
+            try:
+                # Runs from the background task and at exit, outside any request
+                with self.app.app_context():
+                    db.session.execute(db.insert(Feedback), [dict(user_name=entry.user_name, feedback=entry.feedback) for entry in batch])
+                    db.session.commit()
+            except Exception:
+                self.app.logger.exception('Saving %d feedback entries failed, retrying with the next batch', len(batch))
+                return 0
+            with self._lock:
+                del self._pending[:len(batch)]
+            feedback_version.bump()
+            return len(batch)
+
+    def _run(self):
+        while not self._stopped:
+            self._wake.wait(self.app.config['FEEDBACK_FLUSH_SECONDS'])
+            self._wake.clear()
+            self.flush()
+
+    def shutdown(self):
+        """Stop the background task and flush what is left."""
+        self._stopped = True
+        self._wake.set()
+        if self._flusher is not None:
+            self._flusher.join(timeout=self.app.config['FEEDBACK_FLUSH_SECONDS'] + 5)
+        self.flush()
+
+
+feedback_queue = FeedbackQueue()
+
+
+# ---------- Calendar feed ---------- #
+def parse_event_time(value):
+    """ISO date or datetime from the calendar form / feed, as naive local time; None when invalid."""
+    try:
+        return datetime.fromisoformat(value.strip().replace('Z', '+00:00')).replace(tzinfo=None)
+    except (AttributeError, ValueError):
+        return None
+
+
+def order_occurrences(order, window_start, window_end):
+    """Weekly sessions of a registered slot that overlap [window_start, window_end).
+
+    Occurrences are computed on demand: the first one in the window is found
+    arithmetically, so only the sessions actually shown are ever built.
+    Sessions run from the order date for the course duration (in months).
+    """
+    if order.slot is not None:
+        weekday, times = order.slot.weekday, (order.slot.start_minute, order.slot.end_minute)
+    else:
+        # Orders whose day & time matched no slot of the course when slots were introduced
+        weekday, times = parse_weekday(order.slot_day), parse_time_range(order.slot_time)
+    if weekday is None:
+        return
+    if times:
+        start, end = times
+        begins, length = timedelta(minutes=start), timedelta(minutes=(end - start) % MINUTES_PER_DAY)
+    else:
+        begins, length = timedelta(), timedelta(days=1)
+
+    registered = (order.order_date_created or datetime.utcnow()).replace(hour=0, minute=0, second=0, microsecond=0)
+    first = registered + timedelta(days=(weekday - registered.weekday()) % 7) + begins
+    last = registered + timedelta(days=round(order.course.course_duration * 365 / 12))
+    week = timedelta(weeks=1)
+
+    skipped = max(math.ceil((window_start - length - first) / week), 0)
+    occurrence = first + skipped * week
+    while occurrence < window_end and occurrence < last:
+        yield dict(
+            title=order.course_name,
+            start=occurrence.isoformat(),
+            end=(occurrence + length).isoformat(),
+            allDay=not times,
+            registered=True,
+        )
+        occurrence += week
+
+
+def calendar_feed(user_id, orders, window_start, window_end):
+    """FullCalendar events of one user between window_start and window_end."""
+    max_length = timedelta(days=current_app.config['CALENDAR_MAX_EVENT_DAYS'])
+    # Bounded event length keeps this a range scan on (user_id, start)
+    events = CalendarEvent.query.filter(
+        CalendarEvent.user_id == user_id,
+        CalendarEvent.start < window_end,
+        CalendarEvent.start > window_start - max_length,
+    ).order_by(CalendarEvent.start)
+
+    feed = []
+    for event in events:
+        if (event.end or event.start + timedelta(days=event.all_day)) < window_start:
+            continue
+        feed.append(dict(
+            id=event.event_id,
+            title=event.title,
+            start=(event.start.date() if event.all_day else event.start).isoformat(),
+            end=event.end and (event.end.date() if event.all_day else event.end).isoformat(),
+            allDay=event.all_day,
+            url=event.url or None,
+        ))
+    for order in orders:
+        feed.extend(order_occurrences(order, window_start, window_end))
+    return feed
+
+
+# ---------- Bulk course import ---------- #
+def import_courses(records):
+    """Validate records with CourseForm's rules and upsert them by course_name.
+
+    Rows are written IMPORT_BATCH_SIZE at a time, one transaction per batch.
+    Invalid rows, or every row of a batch the database rejects, are reported
+    and the import carries on, as are updates that would leave a course fewer
+    slots than its seats already ordered or held. Returns counts and the first
+    IMPORT_MAX_ERRORS (line, messages) errors.
+    """
+    report = dict(inserted=0, updated=0, error_count=0, errors=[])
+
+    def reject(line, messages):
+        report['error_count'] += 1
+        if len(report['errors']) < current_app.config['IMPORT_MAX_ERRORS']:
+            report['errors'].append((line, messages))
+
+    form = CourseForm(formdata=None, meta={'csrf': False})
+    for batch in batched(validate_records(records, form), current_app.config['IMPORT_BATCH_SIZE']):
+        rows = {}
+        for line, data, errors in batch:
+            if errors:
+                reject(line, errors)
+            else:
+                # A name repeated within a batch keeps its last row
+                rows[data['course_name']] = (line, data)
+        if not rows:
+            continue
+
+        statement = sqlite_insert(Course.__table__)
+        statement = statement.on_conflict_do_update(
+            index_elements=['course_name'],
+            set_={name: statement.excluded[name] for name in form.data if name in Course.__table__.columns and name != 'course_name'},
+            # Never fewer slots than seats taken, even if some were taken since the check below
+            where=statement.excluded.course_slot >= Course.course_order + Course.course_held,
+        )
+        try:
+            existing = dict(db.session.execute(
+                db.select(Course.course_name, Course.course_order + Course.course_held).where(Course.course_name.in_(rows))
+            ).all())
+            for name, taken in existing.items():
+                line, data = rows[name]
+                if data['course_slot'] < taken:
+                    reject(line, [f'Slots can\'t go below the {taken} seats already registered or held'])
+                    del rows[name]
+            if not rows:
+                db.session.rollback()
+                continue
+            existing = existing.keys() & rows.keys()
+            db.session.execute(statement, [data for line, data in rows.values()])
+            sync_course_slots(db.session.execute(db.select(Course.course_id).where(Course.course_name.in_(rows))).scalars().all())
+            db.session.commit()
+        except exc.SQLAlchemyError as error:
+            db.session.rollback()
+            for line, data in rows.values():
+                reject(line, [f"Batch rejected by the database: {getattr(error, 'orig', error)}"])
+            continue
+
+        report['inserted'] += len(rows) - len(existing)
+        report['updated'] += len(existing)
+        catalog.invalidate()
+    return report
+
+
+# ---------- Checkout ---------- #
+def checkout_cart(user_id, user_cart, user_orders):
+    """Register every course in the user's cart in a single transaction.
+
+    Items with a live seat hold register on their held seat. The others take
+    a free seat with a guarded UPDATE so concurrent workers can never push
+    course_order + course_held past course_slot. Items that are already full,
+    clash with a registered (or earlier cart) class or have no slot (carted
+    before slots existed, or the slot was removed since) stay in the cart;
+    returns the names of the full ones, (name, clashing class) pairs for the
+    clashes and the names of the ones without a slot.
+    """
+    if not user_cart:
+        return [], [], []
+
+    now = datetime.utcnow()
+    timetable = Timetable((order.slot, order.course_name) for order in user_orders)
+    registered = []
+    full = []
+    clashes = []
+    unscheduled = []
+    for item in user_cart:
+        if item.position is None:
+            unscheduled.append(item.course_name)
+            continue
+        if item.slot is not None:
+            clash = timetable.clash(item.slot)
+            if clash is not None:
+                clashes.append((item.course_name, clash))
+                continue
+        taken = claim_hold(user_id, item.course_id, now)
+        if not taken:
+            # An expired hold that the reaper hasn't swept yet goes back first
+            release_hold(user_id, item.course_id)
+            # Atomic seat increment, only succeeds while the course still has a free slot
+            taken = db.session.execute(
+                db.update(Course)
+                .where(Course.course_id == item.course_id, Course.course_order + Course.course_held < Course.course_slot)
+                .values(course_order=Course.course_order + 1)
+            ).rowcount
+        if taken:
+            registered.append(item)
+            if item.slot is not None:
+                timetable.add(item.slot, item.course_name)
+        else:
+            full.append(item.course_name)
+
+    if registered:
+        # Cart items name a slot by position, orders point at its row
+        slot_ids = {(slot.course_id, slot.position): slot.slot_id for slot in db.session.execute(
+            db.select(CourseSlot.course_id, CourseSlot.position, CourseSlot.slot_id)
+            .where(CourseSlot.course_id.in_([item.course_id for item in registered]))
+        )}
+        # Adding into Order database & delete course from cart
+        db.session.execute(db.insert(Order), [
+            dict(user_id=user_id, course_id=item.course_id, slot_day=item.slot_day, slot_time=item.slot_time,
+                 slot_id=slot_ids.get((item.course_id, item.position)), order_price=item.course_price, order_date_created=now)
+            for item in registered
+        ])
+        record_enrollments([(item.course_id, now.date(), 1, item.course_price) for item in registered])
+        cart_store.remove(user_id, [item.course_id for item in registered])
+
+    db.session.commit()
+    page_cache.touch_user(user_id)
+    if registered:
+        # Only the seat counts moved; the cached catalog and its fragments stay valid
+        catalog.seats_changed()
+        seat_feed.notify()
+    return full, clashes, unscheduled
+
+
+# ---------- Password check ---------- #
+def check_password(user, password):
+    valid, new_hash = credentials.verify(user.password, password)
+    if new_hash:
+        # Transparently upgrade plaintext rows and hashes made with an older cost
+        user.password = new_hash
+        db.session.commit()
+    return valid
@@ -0,0 +1,94 @@
+import shutil
+import sys
+import os
+
+import pytest
+
+# The app's modules live flat at the repository root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app import create_app
+from extensions import db
+from models import User, Course, CourseSlot
+from catalog import catalog
+from services import feedback_version
+from loadtest import CSRF_FIELD
+
+
+# ---------- App on a throwaway copy of template.db ---------- #
+def make_app(tmp_path, **config):
+    database = tmp_path / 'database.db'
+    shutil.copy(os.path.join(ROOT, 'template.db'), database)
+    defaults = dict(
+        TESTING=True,
+        SQLALCHEMY_DATABASE_URI=f'sqlite:///{database}',
+        RATELIMIT_ENABLED=False,
+        # Inline and cheap: the demo rows are rehashed on their first login
+        PASSWORD_POOL_SIZE=0,
+        PASSWORD_SCRYPT_COST=(2 ** 10, 8, 1),
+        BACKUP_DIR=str(tmp_path / 'backups'),
+    )
+    app = create_app({**defaults, **config})
+    with app.app_context():
+        # Version stamps outlive the previous test's database, so start from a fresh catalog and feedback
+        catalog.invalidate()
+        feedback_version.bump()
+    return app
+
+
+def dispose(app):
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+    app.extensions['sqlite_read_engine'].dispose()
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = make_app(tmp_path)
+    yield app
+    dispose(app)
+
+
+def login(client, email, password):
+    # CSRF stays on, as in production; the token comes from the login page
+    token = CSRF_FIELD.search(client.get('/login').get_data(as_text=True)).group(1)
+    return client.post('/login', data=dict(email=email, password=password, csrf_token=token))
+
+
+@pytest.fixture
+def client(app):
+    client = app.test_client()
+    login(client, 'testing@gmail.com', 'testtest')
+    return client
+
+
+@pytest.fixture
+def admin_client(app):
+    client = app.test_client()
+    login(client, 'admin@admin.com', 'admin123')
+    return client
+
+
+# ---------- Data helpers ---------- #
+def add_users(count):
+    """Insert `count` users (in the caller's app context), returns their ids."""
+    users = [User(username=f'racer{index}', email=f'racer{index}@example.com', password='password123') for index in range(count)]
+    db.session.add_all(users)
+    db.session.commit()
+    return [user.id for user in users]
+
+
+def add_course(name, trainer='Ana Lim', info='Hands-on class', price=100):
+    """Add a course running Monday and Friday mornings (in the caller's app context, uncommitted)."""
+    course = Course(
+        course_name=name, course_duration=3, course_price=price, course_slot=10, course_trainer=trainer, course_info=info,
+        course_slot_1_day='Monday', course_slot_1_time='9:00-11:00', course_slot_2_day='Friday', course_slot_2_time='9:00-11:00',
+    )
+    db.session.add(course)
+    return course
+
+
+def first_slot(course_id):
+    return CourseSlot.query.filter_by(course_id=course_id, position=1).one()
@@ -0,0 +1,75 @@
+import io
+
+from models import Course, Order
+from extensions import db
+from loadtest import CSRF_FIELD
+
+
+# ---------- Creating & editing courses ---------- #
+def test_editcourse_needs_admin(app, client):
+    assert client.get('/admin/editcourse').status_code == 403
+    response = client.post('/admin/editcourse', data=dict(
+        course_name='Songket', course_duration=2, course_price=120, course_slot=12, course_trainer='Siti', course_info='Weaving',
+        course_slot_1_day='Monday', course_slot_1_time='9:00-12:00', course_slot_2_day='Friday', course_slot_2_time='14:00-16:00',
+    ))
+    assert response.status_code == 403
+    with app.app_context():
+        assert Course.query.filter_by(course_name='Songket').count() == 0
+
+
+# ---------- Deleting a course ---------- #
+def test_delete_needs_post(client):
+    assert client.get('/delete/7').status_code == 405
+
+
+def test_delete_needs_admin(app, client):
+    assert client.post('/delete/7').status_code == 403
+    with app.app_context():
+        assert db.session.get(Course, 7) is not None
+
+
+def test_delete_needs_csrf_token(app, admin_client):
+    assert admin_client.post('/delete/7').status_code == 400
+    with app.app_context():
+        assert db.session.get(Course, 7) is not None
+
+
+def test_admin_deletes_course_with_its_orders(app, admin_client):
+    token = CSRF_FIELD.search(admin_client.get('/admin/editcourse').get_data(as_text=True)).group(1)
+    response = admin_client.post('/delete/7', data=dict(csrf_token=token))
+    assert response.status_code == 302
+    with app.app_context():
+        assert db.session.get(Course, 7) is None
+        assert Order.query.filter_by(course_id=7).count() == 0
+
+
+# ---------- Bulk import ---------- #
+IMPORT_HEADER = 'course_name,course_duration,course_price,course_slot,course_trainer,course_info,course_slot_1_day,course_slot_1_time,course_slot_2_day,course_slot_2_time\n'
+
+
+def upload(admin_client, rows, token=True):
+    data = dict(file=(io.BytesIO((IMPORT_HEADER + rows).encode()), 'courses.csv'))
+    if token:
+        data['csrf_token'] = CSRF_FIELD.search(admin_client.get('/admin/editcourse').get_data(as_text=True)).group(1)
+    return admin_client.post('/admin/import', data=data, content_type='multipart/form-data', follow_redirects=True)
+
+
+def test_import_needs_csrf_token(app, admin_client):
+    response = upload(admin_client, 'Songket,2,120,12,Siti,Weaving,Monday,9:00-12:00,Friday,14:00-16:00\n', token=False)
+    assert 'CSRF token is missing' in response.get_data(as_text=True)
+    with app.app_context():
+        assert Course.query.filter_by(course_name='Songket').first() is None
+
+
+def test_import_keeps_slots_above_taken_seats(app, admin_client):
+    # Batik has 40 of 40 seats registered
+    response = upload(admin_client, (
+        'Batik,5,800,10,Ju Wei,Wax-resist dyeing,Monday,11:00-13:00,Wednesday,14:00-16:00\n'
+        'Songket,2,120,12,Siti,Weaving,Monday,9:00-12:00,Friday,14:00-16:00\n'
+    ))
+    page = response.get_data(as_text=True)
+    assert 'Imported 1 new and 0 updated courses, 1 rows rejected' in page
+    assert 'below the 40 seats already registered or held' in page
+    with app.app_context():
+        assert Course.query.filter_by(course_name='Batik').one().course_slot == 40
+        assert Course.query.filter_by(course_name='Songket').one().course_slot == 12
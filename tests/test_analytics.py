@@ -0,0 +1,45 @@
+from datetime import date
+
+from extensions import db
+from models import Course
+from analytics import enrollment_summary, rebuild_stats
+from conftest import add_course, first_slot
+
+
+def seat_totals():
+    taken, total = db.session.execute(db.select(
+        db.func.sum(Course.course_order + Course.course_held), db.func.sum(Course.course_slot),
+    )).one()
+    return taken / total
+
+
+# ---------- Totals follow every write path ---------- #
+def test_summary_follows_holds_checkouts_and_course_edits(app, client):
+    with app.app_context():
+        before = enrollment_summary()
+        slot = first_slot(3)
+        day, time, price = slot.day, slot.time, db.session.get(Course, 3).course_price
+
+    # A held seat counts towards the fill ratio before it is paid for
+    client.post('/course', data=dict(add_cart='Kuih Muih', day=day, time=time))
+    with app.app_context():
+        summary = enrollment_summary()
+        assert summary['fill_ratio'] == seat_totals() > before['fill_ratio']
+        assert summary['orders'] == before['orders']
+
+    client.post('/course', data=dict(checkout='Checkout'))
+    with app.app_context():
+        summary = enrollment_summary()
+        assert (summary['orders'], summary['revenue']) == (before['orders'] + 1, before['revenue'] + price)
+        assert summary['daily'][-1]['day'] == str(date.today())
+        assert summary['fill_ratio'] == seat_totals()
+
+        # Seats of new and deleted courses
+        add_course('Songket')
+        db.session.commit()
+        assert enrollment_summary()['fill_ratio'] == seat_totals()
+        db.session.delete(Course.query.filter_by(course_name='Songket').one())
+        db.session.commit()
+        assert enrollment_summary()['fill_ratio'] == seat_totals()
+
+        assert rebuild_stats(check_only=True) == dict(course_stats=0, daily_stats=0, daily_totals=0, enrollment_totals=0)
@@ -0,0 +1,79 @@
+import threading
+import sqlite3
+import gzip
+
+from extensions import db
+from models import Course, Order
+from carts import cart_store
+from backup import backups
+from services import checkout_cart
+from conftest import add_users, first_slot
+
+
+# ---------- Online backup under checkout load ---------- #
+def test_backup_during_concurrent_checkouts(app, tmp_path):
+    workers, users_per_worker = 4, 100
+    # One page per step, so the copy is restarted by the checkouts and finishes in one pass beside them
+    app.config.update(BACKUP_PAGES=1, BACKUP_STEP_SLEEP=0.01)
+    with app.app_context():
+        course = db.session.get(Course, 7)
+        course.course_slot = course.course_order + workers * users_per_worker
+        course.course_held = 0
+        slot = first_slot(course.course_id)
+        user_ids = add_users(workers * users_per_worker)
+        for user_id in user_ids:
+            cart_store.add(user_id, course.course_id, slot, course.course_price)
+        db.session.commit()
+        course_id, orders_before = course.course_id, Order.query.count()
+
+    backing_up, done = threading.Event(), threading.Event()
+    registered, during_backup, errors = [], [], []
+
+    def checkout(user_ids):
+        with app.app_context():
+            for user_id in user_ids:
+                if done.is_set():
+                    break
+                try:
+                    cart, total = cart_store.cart(user_id)
+                    full, clashes, unscheduled = checkout_cart(user_id, cart, [])
+                    if full or clashes or unscheduled:
+                        errors.append((user_id, full, clashes, unscheduled))
+                    else:
+                        registered.append(user_id)
+                        if backing_up.is_set():
+                            during_backup.append(user_id)
+                except Exception as error:
+                    errors.append(error)
+                finally:
+                    db.session.remove()
+
+    threads = [
+        threading.Thread(target=checkout, args=(user_ids[index::workers],))
+        for index in range(workers)
+    ]
+    for thread in threads:
+        thread.start()
+    backing_up.set()
+    try:
+        result = backups.backup()
+    finally:
+        backing_up.clear()
+        done.set()
+        for thread in threads:
+            thread.join()
+
+    assert errors == []
+    assert during_backup
+    snapshot = tmp_path / 'snapshot.db'
+    with gzip.open(result['path'], 'rb') as compressed:
+        snapshot.write_bytes(compressed.read())
+    with sqlite3.connect(snapshot) as conn:
+        assert conn.execute('PRAGMA quick_check').fetchone() == ('ok',)
+        # A consistent point in time: somewhere between the first and the last checkout
+        orders = conn.execute('SELECT count(*) FROM "order"').fetchone()[0]
+        taken = conn.execute('SELECT course_order FROM course WHERE course_id = ?', (course_id,)).fetchone()[0]
+    assert orders_before <= orders <= orders_before + len(registered)
+    with app.app_context():
+        assert Order.query.count() == orders_before + len(registered)
+        assert db.session.get(Course, course_id).course_order - taken == orders_before + len(registered) - orders
@@ -0,0 +1,62 @@
+from catalog import catalog
+from services import feedback_version
+from conftest import first_slot, login
+
+
+def revalidate(client, url):
+    """The page's ETag, and the status of a conditional GET with it."""
+    etag = client.get(url).headers['ETag']
+    return etag, client.get(url, headers={'If-None-Match': etag}).status_code
+
+
+# ---------- Shared copy of anonymous pages ---------- #
+def test_index_is_cached_for_anonymous_visitors(app):
+    client = app.test_client()
+    response = client.get('/')
+    assert response.headers['ETag'] and not response.headers['ETag'].startswith('W/')
+    assert 'public' in response.headers['Cache-Control']
+
+    repeat = client.get('/', headers={'If-None-Match': response.headers['ETag']})
+    assert repeat.status_code == 304 and repeat.data == b''
+
+    # Logged in, the page isn't served from the shared copy
+    login(client, 'testing@gmail.com', 'testtest')
+    assert 'ETag' not in client.get('/').headers
+
+
+# ---------- Per-user ETags on logged in pages ---------- #
+def test_private_pages_revalidate_until_something_changes(app, client):
+    # The first page after login carries a flash and is never cached
+    client.get('/dashboard')
+    for page in ('/course', '/dashboard', '/about'):
+        etag, status = revalidate(client, page)
+        assert etag.startswith('W/') and status == 304
+        assert 'private' in client.get(page).headers['Cache-Control']
+
+    # The user's cart changed: every page of theirs is stale
+    etag, _ = revalidate(client, '/about')
+    with app.app_context():
+        slot = first_slot(3)
+        day, time = slot.day, slot.time
+    client.post('/course', data=dict(add_cart='Kuih Muih', day=day, time=time))
+    client.get('/course')
+    assert client.get('/about', headers={'If-None-Match': etag}).status_code == 200
+
+    # Admin course edits move the catalog stamp, new feedback the dashboard's
+    etag, _ = revalidate(client, '/course')
+    with app.app_context():
+        catalog.invalidate()
+    assert client.get('/course', headers={'If-None-Match': etag}).status_code == 200
+    etag, _ = revalidate(client, '/dashboard')
+    with app.app_context():
+        feedback_version.bump()
+    assert client.get('/dashboard', headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_private_etags_differ_per_user(app, client):
+    client.get('/about')
+    etag, _ = revalidate(client, '/about')
+    other = app.test_client()
+    login(other, 'admin@admin.com', 'admin123')
+    other.get('/about')
+    assert other.get('/about', headers={'If-None-Match': etag}).status_code == 200
@@ -0,0 +1,52 @@
+from datetime import datetime
+
+import pytest
+
+from extensions import db
+from models import CalendarEvent, Order
+from conftest import first_slot
+
+
+# ---------- Date-range feed ---------- #
+def test_events_in_range(app, client):
+    with app.app_context():
+        db.session.add_all([
+            CalendarEvent(user_id=2, title='Inside', start=datetime(2026, 1, 6, 10)),
+            # Started before the window and runs into it
+            CalendarEvent(user_id=2, title='Overlapping', start=datetime(2026, 1, 3), end=datetime(2026, 1, 5, 12)),
+            CalendarEvent(user_id=2, title='Before', start=datetime(2026, 1, 1), end=datetime(2026, 1, 2)),
+            CalendarEvent(user_id=2, title='After', start=datetime(2026, 1, 12)),
+            CalendarEvent(user_id=3, title='Someone else', start=datetime(2026, 1, 6, 10)),
+        ])
+        # Course 7 runs Monday 11:00-13:00; sessions start on the first Monday after the order
+        db.session.add(Order(
+            user_id=2, course_id=7, slot_id=first_slot(7).slot_id, slot_day='Monday', slot_time='11:00-13:00',
+            order_price=100, order_date_created=datetime(2026, 1, 1, 9),
+        ))
+        db.session.commit()
+
+    response = client.get('/api/events?start=2026-01-05&end=2026-01-12')
+    assert response.status_code == 200
+    events = response.get_json()
+    assert sorted(event['title'] for event in events if not event.get('registered')) == ['Inside', 'Overlapping']
+    assert [(event['start'], event['end']) for event in events if event.get('registered')] == [('2026-01-05T11:00:00', '2026-01-05T13:00:00')]
+
+
+@pytest.mark.parametrize('query', [
+    '',
+    'start=2026-01-05',
+    'start=soon&end=2026-01-12',
+    # end has to come after start
+    'start=2026-01-12&end=2026-01-05',
+    'start=2026-01-05&end=2026-01-05',
+    # and less than CALENDAR_MAX_RANGE_DAYS (366) later
+    'start=2026-01-01&end=2027-01-03',
+])
+def test_events_rejects_bad_ranges(client, query):
+    response = client.get('/api/events?' + query)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+
+def test_events_range_limit_is_inclusive(client):
+    assert client.get('/api/events?start=2026-01-01&end=2027-01-02').status_code == 200
@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta
+import subprocess
+import sys
+import os
+
+import pytest
+
+from extensions import db
+from models import Course, Cart, Order
+from carts import cart_store, MemoryCarts
+from reservations import add_to_cart, seat_holds
+from conftest import ROOT, make_app, dispose, first_slot
+
+
+# Every test here runs on the per-process store
+@pytest.fixture
+def app(tmp_path):
+    app = make_app(tmp_path, CART_STORE='memory')
+    yield app
+    dispose(app)
+
+
+# ---------- Entries and running totals ---------- #
+def test_memory_carts_keep_items_and_total(app):
+    assert isinstance(cart_store.backend, MemoryCarts)
+    with app.app_context():
+        cart_store.add(2, 3, first_slot(3), 300)
+        cart_store.add(2, 4, first_slot(4), 250)
+        # Adding a course twice keeps the first entry
+        cart_store.add(2, 3, first_slot(3), 999)
+        cart_store.add(3, 4, first_slot(4), 250)
+
+        items, total = cart_store.cart(2)
+        assert [(item.course_id, item.position, item.course_price) for item in items] == [(3, 1, 300), (4, 1, 250)]
+        assert total == 550 and items[0].course_name == 'Kuih Muih'
+        assert cart_store.has(2, 4) and not cart_store.has(3, 3)
+
+        cart_store.remove(2, [3])
+        assert cart_store.cart(2)[1] == 250
+        # A deleted course leaves every cart
+        cart_store.remove_course(4)
+        assert cart_store.cart(2) == ([], 0) and cart_store.cart(3) == ([], 0)
+        # Nothing reached SQLite
+        assert Cart.query.count() == 0
+
+
+# ---------- Holds and checkout ---------- #
+def test_memory_cart_checkout(app, client):
+    with app.app_context():
+        slot = first_slot(3)
+        day, time = slot.day, slot.time
+        held = db.session.get(Course, 3).course_held
+
+    client.post('/course', data=dict(add_cart='Kuih Muih', day=day, time=time))
+    with app.app_context():
+        assert cart_store.has(2, 3) and Cart.query.count() == 0
+        assert db.session.get(Course, 3).course_held == held + 1
+
+    response = client.post('/myplan', data=dict(checkout='Checkout'), follow_redirects=True)
+    assert 'Courses successfully registered' in response.get_data(as_text=True)
+    with app.app_context():
+        assert Order.query.filter_by(user_id=2, course_id=3).count() == 1
+        assert not cart_store.has(2, 3)
+        assert db.session.get(Course, 3).course_held == held
+
+
+def test_memory_holds_expire(app):
+    with app.app_context():
+        course = db.session.get(Course, 3)
+        held = course.course_held
+        assert add_to_cart(2, course, first_slot(3))
+        assert db.session.get(Course, 3).course_held == held + 1
+
+        # Not due yet, then past SEAT_HOLD_SECONDS
+        assert seat_holds.reap() == 0
+        assert seat_holds.reap(datetime.utcnow() + timedelta(seconds=app.config['SEAT_HOLD_SECONDS'] + 1)) == 1
+        assert db.session.get(Course, 3).course_held == held
+        # The course stays in the cart, without a seat
+        [item] = cart_store.cart(2)[0]
+        assert item.hold_expires is None
+
+
+# ---------- One worker only ---------- #
+def test_memory_store_refuses_several_workers():
+    pytest.importorskip('gunicorn')
+    result = subprocess.run(
+        [sys.executable, '-m', 'gunicorn', '--workers', '2', '--bind', '127.0.0.1:0', 'app:create_app()'],
+        cwd=ROOT, env={**os.environ, 'CART_STORE': 'memory'}, capture_output=True, text=True, timeout=60,
+    )
+    assert result.returncode == 1
+    assert 'CART_STORE=memory keeps carts in one process' in result.stderr
@@ -0,0 +1,92 @@
+import json
+
+from catalog import catalog, course_rows_cache
+from loadtest import CSRF_FIELD
+from conftest import first_slot
+
+
+# ---------- Checkouts only move the seat counts ---------- #
+def test_checkout_keeps_catalog_snapshot(app, client):
+    with app.app_context():
+        slot = first_slot(3)
+        day, time = slot.day, slot.time
+    client.get('/course')
+    with app.app_context():
+        courses, version, fragments = catalog.courses(), catalog.version, dict(course_rows_cache._fragments)
+        taken, capacity = catalog.seats()[3]
+
+    client.post('/course', data=dict(add_cart='Kuih Muih', day=day, time=time))
+    client.post('/course', data=dict(checkout='Checkout'))
+
+    page = client.get('/course').get_data(as_text=True)
+    assert f'data-seats="3"> {taken + 1}/{capacity} </td>' in page
+    with app.app_context():
+        # Same snapshot and cached fragments, only the seat overlay was reloaded
+        assert catalog.courses() is courses
+        assert catalog.version == version
+        assert course_rows_cache.version == version and dict(course_rows_cache._fragments) == fragments
+        assert catalog.seats()[3] == (taken + 1, capacity)
+
+
+# ---------- Admin writes still reload the catalog ---------- #
+def test_admin_create_reloads_catalog(app, admin_client):
+    with app.app_context():
+        version = catalog.stamp()
+    token = CSRF_FIELD.search(admin_client.get('/admin/editcourse').get_data(as_text=True)).group(1)
+    admin_client.post('/admin/editcourse', data=dict(
+        csrf_token=token, course_name='Songket', course_duration=2, course_price=120, course_slot=12,
+        course_trainer='Siti', course_info='Weaving', course_slot_1_day='Monday', course_slot_1_time='9:00-12:00',
+        course_slot_2_day='Friday', course_slot_2_time='14:00-16:00',
+    ))
+    with app.app_context():
+        assert catalog.stamp() != version
+        course = catalog.get('Songket')
+        assert course is not None and catalog.seats()[course.course_id] == (0, 12)
+
+
+# ---------- Live seat counts over SSE ---------- #
+def test_seat_feed_pushes_checkout_deltas(app, client):
+    app.config.update(SEAT_FEED_POLL_SECONDS=0.05, SEAT_FEED_HEARTBEAT_SECONDS=5)
+    with app.app_context():
+        slot = first_slot(3)
+        day, time = slot.day, slot.time
+        taken, capacity = catalog.seats()[3]
+
+    frames = iter(client.get('/course/seats', buffered=False).response)
+    first = next(frames).decode()
+    event_id = first.split('\n')[0].removeprefix('id: ')
+    assert 'event: seats' in first
+    # The first frame is the whole state
+    assert json.loads(first.split('data: ')[1])['3'] == [taken, capacity]
+
+    client.post('/course', data=dict(add_cart='Kuih Muih', day=day, time=time))
+    client.post('/course', data=dict(checkout='Checkout'))
+    delta = next(frames).decode()
+    # Then only the course that moved
+    assert json.loads(delta.split('data: ')[1]) == {'3': [taken + 1, capacity]}
+
+    # Reconnecting with Last-Event-ID replays only what was missed
+    missed = next(iter(client.get('/course/seats', headers={'Last-Event-ID': event_id}, buffered=False).response)).decode()
+    assert json.loads(missed.split('data: ')[1]) == {'3': [taken + 1, capacity]}
+
+
+# ---------- Held seats count as taken ---------- #
+def test_held_seats_show_as_taken(app, client):
+    with app.app_context():
+        slot = first_slot(3)
+        day, time = slot.day, slot.time
+        taken, capacity = catalog.seats()[3]
+
+    client.get('/course')
+    # In the cart only: the seat is held, not registered
+    client.post('/course', data=dict(add_cart='Kuih Muih', day=day, time=time))
+    assert f'data-seats="3"> {taken + 1}/{capacity} </td>' in client.get('/course').get_data(as_text=True)
+    courses = client.get('/api/courses').get_json()['courses']
+    assert next(course for course in courses if course['course_id'] == 3)['seats_taken'] == taken + 1
+    frame = next(iter(client.get('/course/seats', buffered=False).response)).decode()
+    assert json.loads(frame.split('data: ')[1])['3'] == [taken + 1, capacity]
+
+    # Removing it frees the seat again
+    client.post('/course', data=dict(remove='Kuih Muih'))
+    with app.app_context():
+        assert catalog.seats()[3] == (taken, capacity)
@@ -0,0 +1,88 @@
+import threading
+
+import pytest
+
+from extensions import db
+from models import Course, Order, Cart
+from carts import cart_store
+from services import checkout_cart
+from conftest import add_users, first_slot
+
+
+# ---------- No oversell under concurrent checkouts ---------- #
+def test_concurrent_checkouts_never_oversell(app):
+    racers, seats = 40, 3
+    with app.app_context():
+        course = db.session.get(Course, 7)
+        course.course_slot = course.course_order + seats
+        course.course_held = 0
+        slot = first_slot(course.course_id)
+        user_ids = add_users(racers)
+        # Carted without a hold, so every checkout competes for the free seats
+        for user_id in user_ids:
+            cart_store.add(user_id, course.course_id, slot, course.course_price)
+        db.session.commit()
+        course_id, orders_before, slot_count = course.course_id, course.course_order, course.course_slot
+
+    start = threading.Barrier(racers)
+    outcomes, errors = {}, []
+
+    def checkout(user_id):
+        with app.app_context():
+            cart, total = cart_store.cart(user_id)
+            start.wait()
+            try:
+                outcomes[user_id] = checkout_cart(user_id, cart, [])
+            except Exception as error:
+                errors.append(error)
+            finally:
+                db.session.remove()
+
+    threads = [threading.Thread(target=checkout, args=(user_id,)) for user_id in user_ids]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    registered = [user_id for user_id, (full, clashes, unscheduled) in outcomes.items() if not full]
+    assert len(registered) == seats
+    with app.app_context():
+        course = db.session.get(Course, course_id)
+        assert course.course_order == slot_count == orders_before + seats
+        assert Order.query.filter(Order.course_id == course_id, Order.user_id.in_(user_ids)).count() == seats
+        # The losers keep the course in their cart
+        for user_id in set(user_ids) - set(registered):
+            assert cart_store.has(user_id, course_id)
+
+
+# ---------- Checkout from every page with the cart ---------- #
+@pytest.mark.parametrize('page', ['/dashboard', '/myplan', '/course', '/about'])
+def test_checkout_from_page(app, client, page):
+    with app.app_context():
+        slot = first_slot(3)
+        day, time = slot.day, slot.time
+    added = client.post('/course', data=dict(add_cart='Kuih Muih', day=day, time=time))
+    assert added.status_code == 302
+
+    response = client.post(page, data=dict(checkout='Checkout'))
+    assert response.status_code == 302
+    assert response.location.endswith(page)
+    assert 'Courses successfully registered' in client.get(page).get_data(as_text=True)
+    with app.app_context():
+        assert Order.query.filter_by(user_id=2, course_id=3).count() == 1
+        assert not cart_store.has(2, 3)
+
+
+# ---------- Cart items without a slot ---------- #
+def test_checkout_keeps_items_without_a_slot(app, client):
+    with app.app_context():
+        # Carted before slots existed, in a spelling the migration couldn't match
+        db.session.add(Cart(user_id=2, course_id=3, course_price=100, slot_day='Someday', slot_time='', slot_id=None))
+        db.session.commit()
+
+    response = client.post('/myplan', data=dict(checkout='Checkout'), follow_redirects=True)
+    assert 'Kuih Muih has no day and time picked' in response.get_data(as_text=True)
+    with app.app_context():
+        assert Order.query.filter_by(user_id=2, course_id=3).count() == 0
+        assert cart_store.has(2, 3)
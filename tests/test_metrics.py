@@ -0,0 +1,35 @@
+import pytest
+from sqlalchemy import event
+
+from extensions import db, request_metrics
+from conftest import make_app, dispose, login
+
+
+@pytest.fixture
+def metrics_app(tmp_path):
+    app = make_app(tmp_path, METRICS_ENABLED=True)
+    yield app
+    dispose(app)
+
+
+# ---------- Admins only ---------- #
+def test_metrics_are_admin_only(metrics_app):
+    user, admin = metrics_app.test_client(), metrics_app.test_client()
+    login(user, 'testing@gmail.com', 'testtest')
+    login(admin, 'admin@admin.com', 'admin123')
+    user.get('/course')
+
+    assert user.get('/admin/metrics').status_code == 403
+    response = admin.get('/admin/metrics')
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain; version=0.0.4')
+    assert 'app_request_queries_count{route="main.course"} 1' in response.get_data(as_text=True)
+
+
+# ---------- Off unless asked for, even after an app that had it on ---------- #
+def test_profiling_is_off_by_default(app, admin_client):
+    assert admin_client.get('/admin/metrics').status_code == 404
+    with app.app_context():
+        for engine in (db.engine, app.extensions['sqlite_read_engine']):
+            assert not event.contains(engine, 'after_cursor_execute', request_metrics._after_cursor_execute)
+    assert request_metrics._start not in app.before_request_funcs.get(None, [])
@@ -0,0 +1,130 @@
+import sqlite3
+
+import pytest
+
+from extensions import db
+from models import Cart, Order
+from catalog import course_search
+from analytics import rebuild_stats
+from conftest import make_app, dispose, first_slot
+
+# The schema database.db shipped with before course ids, slots, holds and prices
+LEGACY_SCHEMA = """
+CREATE TABLE user (id INTEGER NOT NULL, type VARCHAR(10), username VARCHAR(50) NOT NULL, email VARCHAR(50) NOT NULL,
+    password VARCHAR(50) NOT NULL, PRIMARY KEY (id), UNIQUE (email));
+CREATE TABLE "order" (order_id INTEGER NOT NULL, user_id INTEGER NOT NULL, course_name VARCHAR(50) NOT NULL,
+    slot_day VARCHAR NOT NULL, slot_time VARCHAR NOT NULL, PRIMARY KEY (order_id));
+CREATE TABLE "course" ("course_id" INTEGER NOT NULL, "course_name" VARCHAR(50) NOT NULL, "course_duration" BLOB NOT NULL,
+    "course_price" INTEGER NOT NULL, "course_slot" INTEGER NOT NULL, "course_trainer" VARCHAR(50) NOT NULL,
+    "course_order" INTEGER DEFAULT 0, "course_date_created" DATETIME NOT NULL, "course_info" VARCHAR(200) NOT NULL,
+    "course_slot_1_day" VARCHAR NOT NULL, "course_slot_1_time" VARCHAR NOT NULL,
+    "course_slot_2_day" VARCHAR NOT NULL, "course_slot_2_time" VARCHAR NOT NULL,
+    UNIQUE("course_name"), PRIMARY KEY("course_id"));
+CREATE TABLE "cart" ("cart_id" INTEGER NOT NULL, "user_id" INTEGER NOT NULL, "course_name" VARCHAR(50) NOT NULL,
+    "course_price" INTEGER NOT NULL, "slot_day" VARCHAR NOT NULL, "slot_time" VARCHAR NOT NULL, PRIMARY KEY("cart_id"));
+CREATE TABLE feedback (feedback_id INTEGER NOT NULL, user_name VARCHAR(50) NOT NULL, feedback VARCHAR(3000) NOT NULL,
+    PRIMARY KEY (feedback_id));
+
+INSERT INTO user VALUES (1, 'Admin', 'admin', 'admin@admin.com', 'admin123'), (2, 'User', 'testing', 'testing@gmail.com', 'testtest');
+INSERT INTO course VALUES
+    (1, 'Batik', 3, 800, 10, 'Ana Lim', 2, '2023-01-01 09:00:00', 'Wax-resist dyeing', 'Monday', '11:00-13:00', 'Wednesday', '14:00-16:00'),
+    (3, 'Kuih Muih', 2, 300, 10, 'Lee Mei', 0, '2023-01-01 09:00:00', 'Malay sweets', 'Tuesday', '9:00-12:00', 'Wednesday', '15:00-17:00');
+INSERT INTO "order" VALUES (1, 2, 'Batik', 'Monday', '11:00-13:00'), (2, 1, 'Batik', 'Wednesday', '14:00-16:00'),
+    (3, 2, 'Deleted Course', 'Monday', '9:00-11:00');
+INSERT INTO cart VALUES (1, 2, 'Kuih Muih', 300, 'Tuesday', '9:00-12:00');
+"""
+
+
+@pytest.fixture
+def legacy_app(tmp_path):
+    database = tmp_path / 'legacy.db'
+    with sqlite3.connect(database) as conn:
+        conn.executescript(LEGACY_SCHEMA)
+    conn.close()
+    app = make_app(tmp_path, SQLALCHEMY_DATABASE_URI=f'sqlite:///{database}')
+    yield app
+    dispose(app)
+
+
+def tables(app):
+    with app.app_context():
+        return set(db.inspect(db.engine).get_table_names())
+
+
+# ---------- Upgrading the original schema ---------- #
+def test_migrate_upgrades_legacy_schema(legacy_app):
+    result = legacy_app.test_cli_runner().invoke(args=['migrate-db'])
+    assert result.exit_code == 0, result.output
+    assert 'order: migrated 2 rows, dropped 1 rows' in result.output
+    assert not {'cart_old', 'order_old'} & tables(legacy_app)
+
+    with legacy_app.app_context():
+        orders = Order.query.order_by(Order.order_id).all()
+        assert [(order.course_id, order.order_price) for order in orders] == [(1, 800), (1, 800)]
+        assert all(order.slot_id is not None and order.order_date_created is not None for order in orders)
+        [cart] = Cart.query.all()
+        assert (cart.course_id, cart.slot_id is not None) == (3, True)
+        assert set(rebuild_stats(check_only=True).values()) == {0}
+
+    # Running it again changes nothing
+    result = legacy_app.test_cli_runner().invoke(args=['migrate-db'])
+    assert result.exit_code == 0 and 'migrated' not in result.output
+
+
+def test_failed_migrate_leaves_legacy_schema(legacy_app, monkeypatch):
+    def broken(conn):
+        raise RuntimeError('disk full')
+    # The last step of the schema transaction, after cart and order were rebuilt
+    monkeypatch.setattr(course_search, 'setup', broken)
+    result = legacy_app.test_cli_runner().invoke(args=['migrate-db'])
+    assert isinstance(result.exception, RuntimeError)
+
+    assert tables(legacy_app) == {'user', 'course', 'order', 'cart', 'feedback'}
+    with legacy_app.app_context():
+        assert db.session.execute(db.text('SELECT course_name FROM "order" ORDER BY order_id')).scalars().all() == [
+            'Batik', 'Batik', 'Deleted Course',
+        ]
+
+
+# ---------- Slot backfill for rows from before course_slot ---------- #
+def test_migrate_matches_legacy_rows_by_parsed_slot(app):
+    with app.app_context():
+        slot_id = first_slot(7).slot_id
+        # Course 7 runs Monday 11:00-13:00, written differently than on the course
+        rows = [
+            Cart(user_id=3, course_id=7, course_price=100, slot_day='mon', slot_time='11:00 - 13:00'),
+            Order(user_id=3, course_id=7, order_price=100, slot_day='Monday', slot_time='11:00-13:00'),
+            # Not a day course 7 runs on
+            Cart(user_id=4, course_id=7, course_price=100, slot_day='Sunday', slot_time='11:00-13:00'),
+        ]
+        db.session.add_all(rows)
+        db.session.commit()
+        cart_id, order_id, unmatched_id = rows[0].cart_id, rows[1].order_id, rows[2].cart_id
+
+    result = app.test_cli_runner().invoke(args=['migrate-db'])
+    assert result.exit_code == 0, result.output
+    assert 'cart: 1 items match none' in result.output
+
+    with app.app_context():
+        assert db.session.get(Cart, cart_id).slot_id == slot_id
+        assert db.session.get(Order, order_id).slot_id == slot_id
+        assert db.session.get(Cart, unmatched_id).slot_id is None
+
+
+# ---------- Orders without a date ---------- #
+def test_migrate_dates_orders_without_one(app):
+    with app.app_context():
+        order = Order(user_id=3, course_id=7, order_price=100, slot_day='Monday', slot_time='11:00-13:00')
+        db.session.add(order)
+        db.session.flush()
+        # As copied in by the cart/order rebuild of a database from before order_date_created
+        db.session.execute(db.update(Order).where(Order.order_id == order.order_id).values(order_date_created=None))
+        db.session.commit()
+        order_id = order.order_id
+
+    result = app.test_cli_runner().invoke(args=['migrate-db'])
+    assert result.exit_code == 0, result.output
+
+    with app.app_context():
+        assert db.session.get(Order, order_id).order_date_created is not None
+        assert rebuild_stats(check_only=True)['daily_stats'] == 0
@@ -0,0 +1,52 @@
+from extensions import db
+from models import Course, Feedback
+from catalog import catalog
+from services import feedback_version, encode_cursor, decode_cursor
+from conftest import add_course
+
+
+def walk(client, url, cursor_arg, items):
+    """Follow `next` from the first page to the last, returns every item in order."""
+    seen, cursor = [], None
+    while True:
+        page = client.get(url + (f'{cursor_arg}={cursor}' if cursor else '')).get_json()
+        seen += page[items]
+        cursor = page['next']
+        if cursor is None:
+            return seen
+
+
+# ---------- Keyset cursors ---------- #
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor((100, 7))) == (100, 7)
+    assert encode_cursor(None) is None
+    assert decode_cursor('') is None and decode_cursor('100:x') is None
+
+
+def test_course_pages_break_ties_on_id(app, client):
+    app.config['COURSES_PER_PAGE'] = 2
+    with app.app_context():
+        # Five courses at one price, so page breaks land inside a run of equal keys
+        for index in range(5):
+            add_course(f'Tie {index}', price=100)
+        db.session.commit()
+        catalog.invalidate()
+        expected = [course.course_id for course in Course.query.order_by(Course.course_price, Course.course_id)]
+
+    courses = walk(client, '/api/courses?list=price&', 'after', 'courses')
+    assert [course['course_id'] for course in courses] == expected
+    # The same ordering as the unpaged view
+    with app.app_context():
+        assert [course.course_id for course in catalog.courses('price')] == expected
+
+
+def test_feedback_pages_cover_every_entry_once(app, client):
+    app.config['FEEDBACKS_PER_PAGE'] = 3
+    with app.app_context():
+        db.session.add_all(Feedback(user_name='testing', feedback=f'Entry {index}') for index in range(10))
+        db.session.commit()
+        feedback_version.bump()
+        expected = [feedback.feedback_id for feedback in Feedback.query.order_by(Feedback.feedback_id.desc())]
+
+    feedbacks = walk(client, '/api/feedbacks?', 'before', 'feedbacks')
+    assert [feedback['feedback_id'] for feedback in feedbacks] == expected
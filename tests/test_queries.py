@@ -0,0 +1,60 @@
+import threading
+
+import pytest
+from sqlalchemy import event
+
+from extensions import db
+from conftest import first_slot
+
+
+# ---------- SQL statements per request ---------- #
+@pytest.fixture
+def statements(app):
+    """SQL run on the app's engines by the test's own thread, which also runs the test client's requests."""
+    with app.app_context():
+        engines = [db.engine, app.extensions['sqlite_read_engine']]
+    executed = []
+    # Background tasks (seat feed watcher, reaper, flushers) keep their own schedule
+    thread = threading.get_ident()
+
+    def record(conn, cursor, statement, *args):
+        if threading.get_ident() == thread:
+            executed.append(statement)
+
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', record)
+    yield executed
+    for engine in engines:
+        event.remove(engine, 'before_cursor_execute', record)
+
+
+# At most the user with their cart and waitlist, then their orders
+@pytest.mark.parametrize('page', ['/about', '/myplan', '/dashboard', '/course', '/course?list=price'])
+def test_page_queries(client, statements, page):
+    # The first visit fills the catalog, seat count and feedback caches
+    assert client.get(page).status_code == 200
+    statements.clear()
+    assert client.get(page, headers={'Cache-Control': 'no-cache'}).status_code == 200
+    assert len(statements) <= 2, statements
+
+
+def test_page_queries_after_checkout(app, client, statements):
+    with app.app_context():
+        slot = first_slot(3)
+        day, time = slot.day, slot.time
+    client.get('/course')
+    client.post('/course', data=dict(add_cart='Kuih Muih', day=day, time=time))
+    client.post('/course', data=dict(checkout='Checkout'))
+    statements.clear()
+    # Only the seat counts are reloaded, not the catalog
+    client.get('/course')
+    assert len(statements) <= 3, statements
+
+
+def test_revalidation_skips_the_database(client, statements):
+    # The first page after login shows its flash and isn't cached
+    client.get('/about')
+    etag = client.get('/about').headers['ETag']
+    statements.clear()
+    assert client.get('/about', headers={'If-None-Match': etag}).status_code == 304
+    assert statements == []
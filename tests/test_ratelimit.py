@@ -0,0 +1,56 @@
+import pytest
+
+from ratelimit import MemoryBuckets, SharedBuckets
+from conftest import make_app, dispose
+
+
+@pytest.fixture
+def app(tmp_path):
+    # Two login attempts per email a minute, so the third one drains the bucket
+    app = make_app(tmp_path, RATELIMIT_ENABLED=True, RATELIMIT_LOGIN_PER_IP=(100, 60), RATELIMIT_LOGIN_PER_EMAIL=(2, 60))
+    yield app
+    dispose(app)
+
+
+def attempt(client, email, **headers):
+    return client.post('/login', data=dict(email=email, password='wrong-password'), headers=headers)
+
+
+# ---------- Login limits ---------- #
+def test_login_gets_429_once_the_bucket_drains(app):
+    client = app.test_client()
+    assert [attempt(client, 'testing@gmail.com').status_code for _ in range(2)] == [200, 200]
+
+    response = attempt(client, 'testing@gmail.com')
+    assert response.status_code == 429
+    # One token every 60 / 2 seconds
+    assert 29 <= int(response.headers['Retry-After']) <= 30
+
+    # Other emails and the form itself are left alone
+    assert attempt(client, 'testing1@gmail.com').status_code == 200
+    assert client.get('/login').status_code == 200
+
+
+def test_forwarded_ip_is_the_key_behind_a_proxy(app):
+    app.config.update(RATELIMIT_PROXY_HOPS=1, RATELIMIT_LOGIN_PER_IP=(1, 60))
+    client = app.test_client()
+    assert attempt(client, 'a@example.com', **{'X-Forwarded-For': '203.0.113.7'}).status_code == 200
+    assert attempt(client, 'b@example.com', **{'X-Forwarded-For': '203.0.113.7'}).status_code == 429
+    # Same proxy address, another client
+    assert attempt(client, 'c@example.com', **{'X-Forwarded-For': '203.0.113.8'}).status_code == 200
+
+
+# ---------- Buckets ---------- #
+def test_buckets_refill_over_time():
+    buckets = MemoryBuckets()
+    assert [buckets.take('key', 2, 1.0, 100.0) for _ in range(2)] == [0, 0]
+    assert buckets.take('key', 2, 1.0, 100.0) == pytest.approx(1.0)
+    assert buckets.take('key', 2, 1.0, 101.0) == 0
+
+
+def test_shared_buckets_are_shared_between_workers(tmp_path):
+    # Two mappings of one file, as two gunicorn workers have
+    first, second = SharedBuckets(str(tmp_path / 'buckets'), 64), SharedBuckets(str(tmp_path / 'buckets'), 64)
+    assert first.take('login:1.2.3.4', 2, 1.0, 100.0) == 0
+    assert second.take('login:1.2.3.4', 2, 1.0, 100.0) == 0
+    assert first.take('login:1.2.3.4', 2, 1.0, 100.0) > 0
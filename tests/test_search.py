@@ -0,0 +1,33 @@
+from extensions import db
+from models import Course
+from catalog import catalog, course_search
+from conftest import add_course
+
+
+# ---------- Ranking, and the same ranking without FTS5 ---------- #
+def test_search_ranks_name_over_trainer_over_description(app, monkeypatch):
+    with app.app_context():
+        # 'pott' matches each course in one field only
+        add_course('Weaving', 'Ana Lim', 'Rattan baskets, plus a word on pottery glazes')
+        add_course('Clay Pottery', 'Ana Lim', 'Hand-built bowls and cups')
+        add_course('Batik Two', 'Potter Lee', 'Wax-resist dyeing on cotton')
+        db.session.commit()
+        catalog.invalidate()
+
+        ranked = [course.course_name for course in course_search.search('pott')]
+        assert ranked == ['Clay Pottery', 'Batik Two', 'Weaving']
+        # Every word has to match, as a prefix
+        assert [course.course_name for course in course_search.search('clay pot')] == ['Clay Pottery']
+        assert course_search.search('pottery zzz') == []
+
+        # A build without FTS5 falls back to the in-memory index
+        monkeypatch.setattr(course_search, 'backend', None)
+        monkeypatch.setattr(course_search, 'setup', lambda conn: False)
+        assert [course.course_name for course in course_search.search('pott')] == ranked
+        assert course_search.backend == 'python'
+
+        # Which follows the catalog version
+        db.session.delete(Course.query.filter_by(course_name='Batik Two').one())
+        db.session.commit()
+        catalog.invalidate()
+        assert [course.course_name for course in course_search.search('pott')] == ['Clay Pottery', 'Weaving']
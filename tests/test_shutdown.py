@@ -0,0 +1,111 @@
+import http.cookiejar
+import urllib.parse
+import urllib.request
+import subprocess
+import sqlite3
+import shutil
+import signal
+import socket
+import sys
+import time
+import os
+
+import pytest
+
+from conftest import ROOT
+from loadtest import CSRF_FIELD
+
+pytest.importorskip('gunicorn')
+pytest.importorskip('eventlet')
+
+
+# ---------- Procfile worker (gunicorn + eventlet) ---------- #
+@pytest.fixture
+def server(tmp_path):
+    """Start the Procfile's gunicorn eventlet worker on a copy of template.db, returns (url, process, database)."""
+    database = tmp_path / 'database.db'
+    shutil.copy(os.path.join(ROOT, 'template.db'), database)
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    # Long flush intervals, so queued feedback is only written when the worker exits
+    factory = (
+        f"app:create_app({{'SQLALCHEMY_DATABASE_URI': 'sqlite:///{database}', 'PASSWORD_POOL_SIZE': 2, 'PASSWORD_SCRYPT_COST': (1024, 8, 1),"
+        " 'FEEDBACK_FLUSH_SECONDS': 600, 'CHAT_FLUSH_SECONDS': 600})"
+    )
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--worker-class', 'eventlet', '--bind', f'127.0.0.1:{port}', factory],
+        cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+    )
+    url = f'http://127.0.0.1:{port}'
+    for _ in range(150):
+        try:
+            urllib.request.urlopen(url + '/login', timeout=1)
+            break
+        except OSError:
+            time.sleep(0.2)
+    yield url, process, database
+    if process.poll() is None:
+        process.kill()
+        process.communicate()
+
+
+def browser():
+    return urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+
+def login(opener, url, email, password):
+    token = CSRF_FIELD.search(opener.open(url + '/login').read().decode()).group(1)
+    return opener.open(url + '/login', urllib.parse.urlencode(dict(email=email, password=password, csrf_token=token)).encode())
+
+
+def stop(process, timeout=30):
+    """SIGTERM like a deploy does; returns the server's log, fails if it doesn't exit in time."""
+    process.send_signal(signal.SIGTERM)
+    try:
+        output, _ = process.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        output, _ = process.communicate()
+        pytest.fail(f'gunicorn did not exit within {timeout}s of SIGTERM:\n{output}')
+    return output
+
+
+def test_worker_exits_after_password_checks(server):
+    url, process, database = server
+    # The login rehashes the demo row's plaintext password, so both hash and verify run in the pool
+    response = login(browser(), url, 'testing@gmail.com', 'testtest')
+    assert response.url.endswith('/dashboard')
+    stop(process)
+    assert process.returncode == 0
+
+
+# ---------- Nothing queued is lost on SIGTERM ---------- #
+def test_queued_feedback_is_written_on_shutdown(server):
+    url, process, database = server
+    opener = browser()
+    login(opener, url, 'testing@gmail.com', 'testtest')
+    token = CSRF_FIELD.search(opener.open(url + '/dashboard').read().decode()).group(1)
+    response = opener.open(url + '/dashboard', urllib.parse.urlencode(dict(feedback='Written on shutdown', submit='Submit', csrf_token=token)).encode())
+    assert 'Thank you for your kind feedback!' in response.read().decode()
+    with sqlite3.connect(database) as conn:
+        assert conn.execute("SELECT count(*) FROM feedback WHERE feedback = 'Written on shutdown'").fetchone() == (0,)
+
+    stop(process)
+    assert process.returncode == 0
+    with sqlite3.connect(database) as conn:
+        assert conn.execute("SELECT count(*) FROM feedback WHERE feedback = 'Written on shutdown'").fetchone() == (1,)
+
+
+def test_queued_chat_messages_are_written_on_shutdown(app):
+    from app import shutdown
+    from models import ChatMessage
+    from views.chat import chat_hub
+    app.config['CHAT_FLUSH_SECONDS'] = 600
+    with app.app_context():
+        chat_hub.post('general', dict(room='general', user_name='testing', message='Written on shutdown', sent_at=time.time()))
+        assert ChatMessage.query.filter_by(message='Written on shutdown').count() == 0
+
+    shutdown()
+    with app.app_context():
+        assert ChatMessage.query.filter_by(message='Written on shutdown').count() == 1
@@ -0,0 +1,38 @@
+from models import CourseSlot
+from timetable import Timetable
+from carts import cart_store
+
+
+# ---------- Interval index ---------- #
+def test_clash_finds_overlaps_only():
+    # Monday 9:00-11:00 and Wednesday 14:00-16:00
+    timetable = Timetable([
+        (CourseSlot(weekday=0, start_minute=540, end_minute=660), 'Batik'),
+        (CourseSlot(weekday=2, start_minute=840, end_minute=960), 'Wau Bulan'),
+    ])
+    assert timetable.clash(CourseSlot(weekday=0, start_minute=600, end_minute=720)) == 'Batik'
+    assert timetable.clash(CourseSlot(weekday=2, start_minute=780, end_minute=900)) == 'Wau Bulan'
+    # Back to back isn't a clash
+    assert timetable.clash(CourseSlot(weekday=0, start_minute=660, end_minute=780)) is None
+    assert timetable.clash(CourseSlot(weekday=1, start_minute=540, end_minute=660)) is None
+
+    # Sunday 23:00 to Monday 1:00 wraps round the week
+    timetable.add(CourseSlot(weekday=6, start_minute=1380, end_minute=60), 'Night Kite')
+    assert timetable.clash(CourseSlot(weekday=0, start_minute=0, end_minute=30)) == 'Night Kite'
+
+
+# ---------- Adding a clashing class to the cart ---------- #
+def test_cart_rejects_clashing_slot(app, client):
+    client.get('/course')
+    # testing@gmail.com is registered for Anek Milo Beng, Monday 11:00-13:00
+    response = client.post('/course', data=dict(add_cart='Batik', day='Monday', time='11:00-13:00'), follow_redirects=True)
+    assert 'Batik on Monday 11:00-13:00 clashes with Anek Milo Beng' in response.get_data(as_text=True)
+
+    # And with what is already in the cart
+    client.post('/course', data=dict(add_cart='Kuih Muih', day='Tuesday', time='9:00-12:00'))
+    response = client.post('/course', data=dict(add_cart='Milo Panas', day='Tuesday', time='11:00-13:00'), follow_redirects=True)
+    assert 'Milo Panas on Tuesday 11:00-13:00 clashes with Kuih Muih' in response.get_data(as_text=True)
+
+    with app.app_context():
+        assert cart_store.has(2, 3)
+        assert not cart_store.has(2, 1) and not cart_store.has(2, 6)
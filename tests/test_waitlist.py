@@ -0,0 +1,42 @@
+import threading
+
+from extensions import db
+from models import Course, Waitlist
+from reservations import join_waitlist
+from conftest import add_users, first_slot
+
+
+# ---------- Joining a waitlist twice at once ---------- #
+def test_concurrent_joins_keep_one_entry(app):
+    racers = 8
+    with app.app_context():
+        user_id, other_id = add_users(2)
+        course = db.session.get(Course, 1)
+        slot = first_slot(course.course_id)
+        assert join_waitlist(other_id, course, slot) == 1
+
+    start = threading.Barrier(racers)
+    positions, errors = [], []
+
+    def join():
+        with app.app_context():
+            course = db.session.get(Course, 1)
+            slot = first_slot(course.course_id)
+            start.wait()
+            try:
+                positions.append(join_waitlist(user_id, course, slot))
+            except Exception as error:
+                errors.append(error)
+            finally:
+                db.session.remove()
+
+    threads = [threading.Thread(target=join) for _ in range(racers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert positions == [2] * racers
+    with app.app_context():
+        assert Waitlist.query.filter_by(user_id=user_id, course_id=1).count() == 1
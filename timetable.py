@@ -0,0 +1,134 @@
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from extensions import db
+from models import Course, CourseSlot
+from transfer import batched
+from collections import namedtuple
+import bisect
+import re
+
+
+WEEKDAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+SLOT_TIME = re.compile(r'(\d{1,2}):(\d{2})\s*-\s*(\d{1,2}):(\d{2})')
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+# What Timetable needs of a slot; CourseSlot rows fit it too
+SlotTimes = namedtuple('SlotTimes', 'weekday start_minute end_minute')
+
+
+# ---------- Parsing the schedule columns ---------- #
+def parse_weekday(value):
+    """0 for 'Monday' (or 'mon'), ... ; None when it isn't a day of the week."""
+    value = (value or '').strip().lower()
+    for weekday, name in enumerate(WEEKDAYS):
+        if len(value) >= 3 and name.startswith(value):
+            return weekday
+    return None
+
+
+def parse_time_range(value):
+    """(start, end) minutes after midnight of '9:00-12:00'; None when it doesn't parse."""
+    times = SLOT_TIME.fullmatch((value or '').strip())
+    if times is None:
+        return None
+    start_hour, start_minute, end_hour, end_minute = (int(part) for part in times.groups())
+    if start_hour > 23 or start_minute > 59 or end_minute > 59 or end_hour * 60 + end_minute > MINUTES_PER_DAY:
+        return None
+    start, end = start_hour * 60 + start_minute, end_hour * 60 + end_minute
+    return (start, end % MINUTES_PER_DAY) if start != end % MINUTES_PER_DAY else None
+
+
+def parse_slot(day, time):
+    weekday, minutes = parse_weekday(day), parse_time_range(time)
+    return None if weekday is None or minutes is None else SlotTimes(weekday, *minutes)
+
+
+def sync_course_slots(course_ids, batch_size=500):
+    """Bring the CourseSlot rows of `course_ids` in line with their schedule columns.
+
+    Rows are updated in place, so the slot ids carts and orders point at stay
+    valid; a slot whose columns no longer parse is deleted. Runs in the
+    caller's transaction. Returns the names of courses with such a slot.
+    """
+    broken = []
+    statement = sqlite_insert(CourseSlot.__table__)
+    statement = statement.on_conflict_do_update(
+        index_elements=['course_id', 'position'],
+        set_={name: statement.excluded[name] for name in ('weekday', 'start_minute', 'end_minute')},
+    )
+    for batch in batched(course_ids, batch_size):
+        courses = db.session.execute(db.select(
+            Course.course_id, Course.course_name, Course.course_slot_1_day, Course.course_slot_1_time,
+            Course.course_slot_2_day, Course.course_slot_2_time,
+        ).where(Course.course_id.in_(batch))).all()
+        slots, unparsed = [], []
+        for course in courses:
+            for position, day, time in ((1, course.course_slot_1_day, course.course_slot_1_time), (2, course.course_slot_2_day, course.course_slot_2_time)):
+                parsed = parse_slot(day, time)
+                if parsed is None:
+                    unparsed.append((course.course_id, position))
+                    broken.append(course.course_name)
+                else:
+                    weekday, start, end = parsed
+                    slots.append(dict(course_id=course.course_id, position=position, weekday=weekday, start_minute=start, end_minute=end))
+        if slots:
+            db.session.execute(statement, slots)
+        for course_id, position in unparsed:
+            db.session.execute(db.delete(CourseSlot).where(CourseSlot.course_id == course_id, CourseSlot.position == position))
+    return sorted(set(broken))
+
+
+def find_slot(course_id, day, time):
+    """The slot of a course matching a posted day & time, or None."""
+    parsed = parse_slot(day, time)
+    if parsed is None:
+        return None
+    weekday, start, end = parsed
+    return CourseSlot.query.filter_by(course_id=course_id, weekday=weekday, start_minute=start, end_minute=end).first()
+
+
+# ---------- Clash detection ---------- #
+class Timetable:
+    """One user's weekly classes as sorted, non-overlapping minute-of-week intervals.
+
+    clash() binary searches for the last interval starting before the new
+    one ends, so it is O(log n) in the user's classes. Overlapping classes
+    (only possible in data from before clashes were checked) are merged as
+    they are added, which keeps that search exact.
+    """
+
+    def __init__(self, entries=()):
+        self.starts = []
+        self.ends = []
+        self.names = []
+        for slot, name in entries:
+            if slot is not None:
+                self.add(slot, name)
+
+    @staticmethod
+    def _intervals(slot):
+        start = slot.weekday * MINUTES_PER_DAY + slot.start_minute
+        end = start + (slot.end_minute - slot.start_minute) % MINUTES_PER_DAY
+        # A Sunday class running past midnight wraps round to Monday
+        if end > MINUTES_PER_WEEK:
+            return ((start, MINUTES_PER_WEEK), (0, end - MINUTES_PER_WEEK))
+        return ((start, end),)
+
+    def clash(self, slot):
+        """Name of a class overlapping `slot`, or None."""
+        for start, end in self._intervals(slot):
+            index = bisect.bisect_left(self.starts, end) - 1
+            if index >= 0 and self.ends[index] > start:
+                return self.names[index]
+        return None
+
+    def add(self, slot, name):
+        for start, end in self._intervals(slot):
+            first = bisect.bisect_right(self.ends, start)
+            last = bisect.bisect_left(self.starts, end)
+            merged = name
+            if first < last:
+                start, end, merged = min(start, self.starts[first]), max(end, self.ends[last - 1]), self.names[first]
+            self.starts[first:last] = [start]
+            self.ends[first:last] = [end]
+            self.names[first:last] = [merged]
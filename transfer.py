@@ -0,0 +1,88 @@
+from werkzeug.datastructures import MultiDict
+from sqlalchemy import select
+import itertools
+import json
+import csv
+import io
+
+
+FORMATS = ('csv', 'jsonl')
+
+
+# ---------- Streaming readers ---------- #
+def read_records(stream, fmt):
+    """Yield (line, record, error) from a binary CSV or JSONL stream, one record at a time."""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        for record in reader:
+            yield reader.line_num, record, None
+        return
+
+    for line, raw in enumerate(text, 1):
+        if not raw.strip():
+            continue
+        try:
+            record = json.loads(raw)
+        except ValueError as error:
+            yield line, None, f'Invalid JSON: {error}'
+            continue
+        if not isinstance(record, dict):
+            yield line, None, 'Expected a JSON object'
+            continue
+        yield line, record, None
+
+
+def validate_records(records, form):
+    """Check each record against a wtforms form; yield (line, data, errors).
+
+    The same form instance is re-processed for every record, so validation
+    follows the form's own rules without building a form per row. data only
+    holds the form's fields and is None when the record is invalid.
+    """
+    for line, record, error in records:
+        if error:
+            yield line, None, [error]
+            continue
+        form.process(MultiDict({name: '' if value is None else str(value) for name, value in record.items()}))
+        if form.validate():
+            yield line, {name: field.data for name, field in form._fields.items() if name not in ('submit', 'csrf_token')}, None
+        else:
+            yield line, None, [f'{name}: {message}' for name, messages in form.errors.items() for message in messages]
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+# ---------- Streaming export ---------- #
+def _json_default(value):
+    return value.isoformat()
+
+
+def export_table(engine, table, fmt, batch_size=1000):
+    """Yield a whole table as CSV or JSONL text, batch_size rows per chunk.
+
+    Rows are streamed off one read connection, so memory stays flat however
+    large the table is and the export is a single consistent snapshot.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if fmt == 'csv':
+        writer.writerow(column.name for column in table.columns)
+
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True).execute(select(table).order_by(*table.primary_key))
+        for rows in result.partitions(batch_size):
+            for row in rows:
+                if fmt == 'csv':
+                    writer.writerow(row)
+                else:
+                    buffer.write(json.dumps(dict(row._mapping), default=_json_default) + '\n')
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
@@ -0,0 +1,196 @@
+from flask import Blueprint, render_template, redirect, url_for, flash, request, abort, current_app, jsonify, send_from_directory
+from flask_login import login_required, current_user
+from extensions import db
+from models import Course, CourseSlot, Order, Waitlist, Feedback, CourseStats, DailyStats
+from forms import CourseForm, SearchForm, BackupForm, DeleteCourseForm, ImportForm
+from catalog import catalog, course_search
+from services import import_courses
+from analytics import enrollment_summary
+from carts import cart_store
+from backup import backups
+from timetable import sync_course_slots
+from database import read_engine
+from transfer import FORMATS, read_records, export_table
+
+
+bp = Blueprint('admin', __name__)
+
+
+# =========================================== #
+# ADMIN DASHBOARD, EDIT COURSE, DELETE COURSE #
+# =========================================== #
+
+
+# ---------- Redirect admindashboard ---------- #
+@bp.route('/admin/admindashboard')
+@login_required
+def admindashboard():
+    if current_user.type != 'Admin':
+        abort(403)
+    summary = enrollment_summary(current_app.config['ANALYTICS_TOP_COURSES'], current_app.config['ANALYTICS_DAYS'])
+    return render_template('/admin/admindashboard.html', summary=summary, backup_form=BackupForm(), backups=backups.list())
+
+
+# ---------- Database backups ---------- #
+@bp.route('/admin/backup', methods=['POST'])
+@login_required
+def backup():
+    if current_user.type != 'Admin':
+        abort(403)
+    if not BackupForm().validate_on_submit():
+        abort(400)
+    if backups.start():
+        flash('Backup started, it will be listed here once written')
+    else:
+        flash('A backup is already running')
+    return redirect(url_for('.admindashboard'))
+
+
+@bp.route('/admin/backups/<name>')
+@login_required
+def download_backup(name):
+    if current_user.type != 'Admin':
+        abort(403)
+    if name not in {backup['name'] for backup in backups.list()}:
+        abort(404)
+    return send_from_directory(current_app.config['BACKUP_DIR'], name, as_attachment=True)
+
+
+# ---------- Enrollment analytics (JSON) ---------- #
+@bp.route('/admin/analytics')
+@login_required
+def analytics():
+    if current_user.type != 'Admin':
+        abort(403)
+    top = min(request.args.get('top', current_app.config['ANALYTICS_TOP_COURSES'], type=int), 1000)
+    days = min(request.args.get('days', current_app.config['ANALYTICS_DAYS'], type=int), 366)
+    return jsonify(enrollment_summary(max(top, 1), max(days, 1)))
+
+
+# ---------- Redirect editcourse ---------- #
+def render_editcourse(form, courses, **context):
+    # Every course row posts its own delete form, which carries the CSRF token; seat counts aren't in the catalog rows
+    return render_template(
+        '/admin/editcourse.html', form=form, courses=courses, seats=catalog.seats(),
+        delete_form=DeleteCourseForm(), import_form=ImportForm(formdata=None), **context
+    )
+
+
+@bp.route('/admin/editcourse', methods=['GET', 'POST'])
+@login_required
+def editcourse():
+    if current_user.type != 'Admin':
+        abort(403)
+    form = CourseForm()
+    courses = catalog.courses()
+    search_form = SearchForm()
+
+
+    #---------- Search Bar ----------#
+    if request.method == 'POST' and 'search' in request.form:
+        searched = search_form.search.data
+        if search_form.search.data == '':
+            flash('Enter something to search')
+            return redirect(url_for('.editcourse'))
+
+        else:
+            courses = course_search.search(searched)
+            
+            flash(f'You searched {searched}')
+            return render_editcourse(form, courses)
+
+
+    # Create course form
+    if form.validate_on_submit():
+        course_name = catalog.get(form.course_name.data)
+
+        if course_name == None:
+            new_course = Course(
+                course_name=form.course_name.data,
+                course_duration=form.course_duration.data,
+                course_price=form.course_price.data,
+                course_slot=form.course_slot.data,
+                course_trainer=form.course_trainer.data,
+                course_info=form.course_info.data,
+                course_slot_1_day=form.course_slot_1_day.data,
+                course_slot_1_time=form.course_slot_1_time.data,
+                course_slot_2_day=form.course_slot_2_day.data,
+                course_slot_2_time=form.course_slot_2_time.data
+                )
+            db.session.add(new_course)
+            db.session.flush()
+            sync_course_slots([new_course.course_id])
+            db.session.commit()
+            catalog.invalidate()
+            flash('New course has been created!')
+
+            courses = catalog.courses()
+            return render_editcourse(form, courses)
+        else:
+            flash('This course already exist')
+            return render_editcourse(form, courses)
+
+    else:
+        return render_editcourse(form, courses)
+
+
+# ---------- Bulk course import ---------- #
+@bp.route('/admin/import', methods=['POST'])
+@login_required
+def import_course_file():
+    if current_user.type != 'Admin':
+        abort(403)
+    import_form = ImportForm()
+    if not import_form.validate_on_submit():
+        for messages in import_form.errors.values():
+            flash('; '.join(messages))
+        return redirect(url_for('.editcourse'))
+
+    upload = import_form.file.data
+    report = import_courses(read_records(upload.stream, upload.filename.rsplit('.', 1)[-1].lower()))
+    flash(f"Imported {report['inserted']} new and {report['updated']} updated courses, {report['error_count']} rows rejected")
+    return render_editcourse(CourseForm(), catalog.courses(), import_report=report)
+
+
+# ---------- Streaming table export ---------- #
+EXPORT_TABLES = {'course': Course, 'order': Order, 'feedback': Feedback}
+EXPORT_MIMETYPES = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+
+
+@bp.route('/admin/export/<table>.<fmt>')
+@login_required
+def export(table, fmt):
+    if current_user.type != 'Admin':
+        abort(403)
+    if table not in EXPORT_TABLES or fmt not in FORMATS:
+        abort(404)
+    return current_app.response_class(
+        export_table(read_engine(), EXPORT_TABLES[table].__table__, fmt, current_app.config['EXPORT_BATCH_SIZE']),
+        mimetype=EXPORT_MIMETYPES[fmt],
+        headers={'Content-Disposition': f'attachment; filename={table}.{fmt}'},
+    )
+
+
+# ---------- Delete Course ---------- #
+@bp.route('/delete/<int:course_id>', methods=['POST'])
+@login_required
+def delete(course_id):
+    if current_user.type != 'Admin':
+        abort(403)
+    if not DeleteCourseForm().validate_on_submit():
+        abort(400)
+    entry = Course.query.get(course_id)
+    if entry != None:
+        # Carts, orders, waitlists & enrollment aggregates reference the course by id, drop them along with it
+        db.session.execute(db.delete(Waitlist).where(Waitlist.course_id == course_id).execution_options(synchronize_session=False))
+        cart_store.remove_course(course_id)
+        db.session.execute(db.delete(Order).where(Order.course_id == course_id).execution_options(synchronize_session=False))
+        db.session.execute(db.delete(CourseStats).where(CourseStats.course_id == course_id).execution_options(synchronize_session=False))
+        db.session.execute(db.delete(DailyStats).where(DailyStats.course_id == course_id).execution_options(synchronize_session=False))
+        db.session.execute(db.delete(CourseSlot).where(CourseSlot.course_id == course_id).execution_options(synchronize_session=False))
+        db.session.delete(entry)
+        db.session.commit()
+        catalog.invalidate()
+        flash(f'{entry.course_name} has been deleted')
+
+    return redirect(url_for('.editcourse'))
@@ -0,0 +1,65 @@
+from flask import Blueprint, request, jsonify, current_app
+from flask_login import login_required
+from catalog import catalog, seat_feed
+from services import user_context, feedback_page, encode_cursor, decode_cursor, parse_event_time, calendar_feed
+from datetime import timedelta
+
+
+bp = Blueprint('api', __name__)
+
+
+# ================================= #
+# JSON API (INFINITE SCROLL PAGING) #
+# ================================= #
+
+
+# ---------- Course page ---------- #
+@bp.route('/api/courses')
+@login_required
+def courses():
+    select = request.args.get('list')
+    courses, next_cursor = catalog.page(
+        select if select in catalog.sort_columns else 'id',
+        decode_cursor(request.args.get('after')),
+        current_app.config['COURSES_PER_PAGE'],
+    )
+    seats = catalog.seats()
+    return jsonify(
+        # Registered plus held seats, what the course page shows
+        courses=[dict(course._mapping, seats_taken=seats.get(course.course_id, (0,))[0]) for course in courses],
+        next=encode_cursor(next_cursor),
+    )
+
+
+# ---------- Feedback page ---------- #
+@bp.route('/api/feedbacks')
+@login_required
+def feedbacks():
+    feedbacks, next_feedback = feedback_page(request.args.get('before', type=int), current_app.config['FEEDBACKS_PER_PAGE'])
+    return jsonify(
+        feedbacks=[dict(feedback_id=feedback.feedback_id, user_name=feedback.user_name, feedback=feedback.feedback) for feedback in feedbacks],
+        next=next_feedback,
+    )
+
+
+# ---------- Seat count stream ---------- #
+@bp.route('/course/seats')
+@login_required
+def seats():
+    return current_app.response_class(
+        seat_feed.stream(request.headers.get('Last-Event-ID')),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+
+# ---------- Calendar events in a date range ---------- #
+@bp.route('/api/events')
+@login_required
+def events():
+    ctx = user_context()
+    window_start = parse_event_time(request.args.get('start', ''))
+    window_end = parse_event_time(request.args.get('end', ''))
+    if window_start is None or window_end is None or not window_start < window_end <= window_start + timedelta(days=current_app.config['CALENDAR_MAX_RANGE_DAYS']):
+        return jsonify(error='start and end must be ISO dates less than a year apart'), 400
+    return jsonify(calendar_feed(ctx.user_id, ctx.orders, window_start, window_end))
@@ -0,0 +1,106 @@
+from flask import Blueprint, render_template, redirect, url_for, flash
+from flask_login import login_user, logout_user, login_required
+from extensions import db, login_manager, credentials, page_cache, limiter
+from models import User
+from forms import LoginForm, RegisterForm
+from passwords import CredentialServiceBusy
+from services import check_password
+from carts import cart_store
+from ratelimit import form_field
+
+
+bp = Blueprint('auth', __name__)
+
+
+# ======================================= #
+# INDEX, LOG IN, SIGN UP (AUTHENTICATION) #
+# ======================================= #
+
+
+# ---------- Load user ---------- #
+@login_manager.user_loader
+def load_user(user_id):
+    # Waitlist entries (rare) and the cart when it lives in SQLite joined in, orders in one more SELECT: all user_context() needs
+    return User.query.options(
+        db.selectinload(User.orders), db.joinedload(User.waitlist), *cart_store.loader_options()
+    ).get(int(user_id))
+
+
+# ---------- Redirect index ---------- #
+@bp.route('/')
+@page_cache.public
+def index():
+    return render_template('index.html')
+
+
+# ---------- Redirect login ---------- #
+@bp.route('/login', methods=['GET', 'POST'])
+@limiter.limit('RATELIMIT_LOGIN_PER_IP', methods=('POST',))
+@limiter.limit('RATELIMIT_LOGIN_PER_EMAIL', key=form_field('email'), methods=('POST',))
+def login():
+    form = LoginForm()
+
+    # if form is submitted
+    if form.validate_on_submit():
+        # finds the first email that matches the input in login form
+        user = User.query.filter_by(email=form.email.data).first()
+        if user == None:
+            flash('This user does not exist')
+            return redirect(url_for('.login'))
+
+        try:
+            valid = check_password(user, form.password.data)
+        except CredentialServiceBusy:
+            flash('Too many people are logging in right now, please try again')
+            return render_template('login.html', form=form)
+
+        if user.type == 'Admin':
+            if valid:
+                login_user(user, remember=form.remember.data)
+                flash(f'Logged in successfully')
+                return redirect(url_for('admin.editcourse'))
+            flash('Invalid username or password')
+
+        elif user:
+            if valid:
+                login_user(user, remember=form.remember.data)
+                flash(f'Logged in successfully')
+                return redirect(url_for('main.dashboard'))
+            flash('Invalid username or password')
+
+    return render_template('login.html', form=form)
+
+
+# ---------- Redirect signup ---------- #
+@bp.route('/signup', methods=['GET', 'POST'])
+@limiter.limit('RATELIMIT_SIGNUP_PER_IP', methods=('POST',))
+def signup():
+    form = RegisterForm()
+    
+    # if form is submitted
+    if form.validate_on_submit():
+        try:
+            password = credentials.hash(form.password.data)
+        except CredentialServiceBusy:
+            flash('Too many people are signing up right now, please try again')
+            return render_template('signup.html', form=form)
+
+        new_user = User(username=form.username.data, email=form.email.data, password=password)
+        db.session.add(new_user)
+        db.session.commit()
+        flash('New user has been created')
+
+    return render_template('signup.html', form=form)
+
+
+# =============== #
+# LOGOUT FUNCTION #
+# =============== #
+
+# ---------- Redirect index (logout) ---------- #
+@bp.route('/logout')
+@login_required
+def logout():
+    logout_user()
+    flash(f"Logged out successfully")
+    return redirect(url_for('.index'))
@@ -0,0 +1,88 @@
+from flask import Blueprint, render_template, request, session
+from flask_login import login_required, current_user
+from flask_socketio import join_room, leave_room, rooms, emit
+from extensions import db, socketio
+from models import ChatMessage
+from database import read_engine
+from chat import ChatHub
+from datetime import datetime, timezone
+import time
+import re
+
+
+bp = Blueprint('chat', __name__)
+
+
+# ========== #
+# CHAT ROOMS #
+# ========== #
+
+def load_chat_history(room, limit):
+    with read_engine().connect() as conn:
+        rows = conn.execute(
+            db.select(ChatMessage.__table__).where(ChatMessage.room == room).order_by(ChatMessage.message_id.desc()).limit(limit)
+        ).all()
+    return [
+        dict(room=row.room, user_name=row.user_name, message=row.message, sent_at=row.created.replace(tzinfo=timezone.utc).timestamp())
+        for row in reversed(rows)
+    ]
+
+
+def save_chat_messages(messages):
+    db.session.execute(db.insert(ChatMessage), [
+        dict(room=message['room'], user_name=message['user_name'], message=message['message'], created=datetime.utcfromtimestamp(message['sent_at']))
+        for message in messages
+    ])
+    db.session.commit()
+
+
+# Bound in create_app()
+chat_hub = ChatHub()
+CHAT_ROOM = re.compile(r'[\w-]{1,50}')
+
+
+def chat_room_allowed(room):
+    # Everyone shares 'general'; support-<user id> is private to that user and the admins
+    user_id, user_name, user_type = session['chat_user']
+    return room == 'general' or room == f'support-{user_id}' or user_type == 'Admin'
+
+
+# ---------- Redirect chatapp ---------- #
+@bp.route('/chatapp')
+@login_required
+def chatapp():
+    return render_template('chatapp.html', room=request.args.get('room', 'general'), name=current_user.username)
+
+
+# ---------- Socket.IO events (namespace /chat) ---------- #
+@socketio.on('connect', namespace='/chat')
+def chat_connect(auth=None):
+    if not current_user.is_authenticated:
+        return False
+    # Kept in the connection's session so later events don't reload the user
+    session['chat_user'] = (current_user.id, current_user.username, current_user.type)
+
+
+@socketio.on('join', namespace='/chat')
+def chat_join(data):
+    room = data.get('room') if isinstance(data, dict) else None
+    if not isinstance(room, str) or not CHAT_ROOM.fullmatch(room) or not chat_room_allowed(room):
+        emit('chat_error', {'error': 'You cannot join this room'})
+        return
+    # One room per connection
+    for joined in rooms():
+        if joined != request.sid:
+            leave_room(joined)
+    join_room(room)
+    emit('history', {'room': room, 'messages': chat_hub.history(room)})
+
+
+@socketio.on('send_message', namespace='/chat')
+def chat_send(data):
+    room = data.get('room') if isinstance(data, dict) else None
+    text = str(data.get('message', '')).strip()[:500] if room else ''
+    if not text or room == request.sid or room not in rooms():
+        return
+    message = dict(room=room, user_name=session['chat_user'][1], message=text, sent_at=time.time())
+    chat_hub.post(room, message)
+    emit('new_message', message, to=room)
@@ -0,0 +1,345 @@
+from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app
+from flask_login import login_required, current_user
+from extensions import db, page_cache
+from models import Course, CalendarEvent
+from forms import SearchForm, PurchaseCourseForm, FeedbackForm
+from catalog import catalog, course_search, seat_feed, render_course_rows
+from reservations import add_to_cart, remove_from_cart, join_waitlist, leave_waitlist, promote_waitlist
+from analytics import record_enrollments
+from timetable import find_slot
+from services import user_context, feedback_page, feedback_version, feedback_queue, encode_cursor, decode_cursor, parse_event_time, checkout_cart
+from datetime import timedelta
+
+
+bp = Blueprint('main', __name__)
+
+
+# ========================================================= #
+# USER DASHBOARD, MYPLAN, COURSE, MYCART, ABOUT, SEARCH BAR #
+# ========================================================= #
+
+
+# ---------- Pass stuff to navbar ---------- #
+@bp.app_context_processor
+def base():
+    form=SearchForm()
+    if current_user.is_authenticated:
+        ctx = user_context()
+        return dict(form=form, user_cart=ctx.cart, cart_total=ctx.cart_total, user_ordered=ctx.orders)
+    return dict(form=form)
+
+
+# ---------- Checkout (from the cart on any page) ---------- #
+def checkout(ctx, endpoint):
+    """Register the user's cart, flash what stayed in it and go back to `endpoint`."""
+    full, clashes, unscheduled = checkout_cart(ctx.user_id, ctx.cart, ctx.orders)
+    for course_name in full:
+        flash(f'{course_name} is already full, it has been kept in your cart')
+    for course_name, clash in clashes:
+        flash(f'{course_name} clashes with {clash}, it has been kept in your cart')
+    for course_name in unscheduled:
+        flash(f'{course_name} has no day and time picked, remove it from your cart and add it again')
+    if len(full) + len(clashes) + len(unscheduled) < len(ctx.cart):
+        flash('Courses successfully registered')
+    return redirect(url_for(endpoint))
+
+
+# ---------- Redirect dashboard ---------- #
+@bp.route('/dashboard', methods=['GET', 'POST'])
+@page_cache.private(catalog.stamp, feedback_version.get)
+@login_required
+def dashboard():
+    # Cart & Checkout
+    ctx = user_context()                                        # (User, cart & orders of this request)
+    user_id = ctx.user_id                                       # (Get current user id)
+    user_cart = ctx.cart                                        # (Get course from user's cart)
+    # Feedbacks
+    form = FeedbackForm()
+    user = ctx.user
+    before = request.args.get('before', type=int)
+    feedbacks, next_feedback = feedback_page(before, current_app.config['FEEDBACKS_PER_PAGE'])
+    if before is None:
+        # The user's own feedback shows at once, before its batch is written
+        feedbacks = feedback_queue.pending(user_id) + list(feedbacks)
+
+
+    #---------- Remove From Cart ----------#
+    if request.method == 'POST' and 'remove' in request.form:
+        course_name = request.form.get('remove')
+        for course in user_cart:
+            if course.course_name == course_name:
+                remove_from_cart(course)
+                page_cache.touch_user(user_id)
+                flash(f'{course_name} has been removed from cart')
+                return redirect(url_for('.dashboard'))
+
+
+    #---------- Checkout ----------#
+    if request.method == 'POST' and 'checkout' in request.form:
+        return checkout(ctx, '.dashboard')
+
+    
+    #---------- Feedback ----------#
+    if form.validate_on_submit():
+        feedback = form.feedback.data
+        flash(feedback)
+
+        # Queued and written in batches; the flush bumps feedback_version
+        feedback_queue.submit(user_id, user.username, feedback)
+        page_cache.touch_user(user_id)
+        flash('Thank you for your kind feedback!')
+        return redirect(url_for('.dashboard'))
+
+    return render_template('dashboard.html', name=current_user.username, user_cart=user_cart, form=form, feedbacks=feedbacks, next_feedback=next_feedback)
+
+
+# ---------- Redirect myplan ---------- #
+@bp.route('/myplan', methods=['GET', "POST"])
+@login_required
+def myplan():
+    # Cart & Checkout
+    ctx = user_context()                                        # (User, cart & orders of this request)
+    user_id = ctx.user_id                                       # (Get current user id)
+    user_cart = ctx.cart                                        # (Get course from user's cart)
+    user_ordered = ctx.orders                                   # (Get registered course from database)
+
+
+    #---------- Remove From Cart ----------#
+    if request.method == 'POST' and 'remove' in request.form:
+        course_name = request.form.get('remove')
+        for course in user_cart:
+            if course.course_name == course_name:
+                remove_from_cart(course)
+                page_cache.touch_user(user_id)
+                flash(f'{course_name} has been removed from cart')
+                return redirect(url_for('.myplan'))
+
+
+    #---------- Checkout ----------#
+    if request.method == 'POST' and 'checkout' in request.form:
+        return checkout(ctx, '.myplan')
+
+
+    #---------- Add Event ----------#
+    if request.method == "POST":
+        title = request.form.get('title', '').strip()
+        start = parse_event_time(request.form.get('start', ''))
+        end = parse_event_time(request.form.get('end', '')) if request.form.get('end') else None
+        max_length = timedelta(days=current_app.config['CALENDAR_MAX_EVENT_DAYS'])
+        if not title or start is None:
+            flash('Please enter an event title and a start date')
+        elif end is not None and not start <= end <= start + max_length:
+            flash(f"The end date must be within {current_app.config['CALENDAR_MAX_EVENT_DAYS']} days after the start date")
+        else:
+            db.session.add(CalendarEvent(
+                user_id=user_id,
+                title=title[:100],
+                start=start,
+                end=end,
+                all_day='T' not in request.form['start'],
+                url=request.form.get('url', '')[:300] or None,
+            ))
+            db.session.commit()
+            flash(f'{title} has been added to your calendar')
+        return redirect(url_for('.myplan'))
+
+    # Events themselves come from /api/events for the range the calendar shows
+    return render_template("myplan.html", user_cart=user_cart, user_ordered=user_ordered)
+
+
+# ---------- Redirect course ---------- #
+@bp.route('/course', methods=['GET', 'POST'])
+@page_cache.private(catalog.stamp, catalog.seat_stamp)
+@login_required
+def course():
+    # Top Nav (register submit button)
+    purchase_form = PurchaseCourseForm() # Currently not used in code
+    # Filter By
+    select = request.values.get('list')
+    view = select if select in catalog.sort_columns else 'id'
+    # Course (one keyset page of the selected ordering)
+    after = decode_cursor(request.args.get('after'))
+    courses, next_cursor = catalog.page(view, after, current_app.config['COURSES_PER_PAGE'])
+    # Search Bar
+    form = SearchForm()
+    # Cart & Checkout
+    ctx = user_context()                                        # (User, cart & orders of this request)
+    user_id = ctx.user_id                                       # (Get current user id)
+    user_cart = ctx.cart                                        # (Get course from user's cart)
+    user_ordered = ctx.orders                                   # (Get registered course from database)
+    user_waitlist = ctx.waitlist                                # (Get the waitlists the user is on)
+    # Display all student
+    user_list = []
+
+    # Total $ in cart
+    cart_total = ctx.cart_total
+
+
+    # #---------- Display all student ----------#
+    # if request.method == 'POST' and 'course_name' in request.form:
+    #     course_name = request.form.get('course_name')
+
+    #     display_courses = Order.query.filter_by(course_name=course_name).all()
+    #     for course in display_courses:
+    #         # users = User.query.filter_by(id=course.user_id).all()
+    #         # for user in users:
+    #         user = course.user_id
+    #         user_list.append(user)
+
+    #     return redirect(url_for('.course'))
+    #     return render_template('course.html', courses=courses, user_list=user_list, select=select, purchase_form=purchase_form, user_cart=user_cart, cart_total=cart_total)
+
+    #---------- Search Bar ----------#
+    if form.validate_on_submit():
+        searched = form.search.data
+        if form.search.data == '':
+            flash('Enter something to search')
+            return redirect(url_for('.course'))
+
+        else:
+            courses = course_search.search(searched)
+            
+            flash(f'You searched {searched}')
+            return render_template('course.html', courses=courses, course_rows=render_course_rows(courses), user_list=user_list, select=select, purchase_form=purchase_form, user_cart=user_cart, cart_total=cart_total)
+
+
+    #---------- Filter By ----------#
+    if request.method == 'POST' and select == 'id':
+        flash('Filtered by course id')
+    elif request.method == 'POST' and select == 'price':
+        flash('Filtered by course price')
+    elif request.method == 'POST' and select == 'slot':
+        flash('Filtered by course slot')
+
+
+    #---------- Add To Cart ----------#
+    if request.method == 'POST' and 'add_cart' in request.form:
+        course_name = request.form.get('add_cart')
+        slot_day = request.form.get('day')
+        slot_time = request.form.get('time')
+
+        course = catalog.get(course_name) # (Getting course object)
+
+        # Avoid registering same course
+        for order in user_ordered:
+            if order.course_name == course_name:
+                flash('This course is already registered')
+                return redirect(url_for('.course'))
+
+        # Avoid adding same course into cart
+        for course_in_cart in user_cart:
+            if course_in_cart.course_name == course_name:
+                flash('This course is already in cart')
+                return redirect(url_for('.course'))
+
+        if slot_day and slot_time != None:
+
+            # The posted day & time must be one the course runs on
+            slot = find_slot(course.course_id, slot_day, slot_time) if course else None
+            if slot is None:
+                flash('Please select a day and time this course runs on')
+                return redirect(url_for('.course'))
+
+            # Avoid timetable clashes with registered courses and the cart
+            clash = ctx.timetable.clash(slot)
+            if clash:
+                flash(f'{course_name} on {slot.day} {slot.time} clashes with {clash}')
+                return redirect(url_for('.course'))
+
+            # Add to cart, holding a seat for SEAT_HOLD_SECONDS
+            if add_to_cart(user_id, course, slot):
+                flash(f"{course_name} added to cart, your seat is held for {current_app.config['SEAT_HOLD_SECONDS'] // 60} minutes")
+
+            # Course capacity checking (every seat is registered or held in a cart)
+            else:
+                position = join_waitlist(user_id, course, slot)
+                flash(f'This course is already full, you are number {position} on its waitlist. A seat will be held in your cart once one frees up')
+            page_cache.touch_user(user_id)
+            return redirect(url_for('.course'))
+            
+        else:
+            flash('Please select day and time before adding to cart')
+
+
+    #---------- Remove From Cart ----------#
+    if request.method == 'POST' and 'remove' in request.form:
+        course_name = request.form.get('remove')
+        for course in user_cart:
+            if course.course_name == course_name:
+                remove_from_cart(course)
+                page_cache.touch_user(user_id)
+                flash(f'{course_name} has been removed from cart')
+                return redirect(url_for('.course'))
+
+
+    #---------- Checkout ----------#
+    if request.method == 'POST' and 'checkout' in request.form:
+        return checkout(ctx, '.course')
+
+
+    #---------- Unregister ----------#
+    if request.method == 'POST' and 'unregister' in request.form:
+        course_name = request.form.get('unregister')
+        for ordered in user_ordered:
+            if ordered.course_name == course_name:
+
+                # Total order decrement
+                db.session.execute(
+                    db.update(Course)
+                    .where(Course.course_id == ordered.course_id, Course.course_order > 0)
+                    .values(course_order=Course.course_order - 1)
+                )
+
+                # Remove from order (unregister), the seat goes to the head of the waitlist
+                db.session.delete(ordered)
+                record_enrollments([(ordered.course_id, ordered.order_date_created.date(), -1, -(ordered.order_price or 0))])
+                promoted = promote_waitlist([ordered.course_id])
+                db.session.commit()
+                catalog.seats_changed()
+                seat_feed.notify()
+                for promoted_user_id in [user_id, *promoted]:
+                    page_cache.touch_user(promoted_user_id)
+        flash(f'You have successfully unregistered {course_name} class')
+        return redirect(url_for('.course'))
+
+
+    #---------- Leave Waitlist ----------#
+    if request.method == 'POST' and 'leave_waitlist' in request.form:
+        course_name = request.form.get('leave_waitlist')
+        for entry in user_waitlist:
+            if entry.course_name == course_name:
+                leave_waitlist(user_id, entry.course_id)
+                page_cache.touch_user(user_id)
+                flash(f'You have left the waitlist of {course_name}')
+        return redirect(url_for('.course'))
+
+    return render_template('course.html', courses=courses, course_rows=render_course_rows(courses, (view, after)), next_cursor=encode_cursor(next_cursor), user_list=user_list, select=select, purchase_form=purchase_form, user_cart=user_cart, cart_total=cart_total, user_ordered=user_ordered, user_waitlist=user_waitlist)
+
+
+# ---------- Redirect about ---------- #
+@bp.route('/about', methods=['GET', 'POST'])
+@page_cache.private(catalog.stamp)
+@login_required
+def about():
+    # Cart & Checkout
+    ctx = user_context()                                        # (User, cart & orders of this request)
+    user_id = ctx.user_id                                       # (Get current user id)
+    user_cart = ctx.cart                                        # (Get course from user's cart)
+
+
+    #---------- Remove From Cart ----------#
+    if request.method == 'POST' and 'remove' in request.form:
+        course_name = request.form.get('remove')
+        for course in user_cart:
+            if course.course_name == course_name:
+                remove_from_cart(course)
+                page_cache.touch_user(user_id)
+                flash(f'{course_name} has been removed from cart')
+                return redirect(url_for('.about'))
+
+
+    #---------- Checkout ----------#
+    if request.method == 'POST' and 'checkout' in request.form:
+        return checkout(ctx, '.about')
+
+    return render_template('about.html', user_cart=user_cart)